@@ -24,8 +24,25 @@
 """
 Root module for fritzctl containing the :py:mod:`fritzctl.session`\\ , :py:mod:`fritzctl.dynapi` and :py:mod:`fritzctl.ooapi` modules and packages.
 
-This package automatically imports the :py:mod:`session <fritzctl.session>` module
-with ``from ... import *``\\ , this means that you can access e.g. :py:class:`fritzctl.session.Session()` as :py:class:`fritzctl.Session()`\\ .
+This package exposes the contents of the :py:mod:`session <fritzctl.session>` module
+as if imported with ``from ... import *``\\ , this means that you can access e.g. :py:class:`fritzctl.session.Session()` as :py:class:`fritzctl.Session()`\\ .
+
+Submodules are only imported on first access, so ``import fritzctl`` is fast and does not import :py:mod:`requests` or :py:mod:`simpletr64`\\ .
+See :py:mod:`fritzctl.benchmark` for measuring the import time.
 """
 
-from .session import *
+import importlib
+
+__all__ = ["NAME_TO_URN","Session"]
+
+SUBMODULES = ["session","dynapi","ooapi"]
+
+def __getattr__(name):
+    if name in __all__:
+        return getattr(importlib.import_module(".session",__name__),name)
+    elif name in SUBMODULES:
+        return importlib.import_module("."+name,__name__)
+    raise AttributeError("module %r has no attribute %r"%(__name__,name))
+
+def __dir__():
+    return sorted(list(globals().keys())+SUBMODULES+__all__)
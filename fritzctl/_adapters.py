@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  _adapters.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+# Transport adapters used by fritzctl.session, kept separate so that requests is only imported when needed
+
+from requests.adapters import HTTPAdapter
+
+class PinnedAdapter(HTTPAdapter):
+    __attrs__ = HTTPAdapter.__attrs__+["fingerprint"]
+    def __init__(self,fingerprint,**kwargs):
+        self.fingerprint = fingerprint
+        super(PinnedAdapter,self).__init__(**kwargs)
+    def init_poolmanager(self,*args,**kwargs):
+        kwargs["assert_fingerprint"] = self.fingerprint
+        super(PinnedAdapter,self).init_poolmanager(*args,**kwargs)
+    def send(self,request,**kwargs):
+        # The certificate is checked via the pinned fingerprint instead,
+        # set here as REQUESTS_CA_BUNDLE would override a session-wide setting
+        kwargs["verify"] = False
+        return super(PinnedAdapter,self).send(request,**kwargs)
@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  backup.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module for backing up and restoring the configuration of many servers at once.
+
+Backups are stored in a :py:class:`BackupStore()`\ , a directory in which every configfile is stored only once, named after its SHA-256 digest.
+A :py:class:`BackupOrchestrator()` downloads and restores configfiles of many servers concurrently::
+
+   store = BackupStore("/var/backups/fritz")
+   orch = BackupOrchestrator(store,"configpassword")
+   for name,record,error in orch.backup({"office":session1,"home":session2}):
+       ...
+
+Note that this module is not imported automatically, use ``import fritzctl.backup`` to access it.
+"""
+
+import hashlib
+import http.server
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+from .ooapi import base
+from .ooapi import general_deviceconfig
+
+class BackupStore(object):
+    """
+    Content-addressed storage for configfiles.
+    
+    The directory has the following layout:
+    
+    - ``objects/<xx>/<sha256>`` contains each distinct configfile once, where ``<xx>`` are the first two hex digits of the digest
+    - ``boxes/<name>.json`` contains the backup history of a server as a list of records, oldest first
+    - ``tmp/`` contains incomplete downloads
+    
+    Each record is a dictionary with the keys ``time``\ , ``sha256``\ , ``size`` and ``new``\ ,
+    where ``new`` is a flag if the configfile differed from all stored configfiles.
+    
+    Note that only byte-identical configfiles are deduplicated.
+    
+    :param str path: Directory to store the backups in, created if necessary
+    
+    :ivar str path: stores the supplied directory
+    """
+    def __init__(self,path):
+        self.path = path
+        self._lock = threading.Lock()
+        for d in ["objects","boxes","tmp"]:
+            os.makedirs(os.path.join(path,d),exist_ok=True)
+    def getObjectPath(self,sha256):
+        """
+        Returns the path of the configfile with the given digest.
+        
+        :param str sha256: Hex-encoded SHA-256 digest of the configfile
+        :rtype: str
+        :raises AssertionError: if the digest is not a valid hex-encoded SHA-256 digest
+        """
+        assert isinstance(sha256,str) and re.match("^[0-9a-f]{64}$",sha256)
+        return os.path.join(self.path,"objects",sha256[:2],sha256)
+    def hasObject(self,sha256):
+        """
+        Checks if the configfile with the given digest is stored.
+        
+        :param str sha256: Hex-encoded SHA-256 digest of the configfile
+        :rtype: bool
+        """
+        return os.path.exists(self.getObjectPath(sha256))
+    def getTempPath(self):
+        """
+        Returns a new unique path for downloading a configfile to, see :py:meth:`addFile()`\ .
+        
+        :rtype: str
+        """
+        return os.path.join(self.path,"tmp",uuid.uuid4().hex)
+    def addFile(self,name,fname,sha256=None):
+        """
+        Moves the given file into the store and adds it to the history of a server.
+        
+        If a configfile with the same content is already stored, the given file is deleted instead.
+        
+        :param str name: Name of the server
+        :param str fname: Name of the file to add, should be located on the same filesystem as the store, e.g. via :py:meth:`getTempPath()`
+        :param str sha256: Optional hex-encoded SHA-256 digest of the file, computed if not given
+        :return: The new record
+        :rtype: dict
+        """
+        if sha256 is None:
+            h = hashlib.sha256()
+            with open(fname,"rb") as f:
+                for chunk in iter(lambda:f.read(65536),b""):
+                    h.update(chunk)
+            sha256 = h.hexdigest()
+        dest = self.getObjectPath(sha256)
+        size = os.path.getsize(fname)
+        with self._lock:
+            new = not os.path.exists(dest)
+            if new:
+                os.makedirs(os.path.dirname(dest),exist_ok=True)
+                os.replace(fname,dest)
+            else:
+                os.remove(fname)
+            record = {"time":time.time(),"sha256":sha256,"size":size,"new":new}
+            history = self.getHistory(name)
+            history.append(record)
+            self._writeHistory(name,history)
+        return record
+    def _historyPath(self,name):
+        assert isinstance(name,str) and re.match(r"^[\w.-]+$",name) and not name.startswith(".")
+        return os.path.join(self.path,"boxes",name+".json")
+    def _writeHistory(self,name,history):
+        fname = self._historyPath(name)
+        with open(fname+".tmp","w") as f:
+            json.dump(history,f,indent=1)
+        os.replace(fname+".tmp",fname)
+    def getHistory(self,name):
+        """
+        Returns the backup history of a server.
+        
+        :param str name: Name of the server, may only contain letters, digits, dots, underscores and dashes
+        :return: List of records, oldest first
+        :rtype: list
+        """
+        try:
+            with open(self._historyPath(name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+    def getLatest(self,name):
+        """
+        Returns the most recent record of a server.
+        
+        :param str name: Name of the server
+        :return: Record or ``None`` if there is no backup of this server
+        :rtype: dict or None
+        """
+        history = self.getHistory(name)
+        return history[-1] if history else None
+    def getNames(self):
+        """
+        Returns the names of all servers with backups.
+        
+        :rtype: list
+        """
+        return sorted(f[:-5] for f in os.listdir(os.path.join(self.path,"boxes")) if f.endswith(".json"))
+    def prune(self,keep=30):
+        """
+        Shortens the history of all servers to the last ``keep`` records and deletes all configfiles that are no longer referenced.
+        
+        :param int keep: Optional number of records to keep per server, defaults to 30
+        :return: Number of deleted configfiles
+        :rtype: int
+        """
+        assert keep>0
+        with self._lock:
+            used = set()
+            for name in self.getNames():
+                history = self.getHistory(name)[-keep:]
+                self._writeHistory(name,history)
+                used.update(r["sha256"] for r in history)
+            deleted = 0
+            objects = os.path.join(self.path,"objects")
+            for d in os.listdir(objects):
+                for sha256 in os.listdir(os.path.join(objects,d)):
+                    if sha256 not in used:
+                        os.remove(os.path.join(objects,d,sha256))
+                        deleted+=1
+        return deleted
+
+class BackupOrchestrator(object):
+    """
+    Backs up and restores the configuration of many servers concurrently.
+    
+    :param BackupStore store: Store to keep the configfiles in
+    :param str password: Password used to encrypt the configfiles, the same password is needed for restoring
+    :param int maxworkers: Optional maximum number of servers to process concurrently, defaults to 8
+    :param int retries: Optional maximum number of retries per server when backing up, defaults to 2
+    
+    :ivar BackupStore store: stores the supplied store
+    :ivar str password: stores the supplied password
+    :ivar int maxworkers: stores the supplied maximum number of workers
+    :ivar int retries: stores the supplied number of retries
+    """
+    def __init__(self,store,password,maxworkers=8,retries=2):
+        self.store = store
+        self.password = password
+        self.maxworkers = maxworkers
+        self.retries = retries
+    def backup(self,sessions):
+        """
+        Backs up the configfiles of all given servers.
+        
+        See :py:func:`fritzctl.ooapi.general_deviceconfig.downloadConfigFiles()` for details about the retries.
+        
+        :param dict sessions: Dictionary mapping server names to sessions
+        :return: List of 3-tuples of ``(name,record,exception)``\ , where record is ``None`` if the backup failed
+        :rtype: list
+        """
+        names = sorted(sessions)
+        jobs = [(sessions[name],self.store.getTempPath()) for name in names]
+        out = []
+        results = general_deviceconfig.downloadConfigFiles(jobs,self.password,retries=self.retries,maxworkers=self.maxworkers)
+        for name,(job,result,error) in zip(names,results):
+            if error is not None:
+                out.append((name,None,error))
+                continue
+            try:
+                out.append((name,self.store.addFile(name,job[1],result[1]),None))
+            except Exception as e:
+                out.append((name,None,e))
+        return out
+    def restore(self,sessions,host=None,port=0,timeout=300.0):
+        """
+        Restores configfiles to the given servers.
+        
+        The configfiles are served by a :py:class:`ConfigFileServer()` that is started for the duration of this call.
+        Each server downloads its configfile from there via :py:meth:`setConfigFile() <fritzctl.ooapi.general_deviceconfig.API_general_deviceconfig.setConfigFile>`\ .
+        The file server only listens on the local addresses used for reaching the servers, one server per address.
+        It is kept running until every server has downloaded its configfile or the timeout expired.
+        
+        .. warning::
+        
+           The servers will reboot after restoring their configuration.
+        
+        :param dict sessions: Dictionary mapping server names to sessions, or to 2-tuples of ``(session,sha256)`` to restore a specific configfile instead of the latest one
+        :param str host: Optional address the servers can reach this host with, determined automatically per server by default
+        :param int port: Optional port to serve the configfiles on, defaults to a random free port
+        :param float timeout: Optional maximum time in seconds to wait for each server to download its configfile, defaults to 5 minutes
+        :return: List of 3-tuples of ``(name,sha256,exception)``
+        :rtype: list
+        """
+        jobs = []
+        for name in sorted(sessions):
+            v = sessions[name]
+            if isinstance(v,tuple):
+                session,sha256 = v
+            else:
+                latest = self.store.getLatest(name)
+                if latest is None:
+                    raise ValueError("No backup of %s"%name)
+                session,sha256 = v,latest["sha256"]
+            if not self.store.hasObject(sha256):
+                raise ValueError("Configfile %s is not stored"%sha256)
+            jobs.append((name,session,sha256,host or getLocalAddress(session.server)))
+        servers = {}
+        try:
+            for job in jobs:
+                if job[3] not in servers:
+                    servers[job[3]] = ConfigFileServer(self.store,bind=job[3],port=port)
+                    servers[job[3]].start()
+            def _restore(job):
+                name,session,sha256,addr = job
+                server = servers[addr]
+                url = server.getURL(sha256,addr,uuid.uuid4().hex)
+                session.getOOAPI("general_deviceconfig").setConfigFile(self.password,url)
+                if not server.waitServed(url,timeout):
+                    raise ValueError("%s did not download the configfile within %.0f seconds"%(name,timeout))
+            results = base.runConcurrent(_restore,jobs,self.maxworkers)
+        finally:
+            for server in servers.values():
+                server.stop()
+        return [(job[0],job[2],error) for job,_,error in results]
+
+class ConfigFileServer(object):
+    """
+    Minimal HTTP server serving the configfiles of a store to the servers during a restore.
+    
+    Configfiles are available at ``/config/<sha256>`` and ``/config/<sha256>/<token>``\ , but only at the URLs returned by :py:meth:`getURL()`\ ,
+    all other paths are answered with 404. The token allows waiting for a specific download via :py:meth:`waitServed()`\ .
+    
+    The configfiles are served without authentication, so the server should only listen on an address reachable by the servers restored
+    and URLs should contain a random token that cannot be guessed by other hosts.
+    
+    :param BackupStore store: Store to serve the configfiles from
+    :param str bind: Optional address to listen on, defaults to ``127.0.0.1``
+    :param int port: Optional port to listen on, defaults to a random free port
+    
+    :ivar BackupStore store: stores the supplied store
+    :ivar str bind: stores the supplied address
+    :ivar int port: Port the server is listening on, only valid after :py:meth:`start()`
+    """
+    def __init__(self,store,bind="127.0.0.1",port=0):
+        self.store = store
+        self.bind = bind
+        self.port = port
+        self._httpd = None
+        self._thread = None
+        self._served = set()
+        self._paths = set()
+        self._cond = threading.Condition()
+    def start(self):
+        """
+        Starts serving in a background thread.
+        """
+        store = self.store
+        server = self
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                m = re.match("^/config/([0-9a-f]{64})(?:/[0-9a-zA-Z]+)?$",self.path)
+                with server._cond:
+                    allowed = self.path in server._paths
+                if m is None or not allowed or not store.hasObject(m.group(1)):
+                    self.send_error(404)
+                    return
+                fname = store.getObjectPath(m.group(1))
+                self.send_response(200)
+                self.send_header("Content-Type","application/octet-stream")
+                self.send_header("Content-Length",str(os.path.getsize(fname)))
+                self.end_headers()
+                with open(fname,"rb") as f:
+                    shutil.copyfileobj(f,self.wfile)
+                with server._cond:
+                    server._served.add(self.path)
+                    server._cond.notify_all()
+            def log_message(self,*args):
+                pass
+        cls = http.server.ThreadingHTTPServer
+        if ":" in self.bind:
+            cls = type("ThreadingHTTPServerV6",(cls,),{"address_family":socket.AF_INET6})
+        self._httpd = cls((self.bind,self.port),_Handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,name="fritzctl-configfileserver",daemon=True)
+        self._thread.start()
+    def stop(self):
+        """
+        Stops serving and waits for the background thread to finish.
+        """
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+            self._thread = None
+    def getURL(self,sha256,host,token=None):
+        """
+        Returns the URL of a configfile and allows downloading it from there.
+        
+        :param str sha256: Hex-encoded SHA-256 digest of the configfile
+        :param str host: Address the server can reach this host with
+        :param str token: Optional alphanumeric token identifying this download, see :py:meth:`waitServed()`
+        :rtype: str
+        """
+        if ":" in host:
+            host = "[%s]"%host
+        assert token is None or re.match("^[0-9a-zA-Z]+$",token)
+        path = "/config/"+sha256 if token is None else "/config/%s/%s"%(sha256,token)
+        with self._cond:
+            self._paths.add(path)
+        return "http://%s:%d%s"%(host,self.port,path)
+    def waitServed(self,url,timeout=None):
+        """
+        Waits until the configfile at the given URL has been downloaded completely.
+        
+        Use a URL with a token, see :py:meth:`getURL()`\ , as downloads of the same configfile by other servers are counted too.
+        
+        :param str url: URL as returned by :py:meth:`getURL()`
+        :param float timeout: Optional maximum time in seconds to wait, defaults to waiting forever
+        :return: Flag if the configfile has been downloaded
+        :rtype: bool
+        """
+        path = "/config/"+url.split("/config/",1)[1]
+        with self._cond:
+            return self._cond.wait_for(lambda:path in self._served,timeout)
+
+def getLocalAddress(server):
+    """
+    Returns the local address used for connecting to the given server.
+    
+    No packets are sent, the address is determined by the routing table.
+    
+    :param str server: Hostname or IP Address of the server
+    :rtype: str
+    """
+    info = socket.getaddrinfo(server,49000,0,socket.SOCK_DGRAM)[0]
+    s = socket.socket(info[0],socket.SOCK_DGRAM)
+    try:
+        s.connect(info[4])
+        return s.getsockname()[0]
+    finally:
+        s.close()
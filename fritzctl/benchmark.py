@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmark.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module for measuring and guarding the import time of fritzctl.
+
+Importing :py:mod:`fritzctl`\ , :py:mod:`fritzctl.session` or :py:mod:`fritzctl.ooapi` should not import any of the
+:py:data:`HEAVY_MODULES`\ , they are only imported when a :py:class:`Session() <fritzctl.session.Session>` is created.
+
+Every measurement is done in a fresh interpreter, as modules are only imported once per process.
+The checks can be run from the command line, the exit code is non-zero if any check failed::
+
+   python -m fritzctl.benchmark
+   python -m fritzctl.benchmark --budget 0.05 fritzctl fritzctl.ooapi
+
+Note that this module is not imported automatically, use ``import fritzctl.benchmark`` to access it.
+"""
+
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["requests","urllib3","simpletr64"]
+"""
+List of modules that must not be imported by :py:data:`GUARDED_MODULES`\ .
+"""
+
+GUARDED_MODULES = ["fritzctl","fritzctl.session","fritzctl.ooapi"]
+"""
+List of modules checked by default.
+"""
+
+_SCRIPT = """
+import sys,time,json
+before = set(sys.modules)
+start = time.perf_counter()
+import %s
+duration = time.perf_counter()-start
+json.dump({"duration":duration,"modules":sorted(set(sys.modules)-before)},sys.stdout)
+"""
+
+def measureImport(module,runs=5):
+    """
+    Measures the time needed for importing the given module in a fresh interpreter.
+    
+    :param str module: Name of the module to import
+    :param int runs: Optional number of interpreters to start, defaults to 5
+    :return: Dictionary with the keys ``duration``\ , the median import time in seconds, and ``modules``\ , the list of all modules imported
+    :rtype: dict
+    :raises ValueError: if the module could not be imported
+    """
+    assert runs>0
+    results = []
+    for _ in range(runs):
+        p = subprocess.run([sys.executable,"-c",_SCRIPT%module],stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+        if p.returncode!=0:
+            raise ValueError("Could not import %s: %s"%(module,p.stderr.decode("utf-8","replace").strip()))
+        results.append(json.loads(p.stdout.decode("utf-8")))
+    durations = sorted([r["duration"] for r in results])
+    return {"duration":durations[len(durations)//2],"modules":results[0]["modules"]}
+
+def checkImport(module,budget=None,heavy=HEAVY_MODULES,runs=5):
+    """
+    Checks that importing the given module does not import any heavy modules and optionally stays within a time budget.
+    
+    :param str module: Name of the module to import
+    :param float budget: Optional maximum median import time in seconds, defaults to no limit
+    :param list heavy: Optional list of modules that must not be imported, defaults to :py:data:`HEAVY_MODULES`
+    :param int runs: Optional number of interpreters to start, defaults to 5
+    :return: Result of :py:func:`measureImport()` with the additional key ``problems``\ , a list of problems found that is empty if the check passed
+    :rtype: dict
+    """
+    result = measureImport(module,runs)
+    problems = []
+    loaded = [m for m in heavy if m in result["modules"]]
+    if loaded:
+        problems.append("%s imports %s"%(module,", ".join(loaded)))
+    if budget is not None and result["duration"]>budget:
+        problems.append("%s took %.1fms to import, budget is %.1fms"%(module,result["duration"]*1000,budget*1000))
+    result["problems"] = problems
+    return result
+
+def main(args=None):
+    """
+    Runs :py:func:`checkImport()` for the modules given on the command line, defaults to :py:data:`GUARDED_MODULES`\ .
+    
+    :param list args: Optional command line arguments, defaults to :py:data:`sys.argv`
+    :return: Exit code, ``0`` if all checks passed
+    :rtype: int
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m fritzctl.benchmark",description="Checks the import time of fritzctl modules.")
+    parser.add_argument("modules",nargs="*",default=GUARDED_MODULES,help="Modules to check")
+    parser.add_argument("--budget",type=float,default=None,help="Maximum median import time in seconds")
+    parser.add_argument("--runs",type=int,default=5,help="Number of interpreters to start per module")
+    args = parser.parse_args(args)
+    failed = False
+    for module in args.modules:
+        result = checkImport(module,args.budget,runs=args.runs)
+        print("%-24s %8.1fms %4d modules %s"%(module,result["duration"]*1000,len(result["modules"]),"FAIL" if result["problems"] else "ok"))
+        for problem in result["problems"]:
+            print("    "+problem)
+        failed = failed or bool(result["problems"])
+    return 1 if failed else 0
+
+if __name__=="__main__":
+    sys.exit(main())
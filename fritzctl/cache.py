@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  cache.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module containing cache backends for sharing session metadata and snapshots between sessions and processes.
+
+Pass a backend to :py:class:`Session() <fritzctl.session.Session>` to cache the device description and the SCPDs::
+
+   cache = fritzctl.cache.SQLiteCache("/var/cache/fritzctl.db")
+   session = fritzctl.Session("fritz.box","user","pwd",cache=cache)
+   hosts = session.getOOAPI("general_hosts").getHostTable(maxage=10)
+
+Snapshots like the host table are only cached if a maximum age is given, see :py:meth:`Session.getCached() <fritzctl.session.Session.getCached>`\ .
+
+Three backends are available:
+
+- :py:class:`LRUCache()` keeps the values in memory and shares them between all sessions of a process
+- :py:class:`MmapCache()` keeps the values in a memory-mapped file shared by all processes using the same path
+- :py:class:`SQLiteCache()` keeps the values in a local SQLite database shared by all processes using the same path
+
+Every backend provides a lock per key. :py:meth:`CacheBackend.getOrSet()` and :py:meth:`CacheBackend.getOrRefresh()` hold it while computing a missing value,
+so only one thread or process refreshes a given value at a time while the others wait and then use the new value.
+The locks of the file-based backends are ``fcntl`` record locks on ``<path>.lock``\ , they are released by the OS if a process dies.
+
+Note that this module is not imported automatically, use ``import fritzctl.cache`` to access it.
+"""
+
+import collections
+import contextlib
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+LOCK_SLOTS = 256
+"""
+Number of locks keys are distributed over, keys sharing a slot also share their lock.
+"""
+
+_MISSING = object()
+
+def _slot(key):
+    return zlib.crc32(key.encode("utf-8"))%LOCK_SLOTS
+
+class CacheBackend(object):
+    """
+    Base class for all cache backends.
+    
+    Keys are strings, values may be any picklable object.
+    Values returned by the backends should be treated as read-only, as they may be shared with other sessions.
+    
+    :param float ttl: Optional default time in seconds values are kept for, ``None`` keeps them until they are replaced, defaults to 1 hour
+    
+    :ivar float ttl: stores the supplied time
+    """
+    def __init__(self,ttl=3600.0):
+        self.ttl = ttl
+    def _expires(self,ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return float("inf") if ttl is None else time.time()+ttl
+    def get(self,key,default=None):
+        """
+        Returns the value stored for the given key.
+        
+        :param str key: Key of the value
+        :param default: Optional value to return if the key is not cached or has expired, defaults to ``None``
+        :return: Cached value or ``default``
+        """
+        raise NotImplementedError("get() not implemented by %s"%self.__class__.__name__)
+    def set(self,key,value,ttl=None):
+        """
+        Stores a value for the given key.
+        
+        :param str key: Key of the value
+        :param value: Value to store
+        :param float ttl: Optional time in seconds the value is kept for, defaults to :py:attr:`ttl`
+        """
+        raise NotImplementedError("set() not implemented by %s"%self.__class__.__name__)
+    def delete(self,key):
+        """
+        Removes the value stored for the given key, if any.
+        
+        :param str key: Key of the value
+        """
+        raise NotImplementedError("delete() not implemented by %s"%self.__class__.__name__)
+    def clear(self):
+        """
+        Removes all values.
+        """
+        raise NotImplementedError("clear() not implemented by %s"%self.__class__.__name__)
+    def lock(self,key,timeout=30.0):
+        """
+        Returns a context manager holding the lock of the given key.
+        
+        The context manager returns ``True`` if the lock was acquired and ``False`` if the timeout expired first.
+        
+        :param str key: Key to lock
+        :param float timeout: Optional maximum time in seconds to wait for the lock, defaults to 30 seconds
+        """
+        raise NotImplementedError("lock() not implemented by %s"%self.__class__.__name__)
+    def getOrSet(self,key,func,ttl=None,timeout=30.0):
+        """
+        Returns the value stored for the given key, calling ``func`` and storing its result if there is none.
+        
+        The lock of the key is held while calling ``func``\ , so concurrent callers wait for the first one instead of calling ``func`` too.
+        If the lock cannot be acquired within ``timeout`` seconds, ``func`` is called without holding it.
+        
+        :param str key: Key of the value
+        :param func: Callable without arguments returning the value
+        :param float ttl: Optional time in seconds the value is kept for, defaults to :py:attr:`ttl`
+        :param float timeout: Optional maximum time in seconds to wait for the lock, defaults to 30 seconds
+        :return: Cached or newly computed value
+        """
+        value = self.get(key,_MISSING)
+        if value is not _MISSING:
+            return value
+        with self.lock(key,timeout):
+            value = self.get(key,_MISSING)
+            if value is _MISSING:
+                value = func()
+                self.set(key,value,ttl)
+        return value
+    def getOrRefresh(self,key,func,maxage,timeout=30.0):
+        """
+        Returns the value stored for the given key, calling ``func`` and storing its result if there is none or it is older than ``maxage`` seconds.
+        
+        The value is stored together with the time it was created, so every caller may use its own maximum age for the same key.
+        The value itself is kept for the default :py:attr:`ttl`\ . Locking works like in :py:meth:`getOrSet()`\ .
+        Values stored via this method must only be accessed via this method.
+        
+        :param str key: Key of the value
+        :param func: Callable without arguments returning the value
+        :param float maxage: Maximum age of the value in seconds
+        :param float timeout: Optional maximum time in seconds to wait for the lock, defaults to 30 seconds
+        :return: Cached or newly computed value
+        """
+        entry = self.get(key)
+        if entry is not None and time.time()-entry[0]<=maxage:
+            return entry[1]
+        with self.lock(key,timeout):
+            entry = self.get(key)
+            if entry is None or time.time()-entry[0]>maxage:
+                entry = (time.time(),func())
+                self.set(key,entry)
+        return entry[1]
+
+class LRUCache(CacheBackend):
+    """
+    In-process cache keeping the least recently used values.
+    
+    Values are stored without copying or pickling.
+    
+    :param int maxsize: Optional maximum number of values, defaults to 128
+    :param float ttl: Optional default time in seconds values are kept for, see :py:class:`CacheBackend()`
+    
+    :ivar int maxsize: stores the supplied maximum
+    """
+    def __init__(self,maxsize=128,ttl=3600.0):
+        super(LRUCache,self).__init__(ttl)
+        assert isinstance(maxsize,int) and maxsize>0
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._mutex = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(LOCK_SLOTS)]
+    def get(self,key,default=None):
+        with self._mutex:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[0]<=time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+    def set(self,key,value,ttl=None):
+        with self._mutex:
+            self._data[key] = (self._expires(ttl),value)
+            self._data.move_to_end(key)
+            while len(self._data)>self.maxsize:
+                self._data.popitem(last=False)
+    def delete(self,key):
+        with self._mutex:
+            self._data.pop(key,None)
+    def clear(self):
+        with self._mutex:
+            self._data.clear()
+    @contextlib.contextmanager
+    def lock(self,key,timeout=30.0):
+        lock = self._locks[_slot(key)]
+        acquired = lock.acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+    def __len__(self):
+        return len(self._data)
+
+class FileLocks(object):
+    """
+    Locks shared between threads and processes, implemented as ``fcntl`` record locks on a lock file.
+    
+    Each slot is a single byte of the file. Record locks are held per process, so a thread lock per slot is acquired first.
+    
+    :param str path: Path of the lock file, created if it does not exist
+    
+    :ivar str path: stores the supplied path
+    """
+    def __init__(self,path):
+        self.path = path
+        self._fd = os.open(path,os.O_RDWR|os.O_CREAT,0o600)
+        self._locks = [threading.Lock() for _ in range(LOCK_SLOTS)]
+    @contextlib.contextmanager
+    def lock(self,key,timeout=30.0):
+        """
+        Returns a context manager holding the lock of the given key, see :py:meth:`CacheBackend.lock()`\ .
+        
+        :param str key: Key to lock
+        :param float timeout: Optional maximum time in seconds to wait for the lock, defaults to 30 seconds
+        """
+        import fcntl
+        slot = _slot(key)
+        deadline = time.monotonic()+timeout
+        lock = self._locks[slot]
+        acquired = lock.acquire(timeout=timeout)
+        try:
+            if acquired:
+                while True:
+                    try:
+                        fcntl.lockf(self._fd,fcntl.LOCK_EX|fcntl.LOCK_NB,1,slot)
+                        break
+                    except OSError:
+                        if time.monotonic()>=deadline:
+                            lock.release()
+                            acquired = False
+                            break
+                        time.sleep(0.05)
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.lockf(self._fd,fcntl.LOCK_UN,1,slot)
+                lock.release()
+    def close(self):
+        """
+        Closes the lock file, releasing all locks held by this process.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class MmapCache(CacheBackend):
+    """
+    Cache stored in a memory-mapped file, shared by all processes using the same path.
+    
+    The file contains a header with a generation counter followed by all entries pickled as a single dictionary.
+    Readers only unpickle the entries again after another process changed them, so reads of unchanged data are cheap.
+    Writers rewrite all entries, so this backend is intended for few, rarely changing values like device descriptions.
+    
+    :param str path: Path of the cache file, created if it does not exist
+    :param int size: Optional size of the file in bytes, limiting the size of all entries, defaults to 16 MiB
+    :param float ttl: Optional default time in seconds values are kept for, see :py:class:`CacheBackend()`
+    
+    :ivar str path: stores the supplied path
+    :ivar int size: stores the supplied size
+    """
+    _HEADER = struct.Struct("<QQ")
+    def __init__(self,path,size=16*1024*1024,ttl=3600.0):
+        super(MmapCache,self).__init__(ttl)
+        import mmap
+        assert isinstance(size,int) and size>self._HEADER.size
+        self.path = path
+        self.size = size
+        self._fd = os.open(path,os.O_RDWR|os.O_CREAT,0o600)
+        if os.fstat(self._fd).st_size<size:
+            os.ftruncate(self._fd,size)
+        self._mmap = mmap.mmap(self._fd,size)
+        self._mutex = threading.Lock()
+        self._locks = FileLocks(path+".lock")
+        self._generation = None
+        self._entries = {}
+    @contextlib.contextmanager
+    def _access(self,exclusive):
+        import fcntl
+        with self._mutex:
+            fcntl.flock(self._fd,fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd,fcntl.LOCK_UN)
+    def _load(self):
+        generation,length = self._HEADER.unpack_from(self._mmap,0)
+        if generation!=self._generation:
+            start = self._HEADER.size
+            self._entries = pickle.loads(self._mmap[start:start+length]) if length else {}
+            self._generation = generation
+        return self._entries
+    def _store(self,entries):
+        now = time.time()
+        entries = {k:v for k,v in entries.items() if v[0]>now}
+        data = pickle.dumps(entries,pickle.HIGHEST_PROTOCOL)
+        if self._HEADER.size+len(data)>self.size:
+            raise ValueError("Cache entries need %d bytes, but %s only has %d bytes"%(len(data),self.path,self.size-self._HEADER.size))
+        start = self._HEADER.size
+        self._mmap[start:start+len(data)] = data
+        generation = (self._generation or 0)+1
+        self._HEADER.pack_into(self._mmap,0,generation,len(data))
+        self._generation = generation
+        self._entries = entries
+    def get(self,key,default=None):
+        with self._access(False):
+            entry = self._load().get(key)
+        if entry is None or entry[0]<=time.time():
+            return default
+        return entry[1]
+    def set(self,key,value,ttl=None):
+        with self._access(True):
+            entries = dict(self._load())
+            entries[key] = (self._expires(ttl),value)
+            self._store(entries)
+    def delete(self,key):
+        with self._access(True):
+            entries = self._load()
+            if key in entries:
+                entries = dict(entries)
+                del entries[key]
+                self._store(entries)
+    def clear(self):
+        with self._access(True):
+            self._load()
+            self._store({})
+    def lock(self,key,timeout=30.0):
+        return self._locks.lock(key,timeout)
+    def close(self):
+        """
+        Closes the cache file and the lock file.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            os.close(self._fd)
+            self._locks.close()
+            self._mmap = None
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a local SQLite database, shared by all processes using the same path.
+    
+    Each thread uses its own connection. The database uses write-ahead logging, so readers are not blocked by writers.
+    
+    :param str path: Path of the database file, created if it does not exist
+    :param float ttl: Optional default time in seconds values are kept for, see :py:class:`CacheBackend()`
+    :param float timeout: Optional time in seconds to wait for the database if it is locked by another connection, defaults to 10 seconds
+    
+    :ivar str path: stores the supplied path
+    :ivar float timeout: stores the supplied timeout
+    """
+    def __init__(self,path,ttl=3600.0,timeout=10.0):
+        super(SQLiteCache,self).__init__(ttl)
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._locks = FileLocks(path+".lock")
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value BLOB)")
+    def _connect(self):
+        conn = getattr(self._local,"conn",None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path,timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    def get(self,key,default=None):
+        row = self._connect().execute("SELECT expires,value FROM cache WHERE key=?",(key,)).fetchone()
+        if row is None or row[0]<=time.time():
+            return default
+        return pickle.loads(row[1])
+    def set(self,key,value,ttl=None):
+        data = pickle.dumps(value,pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE expires<=?",(time.time(),))
+            conn.execute("INSERT OR REPLACE INTO cache (key,expires,value) VALUES (?,?,?)",(key,self._expires(ttl),data))
+    def delete(self,key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key=?",(key,))
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+    def lock(self,key,timeout=30.0):
+        return self._locks.lock(key,timeout)
@@ -0,0 +1,458 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  cli.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Command line interface, installed as the ``fritzctl`` command and also available via ``python -m fritzctl``\ .
+
+Commands are grouped by API, e.g. ``fritzctl hosts list`` or ``fritzctl homeauto switch 087610000001 on``\ ,
+see ``fritzctl --help`` or :py:data:`COMMANDS` for all commands. Results are printed as JSON or, with ``--format csv``\ , as CSV.
+
+The connection options can also be given via the environment variables ``FRITZCTL_SERVER``\ , ``FRITZCTL_USER``\ ,
+``FRITZCTL_PASSWORD`` and ``FRITZCTL_SOCKET``\ .
+
+Batch mode:
+
+With ``--batch``\ , one command per line is read from standard input and all commands are run over a single session.
+Empty lines and lines starting with ``#`` are ignored. In JSON format, one JSON object per command is printed,
+containing the keys ``command`` and either ``result`` or ``error``\ ::
+
+   printf "hosts list\\nwlan info --band 2\\n" | fritzctl --batch
+
+Daemon:
+
+Creating a session requires fetching the device description and all SCPDs, which takes much longer than most commands.
+``fritzctl daemon`` keeps sessions open and listens on a unix socket, if ``--socket`` is given and the socket exists,
+commands are sent to the daemon instead of creating a new session::
+
+   fritzctl daemon --socket ~/.fritzctl.sock &
+   export FRITZCTL_SOCKET=~/.fritzctl.sock
+   fritzctl hosts list
+
+The socket is only accessible by the user running the daemon. Sessions are closed after being unused for ``--idle`` seconds.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import shlex
+import sys
+import threading
+import time
+
+FORMATS = ["json","csv"]
+"""
+List of supported output formats.
+"""
+
+WLAN_BANDS = {
+    1:"net_wlan_2.4ghz",
+    2:"net_wlan_2nd",
+    3:"net_wlan_3rd",
+    }
+"""
+Mapping of the ``--band`` option of the ``wlan`` commands to the names of the APIs.
+"""
+
+def toRow(obj):
+    """
+    Converts an information object, e.g. :py:class:`Host() <fritzctl.ooapi.general_hosts.Host>`\ , to a dictionary for printing.
+    
+    All public instance variables with simple values are included, private variables backing a property of the same name are included under the name of the property.
+    Dates are converted to ISO 8601 strings.
+    
+    :param obj: Information Object
+    :return: Dictionary mapping names to values
+    :rtype: dict
+    """
+    row = {}
+    for k,v in vars(obj).items():
+        if k.startswith("_"):
+            k = k[1:]
+            if not isinstance(getattr(type(obj),k,None),property):
+                continue
+        if k in ("api","info"):
+            continue
+        if isinstance(v,(datetime.datetime,datetime.date)):
+            v = v.isoformat()
+        if isinstance(v,(str,int,float,bool,type(None))):
+            row[k] = v
+    return row
+
+# Commands
+
+def _wlan(session,args):
+    return session.getOOAPI(WLAN_BANDS[args.band])
+
+def cmdDeviceInfo(session,args):
+    return toRow(session.getOOAPI("general_deviceinfo").getDeviceInfo(log=False))
+
+def cmdDeviceLog(session,args):
+    return [toRow(e) for e in session.getOOAPI("general_deviceinfo").getLogEntries()]
+
+def cmdHostsList(session,args):
+    hosts = session.getOOAPI("general_hosts").getHostTable()
+    return [toRow(h) for h in hosts if h.active or not args.active]
+
+def cmdHostsGet(session,args):
+    return toRow(session.getOOAPI("general_hosts").getHostByMAC(args.mac))
+
+def cmdHostsWake(session,args):
+    session.getOOAPI("general_hosts").wakeUp(args.mac)
+    return {"mac":args.mac,"status":"ok"}
+
+def cmdWlanInfo(session,args):
+    return toRow(_wlan(session,args).getConfig())
+
+def cmdWlanDevices(session,args):
+    return [toRow(d) for d in _wlan(session,args).getDevices()]
+
+def cmdHomeautoList(session,args):
+    return [toRow(d) for d in session.getOOAPI("avm_homeauto").getDeviceList()]
+
+def cmdHomeautoGet(session,args):
+    return toRow(session.getOOAPI("avm_homeauto").getDeviceByAIN(args.ain))
+
+def cmdHomeautoSwitch(session,args):
+    state = {"on":True,"off":False,"toggle":"toggle"}[args.state]
+    session.getOOAPI("avm_homeauto").switchByAIN(args.ain,state)
+    return {"ain":args.ain,"status":"ok"}
+
+def cmdCall(session,args):
+    kwargs = {}
+    for arg in args.arguments:
+        k,sep,v = arg.partition("=")
+        if not sep:
+            raise ValueError("Invalid argument %r, expected Name=Value"%arg)
+        kwargs[k] = v
+    out = session.getAPI(args.service,typed=True).callAPI(args.action,**kwargs)
+    return {k:(v.isoformat() if isinstance(v,datetime.datetime) else v) for k,v in out.items()}
+
+_MAC = (["mac"],{"help":"MAC Address of the host"})
+_AIN = (["ain"],{"help":"AIN of the device"})
+_BAND = (["--band"],{"type":int,"choices":sorted(WLAN_BANDS),"default":1,"help":"WLAN to query, 1 is usually 2.4GHz, 2 5GHz and 3 the guest network"})
+
+COMMANDS = {
+    "deviceinfo.info":(cmdDeviceInfo,"Show information about the device",[]),
+    "deviceinfo.log":(cmdDeviceLog,"Show the device log",[]),
+    "hosts.list":(cmdHostsList,"List all known hosts",[(["--active"],{"action":"store_true","help":"Only list active hosts"})]),
+    "hosts.get":(cmdHostsGet,"Show a single host",[_MAC]),
+    "hosts.wake":(cmdHostsWake,"Wake a host via Wake on LAN",[_MAC]),
+    "wlan.info":(cmdWlanInfo,"Show the configuration of a WLAN",[_BAND]),
+    "wlan.devices":(cmdWlanDevices,"List the devices associated with a WLAN",[_BAND]),
+    "homeauto.list":(cmdHomeautoList,"List all smart home devices",[]),
+    "homeauto.get":(cmdHomeautoGet,"Show a single smart home device",[_AIN]),
+    "homeauto.switch":(cmdHomeautoSwitch,"Switch a socket",[_AIN,(["state"],{"choices":["on","off","toggle"],"help":"State to switch to"})]),
+    "call":(cmdCall,"Execute any action, e.g. call general_time GetInfo",[
+        (["service"],{"help":"Name or URN of the service, see fritzctl.session.NAME_TO_URN"}),
+        (["action"],{"help":"Name of the action"}),
+        (["arguments"],{"nargs":"*","help":"Arguments of the action as Name=Value"}),
+        ]),
+    }
+"""
+Dictionary mapping ``group.command`` or ``command`` to ``(function,help,arguments)`` tuples.
+
+The function is called with the session and the parsed arguments and returns a dictionary, a list of dictionaries or ``None``\ .
+The arguments are a list of ``(args,kwargs)`` tuples passed to :py:meth:`argparse.ArgumentParser.add_argument()`\ .
+"""
+
+# Output
+
+def formatResult(result,fmt="json"):
+    """
+    Formats the result of a command.
+    
+    :param result: Dictionary, list of dictionaries or ``None``
+    :param str fmt: Optional output format, see :py:data:`FORMATS`\ , defaults to ``json``
+    :return: Formatted result, without a trailing newline
+    :rtype: str
+    """
+    if fmt=="json":
+        return json.dumps(result,indent=1,sort_keys=True)
+    elif fmt=="csv":
+        import csv
+        import io
+        rows = [] if result is None else (result if isinstance(result,list) else [result])
+        fields = []
+        for row in rows:
+            fields.extend([k for k in row if k not in fields])
+        f = io.StringIO()
+        w = csv.DictWriter(f,fields,lineterminator="\n")
+        w.writeheader()
+        w.writerows(rows)
+        return f.getvalue().rstrip("\n")
+    raise ValueError("Invalid format %s"%fmt)
+
+# Argument parsing
+
+def buildParser():
+    """
+    Builds the argument parser for all commands in :py:data:`COMMANDS`\ .
+    
+    :rtype: argparse.ArgumentParser
+    """
+    env = os.environ.get
+    parser = argparse.ArgumentParser(prog="fritzctl",description="Command line client for the TR64 API of FRITZ!Box devices.")
+    parser.add_argument("-s","--server",default=env("FRITZCTL_SERVER","fritz.box"),help="Server to connect to, defaults to fritz.box")
+    parser.add_argument("-p","--port",type=int,default=49000,help="Port to connect to, defaults to 49000")
+    parser.add_argument("-u","--user",default=env("FRITZCTL_USER"),help="Username")
+    parser.add_argument("--password",default=env("FRITZCTL_PASSWORD"),help="Password, preferably set via FRITZCTL_PASSWORD")
+    parser.add_argument("--https",action="store_true",help="Use HTTPS if supported by the server")
+    parser.add_argument("--timeout",type=float,default=2.0,help="Timeout of requests in seconds")
+    parser.add_argument("-f","--format",choices=FORMATS,default="json",help="Output format")
+    parser.add_argument("--socket",default=env("FRITZCTL_SOCKET"),help="Unix socket of a daemon to send commands to")
+    parser.add_argument("--batch",action="store_true",help="Read commands from standard input, one per line")
+    groups = parser.add_subparsers(dest="group",metavar="group")
+    subs = {}
+    for name,(func,help,arguments) in COMMANDS.items():
+        if "." in name:
+            group,cmd = name.split(".")
+            if group not in subs:
+                subs[group] = groups.add_parser(group,help="%s commands"%group).add_subparsers(dest="command",metavar="command")
+                subs[group].required = True
+            p = subs[group].add_parser(cmd,help=help,description=help)
+        else:
+            p = groups.add_parser(name,help=help,description=help)
+        for a,kw in arguments:
+            p.add_argument(*a,**kw)
+        p.set_defaults(cmd=name)
+    daemon = groups.add_parser("daemon",help="Keep sessions open and serve commands via a unix socket")
+    daemon.add_argument("--idle",type=float,default=600.0,help="Time in seconds after which unused sessions are closed")
+    daemon.set_defaults(cmd="daemon")
+    return parser
+
+def _commandArgs(args):
+    # Only the values needed for running a command, sent to the daemon
+    return {k:v for k,v in vars(args).items() if k not in ("socket","batch","group","command")}
+
+# Running commands
+
+def openSession(args):
+    """
+    Creates a session using the connection options of the parsed arguments.
+    
+    :param argparse.Namespace args: Parsed arguments
+    :rtype: fritzctl.session.Session
+    """
+    from .session import Session
+    return Session(server=args.server,port=args.port,user=args.user,pwd=args.password,
+                   timeout=args.timeout,https="auto" if args.https else False)
+
+def runCommand(session,args):
+    """
+    Runs the command selected by the parsed arguments.
+    
+    :param fritzctl.session.Session session: Session to use
+    :param argparse.Namespace args: Parsed arguments
+    :return: 2-tuple of the formatted result and the error message, which is ``None`` on success
+    :rtype: tuple
+    """
+    try:
+        result = COMMANDS[args.cmd][0](session,args)
+    except Exception as e:
+        return None,"%s: %s"%(type(e).__name__,e)
+    return formatResult(result,args.format),None
+
+class SessionPool(object):
+    """
+    Pool of open sessions, keyed by their connection options.
+    
+    Every session is only used by one thread at a time.
+    
+    :param float idle: Optional time in seconds after which unused sessions are closed, defaults to 10 minutes
+    
+    :ivar float idle: stores the supplied time
+    """
+    def __init__(self,idle=600.0):
+        self.idle = idle
+        self._sessions = {}
+        self._lock = threading.Lock()
+    def run(self,args):
+        """
+        Runs a command using a pooled session, see :py:func:`runCommand()`\ .
+        
+        :param argparse.Namespace args: Parsed arguments
+        :rtype: tuple
+        """
+        key = (args.server,args.port,args.user,args.password,args.https,args.timeout)
+        now = time.monotonic()
+        with self._lock:
+            for k,entry in list(self._sessions.items()):
+                if now-entry[2]>self.idle and not entry[1].locked():
+                    del self._sessions[k]
+                    if entry[0] is not None:
+                        entry[0].http.close()
+            if key not in self._sessions:
+                self._sessions[key] = [None,threading.Lock(),now]
+            entry = self._sessions[key]
+            entry[2] = now
+        with entry[1]:
+            if entry[0] is None:
+                try:
+                    entry[0] = openSession(args)
+                except Exception as e:
+                    return None,"%s: %s"%(type(e).__name__,e)
+            return runCommand(entry[0],args)
+
+def serve(path,idle=600.0):
+    """
+    Runs the daemon, serving commands via the given unix socket until interrupted.
+    
+    Every line received is a JSON object with the arguments of a command, every response is a JSON object with the keys ``output`` and ``error``\ .
+    
+    :param str path: Path of the unix socket, an existing socket is replaced
+    :param float idle: Optional time in seconds after which unused sessions are closed
+    """
+    import socketserver
+    pool = SessionPool(idle)
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    args = argparse.Namespace(**json.loads(line.decode("utf-8")))
+                    output,error = pool.run(args)
+                except Exception as e:
+                    output,error = None,"%s: %s"%(type(e).__name__,e)
+                self.wfile.write((json.dumps({"output":output,"error":error})+"\n").encode("utf-8"))
+                self.wfile.flush()
+    if os.path.exists(path):
+        os.unlink(path)
+    old = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path,Handler)
+    finally:
+        os.umask(old)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+class DaemonClient(object):
+    """
+    Client sending commands to a daemon started with ``fritzctl daemon``\ .
+    
+    :param str path: Path of the unix socket of the daemon
+    :raises OSError: if the daemon is not running
+    """
+    def __init__(self,path):
+        import socket
+        self.sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.file = self.sock.makefile("rwb")
+    def run(self,args):
+        """
+        Runs a command in the daemon, see :py:func:`runCommand()`\ .
+        
+        :param argparse.Namespace args: Parsed arguments
+        :rtype: tuple
+        """
+        self.file.write((json.dumps(_commandArgs(args))+"\n").encode("utf-8"))
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise OSError("Connection to the daemon closed")
+        resp = json.loads(line.decode("utf-8"))
+        return resp["output"],resp["error"]
+    def close(self):
+        """
+        Closes the connection to the daemon.
+        """
+        self.file.close()
+        self.sock.close()
+
+def _getRunner(args):
+    if args.socket and os.path.exists(args.socket):
+        try:
+            return DaemonClient(args.socket).run
+        except OSError:
+            pass
+    session = openSession(args)
+    return lambda a:runCommand(session,a)
+
+def main(argv=None):
+    """
+    Entry point of the ``fritzctl`` command.
+    
+    :param list argv: Optional command line arguments, defaults to :py:data:`sys.argv`
+    :return: Exit code, ``0`` on success
+    :rtype: int
+    """
+    parser = buildParser()
+    args = parser.parse_args(argv)
+    if getattr(args,"cmd",None)=="daemon":
+        if not args.socket:
+            parser.error("--socket or FRITZCTL_SOCKET is required for the daemon")
+        serve(os.path.expanduser(args.socket),args.idle)
+        return 0
+    if args.socket:
+        args.socket = os.path.expanduser(args.socket)
+    if not args.batch:
+        if getattr(args,"cmd",None) is None:
+            parser.error("a command is required")
+        try:
+            output,error = _getRunner(args)(args)
+        except Exception as e:
+            output,error = None,"%s: %s"%(type(e).__name__,e)
+        if error is not None:
+            sys.stderr.write("Error: %s\n"%error)
+            return 1
+        print(output)
+        return 0
+    # Batch mode, the options given on the command line apply to all commands
+    try:
+        run = _getRunner(args)
+    except Exception as e:
+        sys.stderr.write("Error: %s: %s\n"%(type(e).__name__,e))
+        return 1
+    code = 0
+    for line in sys.stdin:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            cmdargs = parser.parse_args(shlex.split(line),argparse.Namespace(**vars(args)))
+            output,error = run(cmdargs)
+        except SystemExit:
+            output,error = None,"Invalid command"
+        except Exception as e:
+            output,error = None,"%s: %s"%(type(e).__name__,e)
+        if error is not None:
+            code = 1
+        if args.format=="json":
+            out = {"command":line}
+            if error is None:
+                out["result"] = json.loads(output)
+            else:
+                out["error"] = error
+            print(json.dumps(out,sort_keys=True))
+        elif error is None:
+            print(output)
+            print()
+        else:
+            sys.stderr.write("Error in %r: %s\n"%(line,error))
+        sys.stdout.flush()
+    return code
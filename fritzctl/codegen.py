@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  codegen.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module for generating static wrappers from the SCPDs of a server.
+
+Generated wrappers contain one method per action with explicit arguments, slotted result classes with native types
+and precompiled request templates. They do not need the SCPDs at runtime, so they can be used with sessions created with ``loadscpd=False``\ ::
+
+   services = codegen.getServices(fritzctl.Session(user="admin",pwd="secret"))
+   codegen.dumpServices(services,"fritzbox.json")
+   codegen.generatePackage(codegen.loadServices("fritzbox.json"),"fritzgen")
+   
+   import fritzgen.general_deviceinfo
+   session = fritzctl.Session(user="admin",pwd="secret",loadscpd=False)
+   api = fritzgen.general_deviceinfo.API_general_deviceinfo(session)
+   print(api.GetInfo().NewUpTime)
+
+The services are described by a dictionary mapping Service Type URNs to dictionaries with the keys ``controlURL`` and ``actions``\ ,
+where ``actions`` has the same format as :py:attr:`simpletr64.DeviceTR64.deviceSCPD`\ .
+
+This module also contains the small runtime used by the generated wrappers.
+
+Note that this module is not imported automatically, use ``import fritzctl.codegen`` to access it.
+"""
+
+import json
+import keyword
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from . import dynapi
+from . import session as _session
+from .session import escape
+
+PYTHON_TYPES = {
+    "boolean":"bool",
+    "dateTime":"datetime.datetime",
+    }
+"""
+Dictionary mapping SCPD data types to the Python types used in generated wrappers, types not listed are ``str`` unless they are integer types.
+"""
+
+class GeneratedResult(object):
+    """
+    Base class of all generated result classes.
+    
+    Every output argument of the action is stored in an attribute of the same name, see :py:func:`getIdentifier()` for names that are not valid identifiers.
+    """
+    __slots__ = ()
+    def asDict(self):
+        """
+        Returns the values of all output arguments.
+        
+        :return: Dictionary mapping the attribute names to their values
+        :rtype: dict
+        """
+        return {k:getattr(self,k) for k in self.__slots__}
+    def __repr__(self):
+        return "<%s(%s)>"%(self.__class__.__name__,", ".join(["%s=%r"%(k,getattr(self,k)) for k in self.__slots__]))
+
+class GeneratedAPI(object):
+    """
+    Base class of all generated API classes.
+    
+    :param Session session: Session object this API should be bound to
+    :param str url: Optional Control URL, defaults to the Control URL found when generating the wrapper
+    
+    :ivar session: Same as the argument
+    :ivar str url: Control URL used for requests
+    """
+    URN = None
+    CONTROL_URL = None
+    def __init__(self,session,url=None):
+        self.session = session
+        self.url = url if url is not None else self.CONTROL_URL
+    def _call(self,action,body,timeout,kwargs):
+        return self.session.executePrepared(self.url,self.URN,action,body,timeout,kwargs)
+
+def encoder(name,dtype):
+    """
+    Returns a function validating values of the given argument and encoding them for use in a request template.
+    
+    See :py:meth:`ActionCodec.encode() <fritzctl.dynapi.ActionCodec.encode>` for the accepted values.
+    
+    :param str name: Name of the argument, used for error messages
+    :param str dtype: SCPD data type of the argument
+    :return: Callable taking a value and returning the escaped string
+    """
+    if dtype in dynapi.INT_RANGES:
+        return dynapi._encodeInt(name,dtype)
+    elif dtype=="boolean":
+        return dynapi._encodeBool(name)
+    elif dtype=="dateTime":
+        return lambda v:escape(dynapi._encodeDateTime(v))
+    return lambda v:escape(str(v))
+
+def decoder(dtype):
+    """
+    Returns a function converting values of the given data type to native types.
+    
+    Empty values stay ``None`` and values that cannot be converted are left unchanged, like in :py:meth:`ActionCodec.decode() <fritzctl.dynapi.ActionCodec.decode>`\ .
+    
+    :param str dtype: SCPD data type
+    :return: Callable taking a string or ``None``
+    """
+    dec = dynapi.ActionCodec("",{"outParameter":{"v":{"dataType":dtype}}})
+    def decode(v):
+        return dec.decode({"v":v})["v"]
+    return decode
+
+def parseSCPD(xml):
+    """
+    Parses an SCPD document, e.g. ``deviceinfoSCPD.xml``\ .
+    
+    :param bytes xml: Content of the SCPD document
+    :return: Dictionary mapping action names to their definitions, in the same format as :py:attr:`simpletr64.DeviceTR64.deviceSCPD`
+    :rtype: dict
+    :raises ValueError: if an argument refers to an undefined state variable
+    """
+    root = ET.fromstring(xml)
+    strip = lambda tag:tag.rsplit("}",1)[-1]
+    types = {}
+    actions = {}
+    for element in root.iter():
+        if strip(element.tag)=="stateVariable":
+            var = {strip(c.tag):c.text for c in element}
+            types[var.get("name")] = var.get("dataType","string")
+    for element in root.iter():
+        if strip(element.tag)!="action":
+            continue
+        action = {}
+        name = None
+        for child in element:
+            if strip(child.tag)=="name":
+                name = child.text
+            elif strip(child.tag)=="argumentList":
+                for arg in child:
+                    a = {strip(c.tag):c.text for c in arg}
+                    var = a.get("relatedStateVariable")
+                    if var not in types:
+                        raise ValueError("Argument %s refers to undefined state variable %s"%(a.get("name"),var))
+                    action.setdefault(a.get("direction","in")+"Parameter",{})[a.get("name")] = {"variable":var,"dataType":types[var]}
+        actions[name] = action
+    return actions
+
+def getServices(session):
+    """
+    Returns the descriptions of all services of the given session.
+    
+    :param Session session: Session with loaded SCPDs
+    :return: Dictionary describing the services, see the module documentation
+    :rtype: dict
+    """
+    return {urn:{"controlURL":session.device.getControlURL(urn),"actions":actions} for urn,actions in session.device.deviceSCPD.items()}
+
+def dumpServices(services,fname):
+    """
+    Writes the given service descriptions to a JSON file.
+    
+    :param dict services: Dictionary describing the services, e.g. as returned by :py:func:`getServices()`
+    :param str fname: Name of the file to write
+    """
+    with open(fname,"w") as f:
+        json.dump(services,f,indent=1)
+
+def loadServices(fname):
+    """
+    Reads service descriptions written by :py:func:`dumpServices()`\ .
+    
+    :param str fname: Name of the file to read
+    :return: Dictionary describing the services
+    :rtype: dict
+    """
+    with open(fname,"r") as f:
+        return json.load(f)
+
+def getModuleName(urn):
+    """
+    Returns the name of the module generated for the given URN.
+    
+    The user-friendly name from :py:data:`NAME_TO_URN <fritzctl.session.NAME_TO_URN>` is used if available,
+    else the name is derived from the URN, e.g. ``x_avm_de_foo_1`` for ``urn:dslforum-org:service:X_AVM-DE_Foo:1``\ .
+    Both are passed through :py:func:`getIdentifier()`\ , e.g. ``net_wlan_2_4ghz`` is used for ``net_wlan_2.4ghz``\ .
+    
+    :param str urn: Service Type URN
+    :rtype: str
+    """
+    for name,u in _session.NAME_TO_URN.items():
+        if u==urn:
+            return getIdentifier(name)
+    return getIdentifier("_".join(urn.split(":")[-2:]).lower())
+
+def getIdentifier(name):
+    """
+    Returns a valid Python identifier for the given action or argument name, e.g. ``X_AVM_DE_GetInfo`` for ``X_AVM-DE_GetInfo``\ .
+    
+    :param str name: Name of the action or argument
+    :rtype: str
+    """
+    ident = re.sub(r"\W","_",name)
+    if ident[:1].isdigit():
+        ident = "_"+ident
+    if keyword.iskeyword(ident) or ident in ("self","timeout"):
+        ident+="_"
+    return ident
+
+def _getPythonType(dtype):
+    if dtype in dynapi.INT_RANGES:
+        return "int"
+    return PYTHON_TYPES.get(dtype,"str")
+
+def generateModule(urn,service):
+    """
+    Generates the source code of a wrapper module for a single service.
+    
+    The module contains the constants ``URN`` and ``CONTROL_URL``\ , one result class per action with output arguments
+    and an API class named like the module with the prefix ``API_``\ , e.g. ``API_general_deviceinfo``\ .
+    
+    :param str urn: Service Type URN of the service
+    :param dict service: Description of the service with the keys ``controlURL`` and ``actions``
+    :return: Source code of the module
+    :rtype: str
+    """
+    modname = getModuleName(urn)
+    encoders = {}
+    decoders = {}
+    templates = []
+    results = []
+    methods = []
+    for action,definition in sorted(service["actions"].items()):
+        ins = definition.get("inParameter",{})
+        outs = definition.get("outParameter",{})
+        ident = getIdentifier(action)
+        params = [(name,getIdentifier(name),arg.get("dataType","string")) for name,arg in ins.items()]
+        # The envelope is filled in now, only the values of the arguments are inserted at runtime
+        args = "".join(["<%s>%%s</%s>"%(name,name) for name,_,_ in params])
+        body = (_session.SOAP_ENVELOPE.replace("%(args)s","\0")%{"action":action,"urn":urn}).replace("%","%%").replace("\0",args)
+        templates.append("_T_%s = %r"%(ident,body))
+        for name,_,dtype in params:
+            encoders.setdefault((name,dtype),"_e%d"%len(encoders))
+        lines = []
+        lines.append("    def %s(self%s):"%(ident,"".join([",%s"%p for _,p,_ in params])+",timeout=None"))
+        lines.append('        """')
+        lines.append("        Executes ``%s``\\ ."%action)
+        lines.append("        ")
+        for name,p,dtype in params:
+            lines.append("        :param %s %s: ``%s`` argument ``%s``"%(_getPythonType(dtype),p,dtype,name))
+        lines.append("        :param float timeout: Optional timeout, see :py:meth:`Session.execute() <fritzctl.session.Session.execute>`")
+        if outs:
+            resname = ident+"Result"
+            lines.append("        :rtype: %s"%resname)
+        lines.append('        """')
+        values = ",".join(["%s(%s)"%(encoders[(name,dtype)],p) for name,p,dtype in params])+("," if len(params)==1 else "")
+        call = "self._call(%r,_T_%s%%(%s),timeout,{%s})"%(action,ident,values,",".join(["%r:%s"%(name,p) for name,p,_ in params]))
+        if outs:
+            lines.append("        return %s(%s)"%(resname,call))
+            res = []
+            res.append("class %s(_rt.GeneratedResult):"%resname)
+            res.append('    """')
+            res.append("    Result of ``%s``\\ ."%action)
+            res.append("    ")
+            for name,arg in outs.items():
+                dtype = arg.get("dataType","string")
+                res.append("    :ivar %s %s: ``%s`` argument ``%s``"%(_getPythonType(dtype),getIdentifier(name),dtype,name))
+            res.append('    """')
+            res.append("    __slots__ = (%s)"%"".join(["%r,"%getIdentifier(name) for name in outs]))
+            res.append("    def __init__(self,data):")
+            for name,arg in outs.items():
+                dtype = arg.get("dataType","string")
+                if _getPythonType(dtype)=="str":
+                    res.append("        self.%s = data.get(%r)"%(getIdentifier(name),name))
+                else:
+                    decoders.setdefault(dtype,"_d_"+getIdentifier(dtype))
+                    res.append("        self.%s = %s(data.get(%r))"%(getIdentifier(name),decoders[dtype],name))
+            results.append("\n".join(res))
+        else:
+            lines.append("        %s"%call)
+        methods.append("\n".join(lines))
+    out = []
+    out.append("#!/usr/bin/env python")
+    out.append("# -*- coding: utf-8 -*-")
+    out.append("#")
+    out.append("#  %s.py"%modname)
+    out.append("#")
+    out.append("#  Generated by fritzctl.codegen, do not edit.")
+    out.append("#")
+    out.append('"""')
+    out.append("Generated wrapper for ``%s``\\ ."%urn)
+    out.append('"""')
+    out.append("")
+    out.append("from fritzctl import codegen as _rt")
+    out.append("")
+    out.append("URN = %r"%urn)
+    out.append("CONTROL_URL = %r"%service["controlURL"])
+    out.append("")
+    for (name,dtype),var in sorted(encoders.items(),key=lambda i:int(i[1][2:])):
+        out.append("%s = _rt.encoder(%r,%r)"%(var,name,dtype))
+    for dtype,var in sorted(decoders.items()):
+        out.append("%s = _rt.decoder(%r)"%(var,dtype))
+    out.append("")
+    out.extend(templates)
+    out.append("")
+    for res in results:
+        out.append(res)
+        out.append("")
+    out.append("class API_%s(_rt.GeneratedAPI):"%modname)
+    out.append('    """')
+    out.append("    Generated wrapper for ``%s``\\ ."%urn)
+    out.append("    ")
+    out.append("    Same parameters and attributes as :py:class:`fritzctl.codegen.GeneratedAPI()`\\ .")
+    out.append('    """')
+    out.append("    URN = URN")
+    out.append("    CONTROL_URL = CONTROL_URL")
+    out.extend(methods)
+    out.append("")
+    return "\n".join(out)
+
+def generatePackage(services,dest):
+    """
+    Generates a package containing one wrapper module per service.
+    
+    The ``__init__.py`` of the package contains the dictionary ``MODULES`` mapping the Service Type URNs to the names of the modules.
+    Existing modules in the package are overwritten.
+    
+    :param dict services: Dictionary describing the services, see the module documentation
+    :param str dest: Directory of the package, created if it does not exist
+    :return: List of the names of the generated modules
+    :rtype: list
+    """
+    os.makedirs(dest,exist_ok=True)
+    modules = {}
+    for urn,service in sorted(services.items()):
+        modname = getModuleName(urn)
+        modules[urn] = modname
+        with open(os.path.join(dest,modname+".py"),"w") as f:
+            f.write(generateModule(urn,service))
+    with open(os.path.join(dest,"__init__.py"),"w") as f:
+        f.write('"""\nWrappers generated by fritzctl.codegen, do not edit.\n"""\n\nMODULES = {\n')
+        for urn,modname in sorted(modules.items()):
+            f.write("    %r:%r,\n"%(urn,modname))
+        f.write("    }\n")
+    return sorted(modules.values())
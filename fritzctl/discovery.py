@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  discovery.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module for discovering servers in the local network via SSDP.
+
+The locations found can be passed directly to :py:class:`Session() <fritzctl.session.Session>`\ ::
+
+   for device in discovery.discover():
+       session = fritzctl.Session(location=device.location,user="admin",pwd="secret")
+
+Results are cached, see :py:class:`DiscoveryCache()`\ .
+
+Note that this module is not imported automatically, use ``import fritzctl.discovery`` to access it.
+"""
+
+import select
+import socket
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+SSDP_ADDR = ("239.255.255.250",1900)
+"""
+Multicast address and port used for SSDP.
+"""
+
+TR64_ST = "urn:dslforum-org:device:InternetGatewayDevice:1"
+"""
+Search target of TR64 capable servers, their locations point to ``tr64desc.xml``\ .
+"""
+
+MSEARCH = "\r\n".join([
+    "M-SEARCH * HTTP/1.1",
+    "HOST: %(host)s:%(port)d",
+    'MAN: "ssdp:discover"',
+    "MX: %(mx)d",
+    "ST: %(st)s",
+    "",""])
+
+class DiscoveredDevice(object):
+    """
+    Single server found via SSDP.
+    
+    :param dict headers: Headers of the SSDP response, with lowercase names; automatically passed to :py:meth:`loadData()`
+    
+    :ivar dict headers: stores the supplied headers
+    :ivar str location: URL of the device description, e.g. ``http://192.168.178.1:49000/tr64desc.xml``
+    :ivar str host: Hostname or IP Address taken from the location
+    :ivar int port: Port taken from the location
+    :ivar str st: Search target the server responded to
+    :ivar str usn: Unique service name of the server
+    :ivar str server: Server header, usually containing the firmware version
+    :ivar int maxage: Time in seconds the server asks the response to be cached for, ``0`` if not given
+    """
+    def __init__(self,headers):
+        self.headers = headers
+        self.loadData(headers)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied headers.
+        This method is automatically called upon construction with the supplied headers.
+        """
+        self.location = data["location"]
+        u = urlsplit(self.location)
+        self.host = u.hostname
+        self.port = u.port or (443 if u.scheme=="https" else 80)
+        self.st = data.get("st","")
+        self.usn = data.get("usn","")
+        self.server = data.get("server","")
+        self.maxage = 0
+        for part in data.get("cache-control","").split(","):
+            k,_,v = part.strip().partition("=")
+            if k.lower()=="max-age" and v.strip().isdigit():
+                self.maxage = int(v.strip())
+    def __repr__(self):
+        return "<DiscoveredDevice(%s)>"%self.location
+
+def parseResponse(data):
+    """
+    Parses an SSDP response or notification.
+    
+    :param bytes data: Raw datagram
+    :return: Dictionary mapping lowercase header names to their values, or ``None`` if the datagram is not a valid response
+    :rtype: dict or None
+    """
+    lines = data.decode("utf-8","replace").split("\r\n")
+    if not (lines[0].startswith("HTTP/1.1 200") or lines[0].startswith("NOTIFY")):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        k,sep,v = line.partition(":")
+        if sep:
+            headers[k.strip().lower()] = v.strip()
+    if "location" not in headers:
+        return None
+    return headers
+
+def search(st=TR64_ST,timeout=2.0,addr=SSDP_ADDR,retransmit=2,bind=""):
+    """
+    Sends SSDP M-SEARCH requests and collects all responses until the timeout expires.
+    
+    Responses of all servers are collected in parallel on a single socket, so the time taken only depends on the timeout.
+    The request is sent ``retransmit`` times, as SSDP uses UDP and packets may be lost.
+    
+    :param str st: Optional search target, defaults to :py:data:`TR64_ST`
+    :param float timeout: Optional time in seconds to wait for responses, defaults to 2 seconds
+    :param tuple addr: Optional address to send the requests to, defaults to :py:data:`SSDP_ADDR`
+    :param int retransmit: Optional number of requests to send, defaults to 2
+    :param str bind: Optional local address to send from, defaults to all addresses
+    :return: List of :py:class:`DiscoveredDevice()` instances, one per location, in the order the responses arrived
+    :rtype: list
+    """
+    assert retransmit>0
+    msg = (MSEARCH%{"host":addr[0],"port":addr[1],"mx":max(1,int(timeout)),"st":st}).encode("ascii")
+    sock = socket.socket(socket.AF_INET,socket.SOCK_DGRAM,socket.IPPROTO_UDP)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP,socket.IP_MULTICAST_TTL,2)
+        sock.bind((bind,0))
+        sock.setblocking(False)
+        deadline = time.monotonic()+timeout
+        # Spread the retransmissions over the first half of the timeout
+        sends = [time.monotonic()+i*timeout/(2.*retransmit) for i in range(retransmit)]
+        found = {}
+        while True:
+            now = time.monotonic()
+            while sends and sends[0]<=now:
+                sends.pop(0)
+                try:
+                    sock.sendto(msg,addr)
+                except OSError:
+                    pass
+            if now>=deadline:
+                break
+            wait = deadline-now if not sends else min(deadline,sends[0])-now
+            r,_,_ = select.select([sock],[],[],max(0,wait))
+            if not r:
+                continue
+            try:
+                data,_ = sock.recvfrom(65507)
+            except OSError:
+                continue
+            headers = parseResponse(data)
+            if headers is None or (st!="ssdp:all" and headers.get("st",st)!=st):
+                continue
+            if headers["location"] not in found:
+                found[headers["location"]] = DiscoveredDevice(headers)
+        return list(found.values())
+    finally:
+        sock.close()
+
+class DiscoveryCache(object):
+    """
+    Cache for discovery results.
+    
+    Results are kept for ``ttl`` seconds, or shorter if a server asks for a shorter time via ``CACHE-CONTROL``\ .
+    
+    :param float ttl: Optional maximum time in seconds to keep results, defaults to 5 minutes
+    
+    :ivar float ttl: stores the supplied time
+    """
+    def __init__(self,ttl=300.0):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+    def discover(self,st=TR64_ST,timeout=2.0,addr=SSDP_ADDR,refresh=False):
+        """
+        Returns the cached results for the given search target or searches again if they expired.
+        
+        See :py:func:`search()` for the parameters.
+        
+        :param bool refresh: Optional Flag if the search should be repeated even if cached results are available, defaults to False
+        :return: List of :py:class:`DiscoveredDevice()` instances
+        :rtype: list
+        """
+        key = (st,tuple(addr))
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and not refresh and time.monotonic()<entry[0]:
+                return list(entry[1])
+        devices = search(st,timeout,addr)
+        ttl = min([self.ttl]+[d.maxage for d in devices if d.maxage>0])
+        with self._lock:
+            self._cache[key] = (time.monotonic()+ttl,devices)
+        return list(devices)
+    def clear(self):
+        """
+        Discards all cached results.
+        """
+        with self._lock:
+            self._cache.clear()
+
+_cache = DiscoveryCache()
+
+def discover(st=TR64_ST,timeout=2.0,addr=SSDP_ADDR,refresh=False):
+    """
+    Discovers servers using a module-wide :py:class:`DiscoveryCache()`\ .
+    
+    See :py:meth:`DiscoveryCache.discover()` for the parameters.
+    
+    :return: List of :py:class:`DiscoveredDevice()` instances
+    :rtype: list
+    """
+    return _cache.discover(st,timeout,addr,refresh)
+
+class SSDPResponder(object):
+    """
+    Minimal SSDP responder answering M-SEARCH requests, e.g. for testing discovery without a server.
+    
+    By default the responder only listens on the loopback interface on a random port,
+    pass :py:attr:`addr` as the address to :py:func:`search()` or :py:func:`discover()` to use it.
+    
+    :param str location: Location to announce
+    :param str st: Optional search target to respond to, defaults to :py:data:`TR64_ST`
+    :param str bind: Optional address to listen on, defaults to ``127.0.0.1``
+    :param int port: Optional port to listen on, defaults to a random free port
+    :param bool multicast: Optional Flag if the SSDP multicast group should be joined, requires port 1900, defaults to False
+    :param int maxage: Optional time in seconds clients may cache the response, defaults to 1800
+    
+    :ivar str location: stores the supplied location
+    :ivar str st: stores the supplied search target
+    :ivar tuple addr: Address and port the responder is listening on, only valid after :py:meth:`start()`
+    :ivar int requests: Number of M-SEARCH requests answered
+    """
+    def __init__(self,location,st=TR64_ST,bind="127.0.0.1",port=0,multicast=False,maxage=1800):
+        self.location = location
+        self.st = st
+        self.bind = bind
+        self.port = port
+        self.multicast = multicast
+        self.maxage = maxage
+        self.addr = None
+        self.requests = 0
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+    def start(self):
+        """
+        Starts responding in a background thread.
+        """
+        sock = socket.socket(socket.AF_INET,socket.SOCK_DGRAM,socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
+        sock.bind((self.bind,self.port))
+        if self.multicast:
+            mreq = socket.inet_aton(SSDP_ADDR[0])+socket.inet_aton("0.0.0.0")
+            sock.setsockopt(socket.IPPROTO_IP,socket.IP_ADD_MEMBERSHIP,mreq)
+        self._sock = sock
+        self.addr = sock.getsockname()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,name="fritzctl-ssdpresponder",daemon=True)
+        self._thread.start()
+    def stop(self):
+        """
+        Stops responding and waits for the background thread to finish.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+    def _run(self):
+        while not self._stop.is_set():
+            r,_,_ = select.select([self._sock],[],[],0.1)
+            if not r:
+                continue
+            try:
+                data,peer = self._sock.recvfrom(65507)
+            except OSError:
+                continue
+            lines = data.decode("utf-8","replace").split("\r\n")
+            if not lines[0].startswith("M-SEARCH"):
+                continue
+            st = ""
+            for line in lines[1:]:
+                k,_,v = line.partition(":")
+                if k.strip().lower()=="st":
+                    st = v.strip()
+            if st not in (self.st,"ssdp:all"):
+                continue
+            resp = "\r\n".join([
+                "HTTP/1.1 200 OK",
+                "CACHE-CONTROL: max-age=%d"%self.maxage,
+                "EXT:",
+                "LOCATION: %s"%self.location,
+                "SERVER: fritzctl SSDPResponder UPnP/1.0",
+                "ST: %s"%self.st,
+                "USN: uuid:fritzctl-%d::%s"%(id(self),self.st),
+                "",""])
+            self.requests+=1
+            try:
+                self._sock.sendto(resp.encode("utf-8"),peer)
+            except OSError:
+                pass
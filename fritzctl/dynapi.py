@@ -22,6 +22,132 @@
 #  
 #  
 
+import datetime
+
+INT_RANGES = {
+    "ui1":(0,2**8-1),
+    "ui2":(0,2**16-1),
+    "ui4":(0,2**32-1),
+    "i1":(-2**7,2**7-1),
+    "i2":(-2**15,2**15-1),
+    "i4":(-2**31,2**31-1),
+    }
+"""
+Dictionary mapping the integer data types of SCPD state variables to their inclusive ``(min,max)`` range.
+"""
+
+_TRUE = ("1","true","yes")
+_FALSE = ("0","false","no")
+
+def _encodeInt(name,dtype):
+    lo,hi = INT_RANGES[dtype]
+    def encode(v):
+        try:
+            i = int(v)
+        except (TypeError,ValueError):
+            raise ValueError("Argument %s must be of type %s, got %r"%(name,dtype,v))
+        if not lo<=i<=hi:
+            raise ValueError("Argument %s must be between %d and %d, got %d"%(name,lo,hi,i))
+        return str(i)
+    return encode
+
+def _encodeBool(name):
+    def encode(v):
+        if isinstance(v,str):
+            v = v.lower()
+            if v in _TRUE:
+                return "1"
+            elif v in _FALSE:
+                return "0"
+        elif v in (True,False):
+            return "1" if v else "0"
+        raise ValueError("Argument %s must be of type boolean, got %r"%(name,v))
+    return encode
+
+def _encodeDateTime(v):
+    if isinstance(v,(datetime.datetime,datetime.date)):
+        return v.isoformat()
+    return str(v)
+
+def _decodeBool(v):
+    return v=="1" or v.lower()=="true"
+
+class ActionCodec(object):
+    """
+    Codec for the arguments of a single action, compiled from the data types of the related state variables in the SCPD.
+    
+    Codecs are created and cached by :py:meth:`Session.getCodec() <fritzctl.session.Session.getCodec>`\ , they should not need to be created manually.
+    
+    Supported data types are ``ui1``\ , ``ui2``\ , ``ui4``\ , ``i1``\ , ``i2``\ , ``i4``\ , ``boolean`` and ``dateTime``\ ,
+    all other data types, e.g. ``string`` or ``uuid``\ , are passed through as strings.
+    
+    :param str action: Name of the action
+    :param dict definition: Definition of the action as found in :py:attr:`simpletr64.DeviceTR64.deviceSCPD`
+    
+    :ivar str action: stores the supplied action name
+    :ivar dict intypes: Dictionary mapping the names of all input arguments to their data types
+    :ivar dict outtypes: Dictionary mapping the names of all output arguments to their data types
+    """
+    def __init__(self,action,definition):
+        self.action = action
+        self.intypes = {k:v.get("dataType","string") for k,v in definition.get("inParameter",{}).items()}
+        self.outtypes = {k:v.get("dataType","string") for k,v in definition.get("outParameter",{}).items()}
+        self._encoders = {}
+        for name,dtype in self.intypes.items():
+            if dtype in INT_RANGES:
+                self._encoders[name] = _encodeInt(name,dtype)
+            elif dtype=="boolean":
+                self._encoders[name] = _encodeBool(name)
+            elif dtype=="dateTime":
+                self._encoders[name] = _encodeDateTime
+            else:
+                self._encoders[name] = str
+        self._decoders = {}
+        for name,dtype in self.outtypes.items():
+            if dtype in INT_RANGES:
+                self._decoders[name] = int
+            elif dtype=="boolean":
+                self._decoders[name] = _decodeBool
+            elif dtype=="dateTime":
+                self._decoders[name] = datetime.datetime.fromisoformat
+    def encode(self,kwargs):
+        """
+        Validates the given arguments and converts them to the strings sent to the server.
+        
+        Booleans may be given as :py:class:`bool`\ , ``0``\ , ``1`` or one of the strings ``"0"``\ , ``"1"``\ , ``"true"``\ , ``"false"``\ , ``"yes"`` and ``"no"``\ .
+        Integers may be given as :py:class:`int` or numeric strings and are checked against the range of their data type.
+        
+        :param dict kwargs: Dictionary mapping argument names to values
+        :return: Dictionary mapping argument names to encoded values
+        :rtype: dict
+        :raises ValueError: if an argument is unknown or its value does not match its data type
+        """
+        encoders = self._encoders
+        out = {}
+        for k,v in kwargs.items():
+            if k not in encoders:
+                raise ValueError("Unknown argument %s for action %s, expected one of %s"%(k,self.action,", ".join(sorted(encoders)) or "none"))
+            out[k] = encoders[k](v)
+        return out
+    def decode(self,data):
+        """
+        Converts the output arguments returned by the server to native types in-place.
+        
+        Integer types are converted to :py:class:`int`\ , ``boolean`` to :py:class:`bool` and ``dateTime`` to :py:class:`datetime.datetime`\ .
+        Empty values stay ``None`` and values that cannot be converted are left unchanged.
+        
+        :param dict data: Dictionary as returned by :py:meth:`Session.execute() <fritzctl.session.Session.execute>`
+        :return: The same dictionary
+        :rtype: dict
+        """
+        for k,dec in self._decoders.items():
+            v = data.get(k)
+            if v is not None:
+                try:
+                    data[k] = dec(v)
+                except ValueError:
+                    pass
+        return data
 
 class DynamicAPI(object):
     """
@@ -32,28 +158,48 @@ class DynamicAPI(object):
     
     If you need to pass an argument that is not a valid Python identifier, use this trick: ``api.MyAPIMethod(**{"Some-Strange-Name":"Value"})``\ .
     
+    Arguments are validated and encoded according to the data types defined in the SCPD before being sent, see :py:class:`ActionCodec()`\ .
+    Unknown arguments and invalid values raise a :py:exc:`ValueError` without contacting the server.
+    If ``typed`` is set, the results are converted to native types as well, e.g. ``ui4`` values to :py:class:`int`\ .
+    
     :param Session session: :py:class:`Session()` object used for requests
     :param str urn: Service Type URN to be wrapped by this instance
+    :param bool typed: Optional Flag if results should be converted to native types, defaults to False
     
     :ivar session: Stored session object
     :ivar urn: Stored URN for requests
     :ivar url: Action URL for requests, specific to the URN
+    :ivar typed: Stored flag for converting results
     """
-    def __init__(self,session,urn):
+    def __init__(self,session,urn,typed=False):
         self.session = session
         self.urn = urn
+        self.typed = typed
         self.url = self.session.device.getControlURL(self.urn)
-        methods = self.session.device.deviceSCPD[self.urn]
+        methods = self.session.device.deviceSCPD.get(self.urn,{})
 
         def _apiMethod(self, method):
             def callAPI(*args, **kwargs):
-                return self.session.execute(self.url, self.urn, method, *args, **kwargs)
+                return self.callAPI(method, *args, **kwargs)
             return callAPI
         for method in methods:
             setattr(self, method, _apiMethod(self, method))
 
+    def __getattr__(self,name):
+        # Only reached for actions not defined in the SCPD, resolve them on access if the SCPD has not been loaded
+        if name.startswith("_") or "session" not in self.__dict__ or self.urn in self.session.device.deviceSCPD:
+            raise AttributeError(name)
+        return lambda *args,**kwargs:self.callAPI(name,*args,**kwargs)
+
     def callAPI(self,action,*args,**kwargs):
         """
         Fallback to use if the API action is not a valid Python identifier or was added after the session was initialized.
+        
+        Arguments of actions not found in the SCPD are passed through unchecked.
         """
-        return self.session.execute(self.url,self.urn,action,*args,**kwargs)
+        timeout = kwargs.pop("timeout",None)
+        codec = self.session.getCodec(self.urn,action)
+        if codec is None:
+            return self.session.execute(self.url,self.urn,action,*args,timeout=timeout,**kwargs)
+        out = self.session.execute(self.url,self.urn,action,*args,timeout=timeout,**codec.encode(kwargs))
+        return codec.decode(out) if self.typed else out
@@ -0,0 +1,449 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  exporter.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module for exporting metrics of a server in the Prometheus or OpenMetrics text format.
+
+Every metric in :py:data:`METRICS` can be extracted from one or more data sources in :py:data:`SOURCES`\ ,
+e.g. the WAN byte counters are returned both by ``GetAddonInfos`` and by ``GetTotalBytesSent``\ /``GetTotalBytesReceived``\ .
+When an :py:class:`Exporter()` is created, a :py:class:`ScrapePlan()` selects the sources covering all requested metrics with the fewest requests.
+Every scrape then fetches the selected sources concurrently, reusing cached data of slow-changing sources like the device information::
+
+   exporter = fritzctl.exporter.Exporter(session)
+   server = fritzctl.exporter.MetricsServer(exporter,port=9133)
+   server.start()
+
+Note that this module is not imported automatically, use ``import fritzctl.exporter`` to access it.
+"""
+
+import threading
+import time
+
+from .ooapi import base
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+"""
+Content type of the Prometheus text format.
+"""
+CONTENT_TYPE_OPENMETRICS = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+"""
+Content type of the OpenMetrics text format.
+"""
+
+class Source(object):
+    """
+    Data source, usually a single action or bulk download.
+    
+    :param str name: Name of the source
+    :param str api: Name of the API required, see :py:data:`NAME_TO_URN <fritzctl.session.NAME_TO_URN>`
+    :param fetch: Callable taking the session and returning the data
+    :param float ttl: Optional time in seconds the data may be cached for, defaults to 0
+    :param int cost: Optional number of requests needed for fetching the data, defaults to 1
+    
+    :ivar str name: stores the supplied name
+    :ivar str api: stores the supplied API name
+    :ivar fetch: stores the supplied callable
+    :ivar float ttl: stores the supplied time
+    :ivar int cost: stores the supplied cost
+    """
+    def __init__(self,name,api,fetch,ttl=0,cost=1):
+        self.name = name
+        self.api = api
+        self.fetch = fetch
+        self.ttl = ttl
+        self.cost = cost
+    def isAvailable(self,session):
+        """
+        Checks if the API required by this source is provided by the server.
+        
+        :param Session session: Session to check
+        :rtype: bool
+        """
+        from .session import NAME_TO_URN
+        return NAME_TO_URN[self.api] in session.urns
+    def __repr__(self):
+        return "<Source(%s)>"%self.name
+
+class Metric(object):
+    """
+    Metric that can be extracted from one or more sources.
+    
+    Extractors are called with the data of the source and its age in seconds and return a list of ``(labels,value)`` tuples.
+    
+    Several metrics may share a name if they have different keys, e.g. one per WLAN band.
+    Each of them is planned separately, their samples are exported as a single metric family.
+    
+    :param str name: Name of the metric
+    :param str type: Type of the metric, either ``gauge`` or ``counter``
+    :param str help: Description of the metric
+    :param dict extract: Dictionary mapping source names to extractors, ordered by preference
+    :param str key: Optional unique key of the metric, defaults to the name
+    
+    :ivar str name: stores the supplied name
+    :ivar str type: stores the supplied type
+    :ivar str help: stores the supplied description
+    :ivar dict extract: stores the supplied extractors
+    :ivar str key: stores the supplied key
+    """
+    def __init__(self,name,type,help,extract,key=None):
+        self.name = name
+        self.type = type
+        self.help = help
+        self.extract = extract
+        self.key = key if key is not None else name
+    def __repr__(self):
+        return "<Metric(%s)>"%self.key
+
+def _wlanInfo(band):
+    return lambda s:s.getAPI("net_wlan_"+band).GetInfo()
+
+def _wlanAssociations(band):
+    return lambda s:int(s.getAPI("net_wlan_"+band).GetTotalAssociations()["NewTotalAssociations"])
+
+SOURCES = {s.name:s for s in [
+    Source("deviceinfo","general_deviceinfo",lambda s:s.getOOAPI("general_deviceinfo").getDeviceInfo(log=False),ttl=300),
+    Source("addoninfo","net_wan_commoninterfacecfg",lambda s:s.getOOAPI("net_wan_commoninterfacecfg").getAddonInfos()),
+    Source("bytessent","net_wan_commoninterfacecfg",lambda s:s.getOOAPI("net_wan_commoninterfacecfg").getTotalBytesSent()),
+    Source("bytesreceived","net_wan_commoninterfacecfg",lambda s:s.getOOAPI("net_wan_commoninterfacecfg").getTotalBytesReceived()),
+    Source("linkproperties","net_wan_commoninterfacecfg",lambda s:s.getOOAPI("net_wan_commoninterfacecfg").getLinkProperties(),ttl=60),
+    Source("dslinfo","net_wan_dslinterfacecfg",lambda s:s.getOOAPI("net_wan_dslinterfacecfg").getInfo(),ttl=30),
+    Source("hosts","general_hosts",lambda s:s.getOOAPI("general_hosts").getHostTable(),ttl=10,cost=2),
+    Source("homeauto","avm_homeauto",lambda s:s.getOOAPI("avm_homeauto").getDeviceList(),ttl=10,cost=10),
+    ]+[Source("wlan_"+band,"net_wlan_"+band,_wlanInfo(band),ttl=300) for band in ("2.4ghz","2nd","3rd")
+    ]+[Source("wlanassoc_"+band,"net_wlan_"+band,_wlanAssociations(band)) for band in ("2.4ghz","2nd","3rd")
+    ]}
+"""
+Dictionary mapping names to all known :py:class:`Source()` instances.
+
+The TTLs can be overridden per exporter, see :py:class:`Exporter()`\ .
+"""
+
+def _one(value,**labels):
+    return [(labels,value)]
+
+def _wlanMetrics(name,type,help,kind,value,labels=lambda d:{}):
+    # One metric per band, as every band needs its own source
+    return [Metric(name,type,help,{kind+band:(lambda b:lambda d,age:_one(value(d),band=b,**labels(d)))(band)},key="%s:%s"%(name,band))
+            for band in ("2.4ghz","2nd","3rd")]
+
+def _homeauto(flag,func):
+    return lambda devices,age:[({"ain":d.ain,"name":d.name},func(d)) for d in devices if getattr(d,flag)]
+
+METRICS = [
+    Metric("fritz_info","gauge","Information about the device, always 1",
+           {"deviceinfo":lambda d,age:_one(1,model=d.modelname,version=d.swversion,serial=d.serialnumber)}),
+    # The uptime is cached for a long time, it is extrapolated instead of fetched every scrape
+    Metric("fritz_uptime_seconds","gauge","Uptime of the device",
+           {"deviceinfo":lambda d,age:_one(d.uptime+int(age))}),
+    Metric("fritz_wan_bytes_sent_total","counter","Total number of bytes sent via the WAN",
+           {"addoninfo":lambda d,age:_one(d.bytes_sent64 if d.bytes_sent64 is not None else d.bytes_sent),
+            "bytessent":lambda d,age:_one(d)}),
+    Metric("fritz_wan_bytes_received_total","counter","Total number of bytes received via the WAN",
+           {"addoninfo":lambda d,age:_one(d.bytes_received64 if d.bytes_received64 is not None else d.bytes_received),
+            "bytesreceived":lambda d,age:_one(d)}),
+    Metric("fritz_wan_rate_bytes","gauge","Current WAN traffic in bytes/s, as computed by the device",
+           {"addoninfo":lambda d,age:[({"direction":"up"},d.rate_sent),({"direction":"down"},d.rate_received)]}),
+    Metric("fritz_wan_link_up","gauge","Flag if the physical WAN link is up",
+           {"linkproperties":lambda d,age:_one(int(d.status=="Up"),accesstype=d.accesstype)}),
+    Metric("fritz_wan_max_rate_bits","gauge","Maximum bitrate of the physical WAN link",
+           {"linkproperties":lambda d,age:[({"direction":"up"},d.maxrate_up),({"direction":"down"},d.maxrate_down)]}),
+    Metric("fritz_dsl_sync_rate_kbits","gauge","Current DSL sync rate",
+           {"dslinfo":lambda d,age:[({"direction":"up"},d.rate_up),({"direction":"down"},d.rate_down)]}),
+    Metric("fritz_dsl_noise_margin_db","gauge","DSL noise margin",
+           {"dslinfo":lambda d,age:[({"direction":"up"},d.snr_up),({"direction":"down"},d.snr_down)]}),
+    Metric("fritz_dsl_attenuation_db","gauge","DSL attenuation",
+           {"dslinfo":lambda d,age:[({"direction":"up"},d.attenuation_up),({"direction":"down"},d.attenuation_down)]}),
+    Metric("fritz_hosts","gauge","Number of known hosts",
+           {"hosts":lambda d,age:[({"state":"active"},sum(1 for h in d if h.active)),({"state":"inactive"},sum(1 for h in d if not h.active))]}),
+    Metric("fritz_host_active","gauge","Flag if a host is active",
+           {"hosts":lambda d,age:[({"mac":h.mac,"ip":h.ip or "","hostname":h.hostname or ""},int(h.active)) for h in d]}),
+    ]+_wlanMetrics("fritz_wlan_info","gauge","Information about a WLAN, always 1","wlan_",
+                   lambda d:1,lambda d:{"ssid":d.get("NewSSID") or "","channel":d.get("NewChannel") or "","status":d.get("NewStatus") or ""}
+    )+_wlanMetrics("fritz_wlan_enabled","gauge","Flag if a WLAN is enabled","wlan_",
+                   lambda d:int(d["NewEnable"]=="1")
+    )+_wlanMetrics("fritz_wlan_associations","gauge","Number of devices associated with a WLAN","wlanassoc_",
+                   lambda d:d
+    )+[
+    Metric("fritz_homeauto_present","gauge","Connection state of a smart home device, see fritzctl.ooapi.avm_homeauto.PresentEnum2INT",
+           {"homeauto":lambda devices,age:[({"ain":d.ain,"name":d.name},d.present) for d in devices]}),
+    Metric("fritz_homeauto_power_watts","gauge","Power flowing through a smart home device",
+           {"homeauto":_homeauto("energy_valid",lambda d:d.energy_power)}),
+    Metric("fritz_homeauto_energy_wh_total","counter","Energy that flowed through a smart home device",
+           {"homeauto":_homeauto("energy_valid",lambda d:d.energy_energy)}),
+    Metric("fritz_homeauto_temperature_celsius","gauge","Temperature measured by a smart home device",
+           {"homeauto":_homeauto("temp_valid",lambda d:d.temp_celsius)}),
+    Metric("fritz_homeauto_switch_on","gauge","Flag if the switch of a smart home device is on",
+           {"homeauto":_homeauto("switch_valid",lambda d:int(d.switch_state))}),
+    ]
+"""
+List of all :py:class:`Metric()` instances exported by default.
+"""
+
+_SOURCE_SUCCESS = Metric("fritz_scrape_source_success","gauge","Flag if the last fetch of a source succeeded",{})
+_SOURCE_CACHED = Metric("fritz_scrape_source_cached","gauge","Flag if cached data was used for a source",{})
+_SOURCE_DURATION = Metric("fritz_scrape_source_duration_seconds","gauge","Time needed for fetching a source",{})
+_SCRAPE_DURATION = Metric("fritz_scrape_duration_seconds","gauge","Time needed for the whole scrape",{})
+
+class ScrapePlan(object):
+    """
+    Plan selecting the sources to fetch for the requested metrics.
+    
+    Sources are chosen greedily by the number of uncovered metrics they provide per request, e.g. ``GetAddonInfos`` is preferred
+    over ``GetTotalBytesSent`` and ``GetTotalBytesReceived`` as it provides both counters with a single request.
+    Every metric is then extracted from the first chosen source that provides it.
+    
+    :param Session session: Session used for checking which sources are available
+    :param list metrics: Optional list of :py:class:`Metric()` instances, defaults to :py:data:`METRICS`
+    :param dict sources: Optional Dictionary of available sources, defaults to :py:data:`SOURCES`
+    
+    :ivar list metrics: Metrics that can be exported, in the order given
+    :ivar list unavailable: Metrics that cannot be exported, as none of their sources is available
+    :ivar list sources: Names of the sources to fetch
+    :ivar dict assignment: Dictionary mapping metric keys to the name of the source to extract them from
+    :ivar int cost: Estimated number of requests per scrape without caching
+    """
+    def __init__(self,session,metrics=None,sources=None):
+        metrics = METRICS if metrics is None else metrics
+        sources = SOURCES if sources is None else sources
+        available = {}
+        for metric in metrics:
+            for name in metric.extract:
+                if name in sources and name not in available:
+                    available[name] = sources[name].isAvailable(session)
+        self.metrics = [m for m in metrics if any(available.get(n) for n in m.extract)]
+        self.unavailable = [m for m in metrics if m not in self.metrics]
+        uncovered = set(m.key for m in self.metrics)
+        chosen = []
+        while uncovered:
+            best,bestscore = None,0
+            for name in available:
+                if not available[name] or name in chosen:
+                    continue
+                covers = sum(1 for m in self.metrics if m.key in uncovered and name in m.extract)
+                score = covers/float(sources[name].cost)
+                if score>bestscore:
+                    best,bestscore = name,score
+            chosen.append(best)
+            uncovered-=set(m.key for m in self.metrics if best in m.extract)
+        self.sources = chosen
+        self.assignment = {m.key:[n for n in m.extract if n in chosen][0] for m in self.metrics}
+        self.cost = sum(sources[n].cost for n in chosen)
+
+class Exporter(object):
+    """
+    Exporter collecting metrics of a single server.
+    
+    :param Session session: Session used for requests
+    :param list metrics: Optional list of :py:class:`Metric()` instances, defaults to :py:data:`METRICS`
+    :param dict ttls: Optional Dictionary mapping source names to TTLs in seconds, overriding the TTLs of the sources
+    :param int maxworkers: Optional maximum number of concurrent requests, defaults to 4
+    :param str prefix: Optional prefix replacing ``fritz_`` in all metric names, defaults to no change
+    
+    :ivar session: stores the supplied session
+    :ivar ScrapePlan plan: Plan computed for the requested metrics
+    :ivar dict ttls: stores the supplied TTLs
+    :ivar int maxworkers: stores the supplied number of workers
+    """
+    def __init__(self,session,metrics=None,ttls=None,maxworkers=4,prefix=None):
+        self.session = session
+        self.sources = SOURCES
+        self.plan = ScrapePlan(session,metrics,self.sources)
+        self.ttls = dict(ttls or {})
+        self.maxworkers = maxworkers
+        self.prefix = prefix
+        self._cache = {}
+        self._lock = threading.Lock()
+    def getTTL(self,name):
+        """
+        Returns the TTL of the given source.
+        
+        :param str name: Name of the source
+        :rtype: float
+        """
+        return self.ttls.get(name,self.sources[name].ttl)
+    def fetch(self):
+        """
+        Fetches the data of all sources of the plan, using cached data where possible.
+        
+        :return: Dictionary mapping source names to ``(data,age,duration,error)`` tuples, where ``duration`` is ``None`` if cached data was used
+        :rtype: dict
+        """
+        now = time.monotonic()
+        out = {}
+        todo = []
+        for name in self.plan.sources:
+            entry = self._cache.get(name)
+            if entry is not None and now-entry[0]<self.getTTL(name):
+                out[name] = (entry[1],now-entry[0],None,None)
+            else:
+                todo.append(name)
+        def _fetch(name):
+            start = time.monotonic()
+            data = self.sources[name].fetch(self.session)
+            return data,start,time.monotonic()-start
+        for name,result,error in base.runConcurrent(_fetch,todo,self.maxworkers):
+            if error is not None:
+                out[name] = (None,0,None,error)
+                continue
+            data,start,duration = result
+            self._cache[name] = (start,data)
+            out[name] = (data,time.monotonic()-start,duration,None)
+        return out
+    def collect(self):
+        """
+        Scrapes the server once.
+        
+        Scrapes are serialized, concurrent calls wait for the running scrape to finish.
+        
+        Samples of metrics sharing a name are merged into the entry of the first of them.
+        
+        :return: List of ``(metric,samples)`` tuples, where ``samples`` is a list of ``(labels,value)`` tuples
+        :rtype: list
+        """
+        with self._lock:
+            start = time.monotonic()
+            data = self.fetch()
+            out = []
+            families = {}
+            for metric in self.plan.metrics:
+                source = self.plan.assignment[metric.key]
+                d,age,_,error = data[source]
+                if error is not None:
+                    continue
+                try:
+                    samples = metric.extract[source](d,age)
+                except (AttributeError,KeyError,TypeError,ValueError):
+                    continue
+                if metric.name in families:
+                    families[metric.name].extend(samples)
+                else:
+                    families[metric.name] = list(samples)
+                    out.append((metric,families[metric.name]))
+            out.append((_SOURCE_SUCCESS,[({"source":n},int(v[3] is None)) for n,v in sorted(data.items())]))
+            out.append((_SOURCE_CACHED,[({"source":n},int(v[2] is None and v[3] is None)) for n,v in sorted(data.items())]))
+            out.append((_SOURCE_DURATION,[({"source":n},v[2]) for n,v in sorted(data.items()) if v[2] is not None]))
+            out.append((_SCRAPE_DURATION,[({},time.monotonic()-start)]))
+            return out
+    def getText(self,openmetrics=False):
+        """
+        Scrapes the server once and formats the metrics.
+        
+        :param bool openmetrics: Optional Flag if the OpenMetrics format should be used instead of the Prometheus text format, defaults to False
+        :rtype: str
+        """
+        return formatMetrics(self.collect(),openmetrics,self.prefix)
+
+def _escape(value):
+    return str(value).replace("\\","\\\\").replace("\n","\\n").replace('"','\\"')
+
+def _formatValue(value):
+    if isinstance(value,bool):
+        return "1" if value else "0"
+    elif isinstance(value,float):
+        return repr(value)
+    return str(value)
+
+def formatMetrics(collected,openmetrics=False,prefix=None):
+    """
+    Formats collected metrics in the Prometheus or OpenMetrics text format.
+    
+    :param list collected: List as returned by :py:meth:`Exporter.collect()`
+    :param bool openmetrics: Optional Flag if the OpenMetrics format should be used, defaults to False
+    :param str prefix: Optional prefix replacing ``fritz_`` in all metric names
+    :rtype: str
+    """
+    lines = []
+    for metric,samples in collected:
+        name = metric.name if prefix is None else prefix+metric.name[len("fritz_"):]
+        family = name[:-len("_total")] if openmetrics and metric.type=="counter" and name.endswith("_total") else name
+        lines.append("# HELP %s %s"%(family,metric.help.replace("\\","\\\\").replace("\n","\\n")))
+        lines.append("# TYPE %s %s"%(family,metric.type))
+        for labels,value in samples:
+            if labels:
+                lines.append("%s{%s} %s"%(name,",".join(['%s="%s"'%(k,_escape(v)) for k,v in sorted(labels.items())]),_formatValue(value)))
+            else:
+                lines.append("%s %s"%(name,_formatValue(value)))
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines)+"\n"
+
+class MetricsServer(object):
+    """
+    HTTP server exposing the metrics of an exporter on ``/metrics``\ .
+    
+    The OpenMetrics format is used if requested via the ``Accept`` header, else the Prometheus text format.
+    
+    :param Exporter exporter: Exporter to serve
+    :param str bind: Optional address to listen on, defaults to all addresses
+    :param int port: Optional port to listen on, defaults to 9133
+    
+    :ivar Exporter exporter: stores the supplied exporter
+    :ivar tuple addr: Address and port the server is listening on, only valid after :py:meth:`start()`
+    """
+    def __init__(self,exporter,bind="",port=9133):
+        self.exporter = exporter
+        self.bind = bind
+        self.port = port
+        self.addr = None
+        self._server = None
+        self._thread = None
+    def start(self):
+        """
+        Starts serving in a background thread.
+        """
+        from http.server import BaseHTTPRequestHandler,ThreadingHTTPServer
+        exporter = self.exporter
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0]!="/metrics":
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept","")
+                try:
+                    body = exporter.getText(openmetrics).encode("utf-8")
+                except Exception as e:
+                    self.send_error(500,str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type",CONTENT_TYPE_OPENMETRICS if openmetrics else CONTENT_TYPE)
+                self.send_header("Content-Length",str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self,format,*args):
+                pass
+        self._server = ThreadingHTTPServer((self.bind,self.port),Handler)
+        self._server.daemon_threads = True
+        self.addr = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever,name="fritzctl-metricsserver",daemon=True)
+        self._thread.start()
+    def stop(self):
+        """
+        Stops serving and waits for the background thread to finish.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -27,29 +27,90 @@ Package containing Object-Oriented API Wrappers around :py:class:`DynamicAPI()`
 You should not directly instantiate these APIs, instead see :py:meth:`getOOAPI() <fritzctl.session.Session.getOOAPI>` for how to request these APIs.
 """
 
-from . import avm_homeauto,avm_homeplug
-from . import general_time,general_deviceinfo,general_deviceconfig,general_hosts
-from . import net_wlan_multi
+import importlib
 
-OO_APIS = {
+from collections.abc import MutableMapping
+
+MODULES = [
+    "avm_homeauto","avm_homeplug","avm_ontel","avm_hostfilter","avm_storage","avm_speedtest","avm_dect","avm_tam",
+    "general_time","general_deviceinfo","general_deviceconfig","general_hosts",
+    "net_wlan_multi","net_wan_commoninterfacecfg","net_wan_dslinterfacecfg",
+    "net_wan_ipconnection","net_wan_pppconnection",
+    ]
+"""
+List of the names of all OO API modules in this package.
+
+The modules are only imported on first access, e.g. ``fritzctl.ooapi.general_hosts`` or via :py:data:`OO_APIS`\ .
+"""
+
+def __getattr__(name):
+    if name in MODULES:
+        return importlib.import_module("."+name,__name__)
+    raise AttributeError("module %r has no attribute %r"%(__name__,name))
+
+def __dir__():
+    return sorted(list(globals().keys())+MODULES)
+
+class LazyAPIMapping(MutableMapping):
+    """
+    Mapping of URNs to OO API classes that imports the module of a class on first access.
+    
+    Values may be given as classes or as strings of the form ``module.Class``\ , where ``module`` is relative to this package.
+    Strings are replaced with the imported class on first access, so only the OO APIs actually used are imported.
+    
+    :param dict data: Dictionary mapping URNs to classes or strings
+    """
+    def __init__(self,data):
+        self._data = dict(data)
+    def __getitem__(self,urn):
+        cls = self._data[urn]
+        if isinstance(cls,str):
+            modname,clsname = cls.rsplit(".",1)
+            cls = getattr(importlib.import_module("."+modname,__name__),clsname)
+            self._data[urn] = cls
+        return cls
+    def __setitem__(self,urn,cls):
+        self._data[urn] = cls
+    def __delitem__(self,urn):
+        del self._data[urn]
+    def __iter__(self):
+        return iter(self._data)
+    def __len__(self):
+        return len(self._data)
+    def __contains__(self,urn):
+        return urn in self._data
+    def __repr__(self):
+        return "LazyAPIMapping(%r)"%self._data
+
+OO_APIS = LazyAPIMapping({
     # AVM APIs
-    "urn:dslforum-org:service:X_AVM-DE_Homeauto:1":avm_homeauto.API_avm_homeauto,
-    "urn:dslforum-org:service:X_AVM-DE_Homeplug:1":avm_homeplug.API_avm_homeplug,
+    "urn:dslforum-org:service:X_AVM-DE_Homeauto:1":"avm_homeauto.API_avm_homeauto",
+    "urn:dslforum-org:service:X_AVM-DE_Homeplug:1":"avm_homeplug.API_avm_homeplug",
+    "urn:dslforum-org:service:X_AVM-DE_OnTel:1":"avm_ontel.API_avm_ontel",
+    "urn:dslforum-org:service:X_AVM-DE_HostFilter:1":"avm_hostfilter.API_avm_hostfilter",
+    "urn:dslforum-org:service:X_AVM-DE_Storage:1":"avm_storage.API_avm_storage",
+    "urn:dslforum-org:service:X_AVM-DE_Speedtest:1":"avm_speedtest.API_avm_speedtest",
+    "urn:dslforum-org:service:X_AVM-DE_Dect:1":"avm_dect.API_avm_dect",
+    "urn:dslforum-org:service:X_AVM-DE_TAM:1":"avm_tam.API_avm_tam",
     
     # General Purpose APIs
-    "urn:dslforum-org:service:Time:1":general_time.API_general_time,
-    "urn:dslforum-org:service:DeviceInfo:1":general_deviceinfo.API_general_deviceinfo,
-    "urn:dslforum-org:service:DeviceConfig:1":general_deviceconfig.API_general_deviceconfig,
-    "urn:dslforum-org:service:Hosts:1":general_hosts.API_general_hosts,
+    "urn:dslforum-org:service:Time:1":"general_time.API_general_time",
+    "urn:dslforum-org:service:DeviceInfo:1":"general_deviceinfo.API_general_deviceinfo",
+    "urn:dslforum-org:service:DeviceConfig:1":"general_deviceconfig.API_general_deviceconfig",
+    "urn:dslforum-org:service:Hosts:1":"general_hosts.API_general_hosts",
     
     # Networking APIs
-    "urn:dslforum-org:service:WLANConfiguration:1":net_wlan_multi.API_net_wlan_multi,
-    "urn:dslforum-org:service:WLANConfiguration:2":net_wlan_multi.API_net_wlan_multi,
-    "urn:dslforum-org:service:WLANConfiguration:3":net_wlan_multi.API_net_wlan_multi,
+    "urn:dslforum-org:service:WLANConfiguration:1":"net_wlan_multi.API_net_wlan_multi",
+    "urn:dslforum-org:service:WLANConfiguration:2":"net_wlan_multi.API_net_wlan_multi",
+    "urn:dslforum-org:service:WLANConfiguration:3":"net_wlan_multi.API_net_wlan_multi",
+    "urn:dslforum-org:service:WANCommonInterfaceConfig:1":"net_wan_commoninterfacecfg.API_net_wan_commoninterfacecfg",
+    "urn:dslforum-org:service:WANDSLInterfaceConfig:1":"net_wan_dslinterfacecfg.API_net_wan_dslinterfacecfg",
+    "urn:dslforum-org:service:WANIPConnection:1":"net_wan_ipconnection.API_net_wan_ipconnection",
+    "urn:dslforum-org:service:WANPPPConnection:1":"net_wan_pppconnection.API_net_wan_pppconnection",
     # TODO: add more OO apis
-}
+})
 """
-Mapping of Service Type URNs to OO API classes.
+Mapping of Service Type URNs to OO API classes, see :py:class:`LazyAPIMapping()`\ .
 
 See :py:data:`NAME_TO_URN <fritzctl.session.NAME_TO_URN>` for a list of URNs, names and which of these have Object-Oriented APIs defined.
 """
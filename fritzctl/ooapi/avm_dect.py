@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  avm_dect.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import hashlib
+import io
+import time
+
+import requests
+
+from . import base
+
+class API_avm_dect(base.API_base):
+    """
+    AVM DECT TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("avm_dect")`` or ``session.getOOAPI("urn:dslforum-org:service:X_AVM-DE_Dect:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getNumberOfEntries(self):
+        """
+        Returns the number of registered DECT handsets.
+        
+        :return: Number of handsets
+        :rtype: int
+        """
+        return int(self.dynapi.GetNumberOfDectEntries()["NewNumberOfEntries"])
+    def getHandsetByIndex(self,index):
+        """
+        Returns the handset at the given index.
+        
+        :param int index: Index of the handset
+        :return: Handset Information Object
+        :rtype: DectHandset
+        :raises AssertionError: if the index is invalid, e.g. not an integer or lower than 0
+        :raises ValueError: if the index is out of range
+        """
+        assert isinstance(index,int) and index>=0
+        return DectHandset(self,index,self.dynapi.GetGenericDectEntry(NewIndex=index))
+    def getHandsetByID(self,id):
+        """
+        Returns the handset with the given ID.
+        
+        :param str id: ID of the handset
+        :return: Handset Information Object
+        :rtype: DectHandset
+        :raises ValueError: if the ID is unknown
+        """
+        d = self.dynapi.GetSpecificDectEntry(NewID=id)
+        d["NewID"] = id
+        return DectHandset(self,-1,d)
+    def getHandsetList(self):
+        """
+        Returns a list of all handsets, requested one by one.
+        
+        :return: List of Handset Information Objects
+        :rtype: list
+        """
+        return [self.getHandsetByIndex(i) for i in range(self.getNumberOfEntries())]
+    def hasDectList(self):
+        """
+        Checks if the server supports downloading the list of all handsets via :py:meth:`getDectListPath()`\ .
+        
+        Older firmware versions do not provide this action. If the SCPD has not been loaded, ``False`` is returned.
+        
+        :rtype: bool
+        """
+        return self.session.hasAction(self.urn,"GetDectListPath")
+    def getDectListPath(self):
+        """
+        Returns the path of the XML list containing all handsets.
+        
+        The path contains a session ID and is only valid for a limited time.
+        
+        :return: Path of the handset list, relative to the server
+        :rtype: str
+        """
+        return self.dynapi.callAPI("GetDectListPath")["NewDectListPath"]
+    def doUpdate(self,id):
+        """
+        Requests that the handset with the given ID does a firmware update.
+        
+        :param str id: ID of the handset
+        """
+        self.dynapi.DectDoUpdate(NewID=id)
+    def getInventory(self,maxage=3600.0):
+        """
+        Returns an inventory of all handsets that can be refreshed cheaply.
+        
+        See :py:class:`DectInventory()` for the parameters.
+        
+        :return: Handset Inventory
+        :rtype: DectInventory
+        """
+        inv = DectInventory(self,maxage)
+        inv.reloadData()
+        return inv
+
+class DectHandset(object):
+    """
+    DECT Handset Information Class.
+    
+    :param API_avm_dect api: API object to use when querying for data
+    :param int index: Index this handset had when requested, may be -1 if unknown
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_dect api: stores the supplied API object
+    :ivar int index: stores the supplied index
+    :ivar dict info: stores the data in a dictionary
+    
+    :ivar str id: ID of this handset
+    :ivar bool active: Flag if this handset is active
+    :ivar str name: Name of this handset
+    :ivar str model: Model of this handset
+    :ivar bool updateAvailable: Flag if a firmware update is available
+    :ivar bool updateSuccessful: Flag if the last firmware update was successful
+    :ivar str updateInfo: Additional information about the firmware update
+    """
+    def __init__(self,api,index,info):
+        self.api = api
+        self.index = index
+        self.info = info
+        self.loadData(self.info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.id = data["NewID"]
+        self.active = data["NewActive"]=="1"
+        self.name = data["NewName"] or ""
+        self.model = data["NewModel"] or ""
+        self.updateAvailable = data["NewUpdateAvailable"]=="1"
+        self.updateSuccessful = data["NewUpdateSuccessful"]=="succeeded"
+        self.updateInfo = data.get("NewUpdateInfo") or ""
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetSpecificDectEntry(NewID=self.id)
+        d["NewID"] = self.id
+        self.info = d
+        self.loadData(d)
+    def doUpdate(self):
+        """
+        Requests that this handset does a firmware update.
+        """
+        self.api.doUpdate(self.id)
+
+class DectInventory(object):
+    """
+    Cached inventory of all DECT handsets.
+    
+    If the server supports :py:meth:`API_avm_dect.getDectListPath()`\ , every refresh downloads the list of all handsets
+    at once and only parses it again if its content has changed.
+    The download path is reused until the server rejects it.
+    
+    Otherwise, every refresh only requests the number of handsets and walks all handsets one by one
+    if that number has changed or the last walk is older than ``maxage``\ .
+    Note that changes to individual handsets, e.g. firmware updates, may go unnoticed for up to ``maxage`` seconds in this mode.
+    
+    :param API_avm_dect api: API object to use when querying for data
+    :param float maxage: Optional maximum age of a full walk in seconds, defaults to one hour; only used without the handset list
+    
+    :ivar API_avm_dect api: stores the supplied API object
+    :ivar float maxage: stores the supplied maximum age
+    :ivar list handsets: List of all handsets, ordered by their index
+    :ivar bool uselist: Flag if the handset list download is used
+    """
+    def __init__(self,api,maxage=3600.0):
+        self.api = api
+        self.maxage = maxage
+        self.handsets = []
+        self.uselist = api.hasDectList()
+        self._byid = {}
+        self._path = None
+        self._hash = None
+        self._walktime = None
+    def reloadData(self,force=False):
+        """
+        Refreshes the inventory if anything has changed.
+        
+        :param bool force: Optional Flag if the inventory should be refreshed regardless of any change detection, defaults to False
+        :return: Flag if the inventory has been changed
+        :rtype: bool
+        """
+        if self.uselist:
+            return self._reloadList(force)
+        return self._reloadWalk(force)
+    def _reloadList(self,force):
+        if self._path is None:
+            self._path = self.api.getDectListPath()
+        try:
+            data = self.api.session.getURL(self._path).content
+        except requests.HTTPError:
+            # The session ID in the path has probably expired
+            self._path = self.api.getDectListPath()
+            data = self.api.session.getURL(self._path).content
+        h = hashlib.sha256(data).digest()
+        if h==self._hash and not force:
+            return False
+        handsets = []
+        for item in base.iterXMLItems(io.BytesIO(data),"Item"):
+            d = {"NewActive":"0","NewName":"","NewModel":"","NewUpdateAvailable":"0","NewUpdateSuccessful":""}
+            for k,v in base.itemToDict(item).items():
+                d["New"+k] = v
+            if "NewID" not in d and "NewId" in d:
+                d["NewID"] = d["NewId"]
+            handsets.append(DectHandset(self.api,len(handsets),d))
+        self._hash = h
+        self._setHandsets(handsets)
+        return True
+    def _reloadWalk(self,force):
+        n = self.api.getNumberOfEntries()
+        now = time.monotonic()
+        if not force and self._walktime is not None and n==len(self.handsets) and now-self._walktime<self.maxage:
+            return False
+        handsets = [self.api.getHandsetByIndex(i) for i in range(n)]
+        self._walktime = now
+        changed = [h.info for h in handsets]!=[h.info for h in self.handsets]
+        self._setHandsets(handsets)
+        return changed
+    def _setHandsets(self,handsets):
+        self.handsets = handsets
+        self._byid = {h.id:h for h in handsets}
+    def __len__(self):
+        return len(self.handsets)
+    def __iter__(self):
+        return iter(self.handsets)
+    def getByID(self,id):
+        """
+        Returns the handset with the given ID from the inventory.
+        
+        :param str id: ID of the handset
+        :return: Handset Information Object or ``None`` if there is no such handset
+        :rtype: DectHandset or None
+        """
+        return self._byid.get(id)
+    def getUpdatable(self):
+        """
+        Returns all handsets with an available firmware update.
+        
+        :return: List of Handset Information Objects
+        :rtype: list
+        """
+        return [h for h in self.handsets if h.updateAvailable]
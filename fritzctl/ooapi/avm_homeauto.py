@@ -80,25 +80,45 @@ class API_avm_homeauto(base.API_base):
         """
         assert isinstance(index,int) and index>=0
         return HomeautoDevice(self,index,self.dynapi.GetGenericDeviceInfos(NewIndex=index))
-    def getDeviceList(self,limit=-1):
+    def getDeviceList(self,limit=-1,maxage=None):
         """
         Returns a list of devices, optionally up to the specified limit.
         
+        If ``maxage`` is given, the list may be taken from the cache of the session, see :py:meth:`Session.getCached() <fritzctl.session.Session.getCached>`\ .
+        
         :param int limit: Optional Limit for the returned list
+        :param float maxage: Optional maximum age in seconds of a cached list, defaults to always requesting the devices
         :return: List of all known devices
         :rtype: List of instances of :py:class:`HomeautoDevice()`\ .
         :raises AssertionError: if the supplied limit is invalid, e.g. not an integer or less than -1
         """
         assert isinstance(limit,int)
-        out = []
-        i = 0
-        while i!=limit:
-            try:
-                out.append(self.getDeviceByIndex(i))
-            except ValueError:
-                break
-            i+=1
-        return out
+        def load():
+            out = []
+            i = 0
+            while i!=limit:
+                try:
+                    out.append(self.dynapi.GetGenericDeviceInfos(NewIndex=i))
+                except ValueError:
+                    break
+                i+=1
+            return out
+        infos = self.session.getCached("homeauto:%d"%limit,load,maxage)
+        return [HomeautoDevice(self,i,dict(info)) for i,info in enumerate(infos)]
+    def getDeviceListCursor(self,limit=-1):
+        """
+        Returns a cursor for walking the device list that can be resumed after an error.
+        
+        The walk ends at the first index rejected by the server, like :py:meth:`getDeviceList()`\ .
+        Note that this API has no change counter, so changes to the device list between two steps are not detected.
+        
+        :param int limit: Optional Limit for the number of devices
+        :return: Cursor yielding :py:class:`HomeautoDevice()` instances
+        :rtype: fritzctl.ooapi.base.EnumerationCursor
+        :raises AssertionError: if the supplied limit is invalid, e.g. not an integer or less than -1
+        """
+        assert isinstance(limit,int) and limit>=-1
+        return base.EnumerationCursor(self.getDeviceByIndex,limit=limit)
     def getAINByIndex(self,index):
         """
         Returns the AIN associated with the given index.
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  avm_hostfilter.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import threading
+
+from . import base
+
+class API_avm_hostfilter(base.API_base):
+    """
+    AVM Host Filter TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("avm_hostfilter")`` or ``session.getOOAPI("urn:dslforum-org:service:X_AVM-DE_HostFilter:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    
+    This API caches the WAN access state of all hosts, see :py:meth:`getWANAccessStates()`\ .
+    The cache is only used to skip writes that would not change anything, it is filled on first use and
+    updated by every successful write.
+    """
+    def __init__(self,session,urn):
+        super(API_avm_hostfilter,self).__init__(session,urn)
+        self._states = None
+        self._lock = threading.Lock()
+
+    def getWANAccess(self,ip):
+        """
+        Returns the WAN access state of a single host directly from the server.
+        
+        :param str ip: IPv4 Address of the host
+        :return: 2-tuple of ``(allowed,disallowed)`` where allowed is the effective state and disallowed is the flag set by :py:meth:`setWANAccess()`
+        :rtype: tuple
+        :raises AssertionError: if the IP Address is not a string
+        :raises ValueError: if the IP Address is unknown
+        """
+        assert isinstance(ip,str)
+        d = self.dynapi.GetWANAccessByIP(NewIPv4Address=ip)
+        return d["NewWANAccess"]=="granted",d["NewDisallow"]=="1"
+    def getWANAccessStates(self,ips=None,refresh=True):
+        """
+        Returns the WAN access state of many hosts at once.
+        
+        The states are read from the host table snapshot, see :py:meth:`fritzctl.ooapi.general_hosts.API_general_hosts.getHostTable()`\ ,
+        so this costs a single download regardless of the number of hosts.
+        
+        :param list ips: Optional list of IPv4 Addresses to return, defaults to all hosts
+        :param bool refresh: Optional Flag if the host table should be downloaded again even if the states are cached, defaults to True
+        :return: Dictionary mapping IPv4 Addresses to ``True`` if WAN access is allowed and ``False`` if disallowed, unknown hosts are omitted
+        :rtype: dict
+        """
+        if refresh or self._states is None:
+            states = {}
+            for host in self.session.getOOAPI("general_hosts").getHostTable():
+                if host.ip and "NewX_AVM-DE_Disallow" in host.info:
+                    states[host.ip] = host.info["NewX_AVM-DE_Disallow"]!="1"
+            with self._lock:
+                self._states = states
+        with self._lock:
+            if ips is None:
+                return dict(self._states)
+            return {ip:self._states[ip] for ip in ips if ip in self._states}
+    def setWANAccess(self,ips,allowed,maxworkers=4,refresh=False):
+        """
+        Allows or disallows WAN access for one or many hosts.
+        
+        Hosts that are already in the requested state according to the cached states are skipped,
+        all other hosts are changed concurrently using up to ``maxworkers`` concurrent requests.
+        
+        :param ips: IPv4 Address or list of IPv4 Addresses
+        :type ips: str or list
+        :param bool allowed: Flag if WAN access should be allowed
+        :param int maxworkers: Optional maximum number of concurrent requests, defaults to 4
+        :param bool refresh: Optional Flag if the cached states should be refreshed first, defaults to False
+        :return: List of 2-tuples of ``(ip,exception)`` for every failed host, empty if all hosts succeeded
+        :rtype: list
+        """
+        if isinstance(ips,str):
+            ips = [ips]
+        states = self.getWANAccessStates(refresh=refresh)
+        todo = [ip for ip in ips if states.get(ip)!=bool(allowed)]
+        failed = []
+        for ip,_,error in base.runConcurrent(lambda ip:self._setDisallow(ip,not allowed),todo,maxworkers):
+            if error is not None:
+                failed.append((ip,error))
+            else:
+                with self._lock:
+                    self._states[ip] = bool(allowed)
+        return failed
+    def _setDisallow(self,ip,disallow):
+        self.dynapi.DisallowWANAccessByIP(NewIPv4Address=ip,NewDisallow="1" if disallow else "0")
+    def discardAllTickets(self):
+        """
+        Discards all tickets for extending the online time of restricted hosts.
+        """
+        self.dynapi.DiscardAllTickets()
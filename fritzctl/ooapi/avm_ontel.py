@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  avm_ontel.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import datetime
+
+from . import base
+
+CALLTYPES = {
+    "1":"incoming",
+    "2":"missed",
+    "3":"outgoing",
+    "9":"active_incoming",
+    "10":"rejected",
+    "11":"active_outgoing",
+    }
+"""
+Mapping for mapping the call types used in call lists to user-friendly names.
+
+==================== ===================
+Call List Type       Python Equivalent
+==================== ===================
+``1``                ``incoming``
+``2``                ``missed``
+``3``                ``outgoing``
+``9``                ``active_incoming``
+``10``               ``rejected``
+``11``               ``active_outgoing``
+==================== ===================
+
+Unknown types are passed through unchanged.
+"""
+
+class API_avm_ontel(base.API_base):
+    """
+    AVM OnTel TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("avm_ontel")`` or ``session.getOOAPI("urn:dslforum-org:service:X_AVM-DE_OnTel:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getCallListURL(self,max=None,days=None,id=None,timestamp=None):
+        """
+        Returns the URL of the call list, optionally limited by the given parameters.
+        
+        The URL contains a session ID and is only valid for a limited time.
+        
+        :param int max: Optional maximum number of calls to return
+        :param int days: Optional number of days to look back
+        :param int id: Optional ID of a call, only calls newer than this call will be returned; requires ``timestamp``
+        :param str timestamp: Optional timestamp of a previously downloaded call list, see :py:attr:`CallListCursor.timestamp`
+        :return: URL of the call list
+        :rtype: str
+        :raises AssertionError: if ``id`` is given without ``timestamp``
+        """
+        assert id is None or timestamp is not None
+        url = self.dynapi.GetCallList()["NewCallListURL"]
+        for name,value in [("max",max),("days",days),("id",id),("timestamp",timestamp)]:
+            if value is not None:
+                url += "&%s=%s"%(name,value)
+        return url
+    def iterCallList(self,max=None,days=None,id=None,timestamp=None):
+        """
+        Downloads the call list and parses it incrementally.
+        
+        This method should be preferred over :py:meth:`getCallList()` for large call lists, as only one call is kept in memory at once.
+        The timestamp of the call list is available in the ``header`` dictionary of the returned iterator once it has been exhausted.
+        
+        The connection is released once the iterator has been exhausted. If you stop iterating early,
+        call its ``close()`` method or use it as a context manager::
+           
+           with api.iterCallList() as calls:
+               for call in calls:
+                   if call.id<=lastid:
+                       break
+        
+        See :py:meth:`getCallListURL()` for the parameters.
+        
+        :return: Iterator of calls, newest first
+        :rtype: Iterator of :py:class:`Call()`
+        """
+        r = self.session.getURL(self.getCallListURL(max,days,id,timestamp),stream=True)
+        r.raw.decode_content = True
+        return _CallIterator(self,r)
+    def getCallList(self,max=None,days=None,id=None,timestamp=None):
+        """
+        Returns the call list as a list.
+        
+        See :py:meth:`getCallListURL()` for the parameters.
+        
+        :return: List of calls, newest first
+        :rtype: List of :py:class:`Call()`
+        """
+        with self.iterCallList(max,days,id,timestamp) as it:
+            return list(it)
+    def getCallListCursor(self,id=None,timestamp=None):
+        """
+        Returns a cursor for incrementally synchronizing the call list.
+        
+        :param int id: Optional ID of the newest call already known
+        :param str timestamp: Optional timestamp of the call list the ID was taken from
+        :return: Call List Cursor
+        :rtype: CallListCursor
+        """
+        return CallListCursor(self,id,timestamp)
+
+    def getPhonebookIDs(self):
+        """
+        Returns the IDs of all phonebooks.
+        
+        :return: List of phonebook IDs
+        :rtype: List of int
+        """
+        l = self.dynapi.GetPhonebookList()["NewPhonebookList"]
+        return [int(i) for i in (l or "").split(",") if i.strip()]
+    def getPhonebookInfo(self,id):
+        """
+        Returns the name, extra ID and URL of the given phonebook.
+        
+        The URL contains a session ID and is only valid for a limited time.
+        
+        :param int id: ID of the phonebook
+        :return: 3-tuple of ``(name,extraid,url)``
+        :rtype: tuple
+        :raises AssertionError: if the ID is invalid, e.g. not an integer or less than 0
+        :raises ValueError: if the ID is unknown
+        """
+        assert isinstance(id,int) and id>=0
+        d = self.dynapi.GetPhonebook(NewPhonebookID=id)
+        return d["NewPhonebookName"],d["NewPhonebookExtraID"],d["NewPhonebookURL"]
+    def getPhonebook(self,id,timestamp=None):
+        """
+        Downloads the given phonebook with a single request.
+        
+        If ``timestamp`` is given and the phonebook has not been modified since, the download is aborted
+        as soon as the timestamp has been read and ``None`` is returned instead.
+        
+        :param int id: ID of the phonebook
+        :param str timestamp: Optional timestamp of a previously downloaded version, see :py:attr:`Phonebook.timestamp`
+        :return: The phonebook or ``None`` if it has not been modified
+        :rtype: Phonebook or None
+        :raises AssertionError: if the ID is invalid, e.g. not an integer or less than 0
+        :raises ValueError: if the ID is unknown
+        """
+        name,extraid,url = self.getPhonebookInfo(id)
+        if timestamp is not None:
+            url += "&timestamp=%s"%timestamp
+        r = self.session.getURL(url,stream=True)
+        r.raw.decode_content = True
+        items = base.iterXMLItems(r.raw,"contact")
+        contacts = []
+        try:
+            for item in items:
+                if timestamp is not None and items.header.get("timestamp")==timestamp:
+                    return None
+                contacts.append(Contact(item))
+        finally:
+            r.close()
+        if timestamp is not None and items.header.get("timestamp",timestamp)==timestamp:
+            return None
+        return Phonebook(self,id,name,extraid,items.header.get("timestamp"),contacts)
+    def getPhonebookSync(self,timestamps=None):
+        """
+        Returns a helper object for synchronizing all phonebooks, only downloading modified phonebooks.
+        
+        :param dict timestamps: Optional mapping of phonebook IDs to timestamps of previously downloaded versions
+        :return: Phonebook Synchronization Object
+        :rtype: PhonebookSync
+        """
+        return PhonebookSync(self,timestamps)
+
+class _CallIterator(object):
+    def __init__(self,api,response):
+        self.api = api
+        self.response = response
+        self.items = base.iterXMLItems(response.raw,"Call")
+        self.header = self.items.header
+    def __iter__(self):
+        return self
+    def __next__(self):
+        try:
+            return Call(self.api,base.itemToDict(next(self.items)))
+        except BaseException:
+            # Also reached via StopIteration once the call list has been read completely
+            self.close()
+            raise
+    def close(self):
+        self.response.close()
+    def __enter__(self):
+        return self
+    def __exit__(self,*args):
+        self.close()
+        return False
+    def __del__(self):
+        self.close()
+
+class Call(object):
+    """
+    Single entry of the call list.
+    
+    :param API_avm_ontel api: API object this call was requested with
+    :param dict info: Dictionary containing the entry of the call list; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_ontel api: stores the supplied API object
+    
+    Call Variables:
+    
+    :ivar int id: Unique ID of the call
+    :ivar str type: Type of the call, see :py:data:`CALLTYPES`
+    :ivar str caller: Number of the caller
+    :ivar str called: Number that was called
+    :ivar str name: Name of the other party as found in the phonebook
+    :ivar str numbertype: Type of the number used, e.g. ``sip`` or ``pots``
+    :ivar str device: Name of the device that handled the call
+    :ivar str port: Port of the device that handled the call
+    :ivar date: Date and time of the call, in local time of the server
+    :type date: datetime.datetime or None
+    :ivar int duration: Duration of the call in seconds, with a resolution of one minute
+    :ivar str path: Path of the recording on the server, may be empty
+    
+    Instances of this class do not store the raw data to save memory.
+    """
+    __slots__ = ["api","id","type","caller","called","name","numbertype","device","port","date","duration","path"]
+    def __init__(self,api,info):
+        self.api = api
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied call list entry.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.id = int(data["Id"])
+        self.type = CALLTYPES.get(data["Type"],data["Type"])
+        self.caller = data.get("Caller","")
+        self.called = data.get("Called","") or data.get("CalledNumber","")
+        self.name = data.get("Name","")
+        self.numbertype = data.get("Numbertype","")
+        self.device = data.get("Device","")
+        self.port = data.get("Port","")
+        try:
+            self.date = datetime.datetime.strptime(data.get("Date",""),"%d.%m.%y %H:%M")
+        except ValueError:
+            self.date = None
+        h,_,m = data.get("Duration","0:00").partition(":")
+        self.duration = int(h or 0)*3600+int(m or 0)*60
+        self.path = data.get("Path","")
+    def __repr__(self):
+        return "<Call(%d,%s,%s,%s)>"%(self.id,self.type,self.caller,self.called)
+
+class CallListCursor(object):
+    """
+    Cursor for incrementally synchronizing the call list.
+    
+    Each call to :py:meth:`sync()` only downloads calls that are newer than the newest call seen before.
+    :py:attr:`id` and :py:attr:`timestamp` can be stored and passed to a new cursor to resume the synchronization later.
+    
+    :param API_avm_ontel api: API object to use when querying for data
+    :param int id: Optional ID of the newest call already known
+    :param str timestamp: Optional timestamp of the call list the ID was taken from
+    
+    :ivar API_avm_ontel api: stores the supplied API object
+    :ivar id: ID of the newest call seen, or ``None`` if no call has been seen yet
+    :type id: int or None
+    :ivar timestamp: Timestamp of the last downloaded call list, or ``None``
+    :type timestamp: str or None
+    """
+    def __init__(self,api,id=None,timestamp=None):
+        self.api = api
+        self.id = id
+        self.timestamp = timestamp
+    def sync(self,days=None):
+        """
+        Generator yielding all calls newer than the newest call seen so far.
+        
+        The cursor is only advanced once the generator has been exhausted, if it is aborted early the same calls will be returned again.
+        
+        :param int days: Optional number of days to look back, only used if the cursor has no ID yet
+        :return: Generator of new calls, newest first
+        """
+        if self.id is not None and self.timestamp is not None:
+            it = self.api.iterCallList(id=self.id,timestamp=self.timestamp)
+        else:
+            it = self.api.iterCallList(days=days)
+        newest = self.id
+        with it:
+            for call in it:
+                if self.id is not None and call.id<=self.id:
+                    continue
+                if newest is None or call.id>newest:
+                    newest = call.id
+                yield call
+        self.id = newest
+        self.timestamp = it.header.get("timestamp",self.timestamp)
+
+class Contact(object):
+    """
+    Single entry of a phonebook.
+    
+    :param elem: ``contact`` XML element to read the data from; automatically passed to :py:meth:`loadData()`
+    
+    Contact Variables:
+    
+    :ivar str uniqueid: Unique ID of the contact within its phonebook
+    :ivar str name: Name of the contact
+    :ivar str category: Category of the contact, ``1`` for important contacts
+    :ivar tuple numbers: Tuple of ``(type,number)`` tuples, e.g. ``("home","0301234")``
+    :ivar tuple emails: Tuple of email addresses
+    :ivar str modtime: Time of the last modification as unix timestamp, may be empty
+    
+    Instances of this class do not store the raw data or the API object to save memory.
+    """
+    __slots__ = ["uniqueid","name","category","numbers","emails","modtime"]
+    def __init__(self,elem):
+        self.loadData(elem)
+    def loadData(self,elem):
+        """
+        Populates instance variables with the supplied XML element.
+        This method is automatically called upon construction with the supplied element.
+        """
+        self.uniqueid = elem.findtext("uniqueid","")
+        self.name = elem.findtext("person/realName","")
+        self.category = elem.findtext("category","")
+        self.numbers = tuple((n.get("type",""),n.text or "") for n in elem.iterfind("telephony/number"))
+        self.emails = tuple(e.text or "" for e in elem.iterfind("services/email"))
+        self.modtime = elem.findtext("mod_time","")
+    def __repr__(self):
+        return "<Contact(%s,%r)>"%(self.uniqueid,self.name)
+
+class Phonebook(object):
+    """
+    Phonebook as downloaded by :py:meth:`API_avm_ontel.getPhonebook()`\ .
+    
+    :param API_avm_ontel api: API object this phonebook was requested with
+    :param int id: ID of the phonebook
+    :param str name: Name of the phonebook
+    :param str extraid: Extra ID of the phonebook, may be empty
+    :param str timestamp: Timestamp of this version of the phonebook
+    :param list contacts: List of contacts
+    
+    :ivar API_avm_ontel api: stores the supplied API object
+    :ivar int id: stores the supplied ID
+    :ivar str name: stores the supplied name
+    :ivar str extraid: stores the supplied extra ID
+    :ivar timestamp: stores the supplied timestamp, can be passed to :py:meth:`API_avm_ontel.getPhonebook()` to detect changes
+    :type timestamp: str or None
+    :ivar contacts: stores the supplied contacts
+    :type contacts: List of :py:class:`Contact()`
+    """
+    def __init__(self,api,id,name,extraid,timestamp,contacts):
+        self.api = api
+        self.id = id
+        self.name = name
+        self.extraid = extraid
+        self.timestamp = timestamp
+        self.contacts = contacts
+    def reloadData(self):
+        """
+        Downloads the phonebook again if it has been modified and updates it in-place.
+        
+        :return: Flag if the phonebook has been modified
+        :rtype: bool
+        """
+        pb = self.api.getPhonebook(self.id,self.timestamp)
+        if pb is None:
+            return False
+        self.name = pb.name
+        self.extraid = pb.extraid
+        self.timestamp = pb.timestamp
+        self.contacts = pb.contacts
+        return True
+
+class PhonebookSync(object):
+    """
+    Helper class for synchronizing all phonebooks of a server.
+    
+    Phonebooks that have not been modified since the last synchronization cost only one small request each.
+    
+    :param API_avm_ontel api: API object to use when querying for data
+    :param dict timestamps: Optional mapping of phonebook IDs to timestamps of previously downloaded versions
+    
+    :ivar API_avm_ontel api: stores the supplied API object
+    :ivar dict timestamps: Mapping of phonebook IDs to the timestamps of the last downloaded versions, can be stored to resume later
+    """
+    def __init__(self,api,timestamps=None):
+        self.api = api
+        self.timestamps = dict(timestamps) if timestamps is not None else {}
+    def sync(self):
+        """
+        Downloads all phonebooks that have been modified or added since the last synchronization.
+        
+        Timestamps of phonebooks that no longer exist are removed.
+        
+        :return: Mapping of phonebook IDs to modified phonebooks
+        :rtype: dict
+        """
+        out = {}
+        ids = self.api.getPhonebookIDs()
+        for id in ids:
+            pb = self.api.getPhonebook(id,self.timestamps.get(id))
+            if pb is not None:
+                self.timestamps[id] = pb.timestamp
+                out[id] = pb
+        for id in list(self.timestamps.keys()):
+            if id not in ids:
+                del self.timestamps[id]
+        return out
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  avm_speedtest.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import collections
+import threading
+import time
+
+from . import base
+
+class API_avm_speedtest(base.API_base):
+    """
+    AVM Speedtest TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("avm_speedtest")`` or ``session.getOOAPI("urn:dslforum-org:service:X_AVM-DE_Speedtest:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getInfo(self):
+        """
+        Returns the configuration of the speedtest service.
+        
+        :return: Speedtest Configuration Object
+        :rtype: SpeedtestInfo
+        """
+        return SpeedtestInfo(self,self.dynapi.GetInfo())
+    def setConfig(self,tcp=None,udp=None,udpbidirect=None,wantcp=None,wanudp=None):
+        """
+        Changes the configuration of the speedtest service.
+        
+        All arguments are optional, omitted arguments keep their current value.
+        
+        :param bool tcp: Flag if the TCP speedtest should be enabled in the local network
+        :param bool udp: Flag if the UDP speedtest should be enabled in the local network
+        :param bool udpbidirect: Flag if the bidirectional UDP speedtest should be enabled in the local network
+        :param bool wantcp: Flag if the TCP speedtest should be reachable from the internet
+        :param bool wanudp: Flag if the UDP speedtest should be reachable from the internet
+        """
+        cur = self.getInfo()
+        self.dynapi.SetConfig(
+            NewEnableTcp=str(int(cur.tcp if tcp is None else tcp)),
+            NewEnableUdp=str(int(cur.udp if udp is None else udp)),
+            NewEnableUdpBidirect=str(int(cur.udpbidirect if udpbidirect is None else udpbidirect)),
+            NewWANEnableTcp=str(int(cur.wantcp if wantcp is None else wantcp)),
+            NewWANEnableUdp=str(int(cur.wanudp if wanudp is None else wanudp)),
+            )
+    def getStatistics(self):
+        """
+        Returns the statistics of the speedtest service.
+        
+        :return: Speedtest Statistics Object
+        :rtype: SpeedtestStatistics
+        """
+        return SpeedtestStatistics(self,self.dynapi.GetStatistics())
+    def resetStatistics(self):
+        """
+        Resets the statistics of the speedtest service.
+        """
+        self.dynapi.ResetStatistics()
+    def getCollector(self,interval=5.0,size=720):
+        """
+        Returns a collector aggregating the speedtest throughput in the background.
+        
+        See :py:class:`SpeedtestCollector()` for the parameters.
+        
+        :return: Speedtest Collector
+        :rtype: SpeedtestCollector
+        """
+        return SpeedtestCollector(self,interval,size)
+
+class SpeedtestInfo(object):
+    """
+    Configuration of the speedtest service.
+    
+    :param API_avm_speedtest api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_speedtest api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    :ivar bool tcp: Flag if the TCP speedtest is enabled in the local network
+    :ivar bool udp: Flag if the UDP speedtest is enabled in the local network
+    :ivar bool udpbidirect: Flag if the bidirectional UDP speedtest is enabled in the local network
+    :ivar bool wantcp: Flag if the TCP speedtest is reachable from the internet
+    :ivar bool wanudp: Flag if the UDP speedtest is reachable from the internet
+    :ivar int port_tcp: Port of the TCP speedtest, ``0`` if unknown
+    :ivar int port_udp: Port of the UDP speedtest, ``0`` if unknown
+    :ivar int port_udpbidirect: Port of the bidirectional UDP speedtest, ``0`` if unknown
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.tcp = data["NewEnableTcp"]=="1"
+        self.udp = data["NewEnableUdp"]=="1"
+        self.udpbidirect = data.get("NewEnableUdpBidirect")=="1"
+        self.wantcp = data["NewWANEnableTcp"]=="1"
+        self.wanudp = data["NewWANEnableUdp"]=="1"
+        self.port_tcp = int(data.get("NewPortTcp") or 0)
+        self.port_udp = int(data.get("NewPortUdp") or 0)
+        self.port_udpbidirect = int(data.get("NewPortUdpBidirect") or 0)
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetInfo()
+        self.info = d
+        self.loadData(d)
+
+class SpeedtestStatistics(object):
+    """
+    Statistics of the speedtest service.
+    
+    :param API_avm_speedtest api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_speedtest api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    :ivar int bytecount: Number of bytes transferred since the last reset
+    :ivar int packetcount: Number of packets transferred since the last reset
+    :ivar int kbits_current: Current throughput in kbit/s
+    :ivar int kbits_avg: Average throughput in kbit/s since the last reset
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.bytecount = int(data["NewByteCount"] or 0)
+        self.packetcount = int(data.get("NewPacketCount") or 0)
+        self.kbits_current = int(data["NewKbitsCurrent"] or 0)
+        self.kbits_avg = int(data["NewKbitsAvg"] or 0)
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetStatistics()
+        self.info = d
+        self.loadData(d)
+
+class SpeedtestCollector(base.PeriodicWorker):
+    """
+    Collector aggregating the throughput of the speedtest service.
+    
+    Every sample costs exactly one ``GetStatistics`` request. Samples are kept in a sliding window of
+    the last ``size`` samples, older samples are discarded automatically.
+    
+    Sampling usually happens in a background thread, see :py:meth:`start()`\ , so the aggregates
+    can be read at any time without waiting for the server.
+    
+    :param API_avm_speedtest api: API object to use when querying for data
+    :param float interval: Optional Time in seconds between samples when running in the background, defaults to 5 seconds
+    :param int size: Optional Number of samples to keep, defaults to 720
+    
+    :ivar API_avm_speedtest api: stores the supplied API object
+    :ivar float interval: stores the supplied interval
+    :ivar int size: stores the supplied size
+    :ivar int count: Total number of samples taken so far
+    :ivar int errors: Total number of failed samples so far
+    
+    Sampling in a background thread is controlled via :py:meth:`start()` and :py:meth:`stop()`\ , see :py:class:`fritzctl.ooapi.base.PeriodicWorker()`\ .
+    Errors while sampling are counted in :py:attr:`errors` and otherwise ignored.
+    """
+    threadname = "fritzctl-speedtestcollector"
+    def __init__(self,api,interval=5.0,size=720):
+        assert size>0
+        super(SpeedtestCollector,self).__init__(interval)
+        self.api = api
+        self.size = size
+        self.count = 0
+        self.errors = 0
+        self._window = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+    def sample(self):
+        """
+        Requests the statistics once and adds the current throughput to the window.
+        
+        :return: Current throughput in kbit/s
+        :rtype: int
+        """
+        stats = self.api.getStatistics()
+        with self._lock:
+            self._window.append((time.monotonic(),time.time(),stats.kbits_current))
+            self.count+=1
+        return stats.kbits_current
+    def getSamples(self,maxage=None):
+        """
+        Returns the samples in the window.
+        
+        :param float maxage: Optional maximum age of the samples in seconds, defaults to the whole window
+        :return: List of 2-tuples of ``(timestamp,kbits)`` with Unix timestamps, oldest first
+        :rtype: list
+        """
+        with self._lock:
+            samples = list(self._window)
+        if maxage is not None:
+            cutoff = time.monotonic()-maxage
+            samples = [s for s in samples if s[0]>=cutoff]
+        return [(wall,kbits) for _,wall,kbits in samples]
+    def getPercentiles(self,percentiles=(50,90,99),maxage=None):
+        """
+        Computes percentiles of the throughput in the window.
+        
+        Percentiles are linearly interpolated between the closest samples.
+        
+        :param percentiles: Optional Percentiles to compute, each between 0 and 100, defaults to ``(50,90,99)``
+        :type percentiles: list or tuple
+        :param float maxage: Optional maximum age of the samples in seconds, defaults to the whole window
+        :return: Dictionary mapping each percentile to the throughput in kbit/s, or an empty dictionary if there are no samples
+        :rtype: dict
+        """
+        values = sorted(v for _,v in self.getSamples(maxage))
+        if not values:
+            return {}
+        out = {}
+        for p in percentiles:
+            assert 0<=p<=100
+            k = (len(values)-1)*p/100.
+            lo = int(k)
+            hi = min(lo+1,len(values)-1)
+            out[p] = values[lo]+(values[hi]-values[lo])*(k-lo)
+        return out
+    def getSummary(self,maxage=None):
+        """
+        Computes minimum, maximum and mean of the throughput in the window.
+        
+        :param float maxage: Optional maximum age of the samples in seconds, defaults to the whole window
+        :return: Dictionary with the keys ``count``\ , ``min``\ , ``max`` and ``mean``\ , the last three are ``None`` if there are no samples
+        :rtype: dict
+        """
+        values = [v for _,v in self.getSamples(maxage)]
+        if not values:
+            return {"count":0,"min":None,"max":None,"mean":None}
+        return {"count":len(values),"min":min(values),"max":max(values),"mean":sum(values)/float(len(values))}
+    
+    def runOnce(self):
+        self.sample()
+    def onError(self,error):
+        self.errors+=1
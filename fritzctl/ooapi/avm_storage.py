@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  avm_storage.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import time
+
+from . import base
+
+class API_avm_storage(base.API_base):
+    """
+    AVM Storage TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("avm_storage")`` or ``session.getOOAPI("urn:dslforum-org:service:X_AVM-DE_Storage:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getInfo(self):
+        """
+        Returns information about the FTP and SMB servers.
+        
+        :return: Storage Information Object
+        :rtype: StorageInfo
+        """
+        return StorageInfo(self,self.dynapi.GetInfo())
+    def getUserInfo(self):
+        """
+        Returns information about the storage user.
+        
+        :return: 2-tuple of ``(enabled,status)``
+        :rtype: tuple
+        """
+        d = self.dynapi.GetUserInfo()
+        return d["NewEnable"]=="1",d.get("NewStatus") or ""
+    def setFTPServer(self,enable):
+        """
+        Enables or disables the FTP server in the local network.
+        
+        :param bool enable: Flag if the FTP server should be enabled
+        """
+        self.dynapi.SetFTPServer(NewFTPEnable=str(int(enable)))
+    def setFTPServerWAN(self,enable,sslonly=True):
+        """
+        Enables or disables access to the FTP server from the internet.
+        
+        :param bool enable: Flag if the FTP server should be reachable from the internet
+        :param bool sslonly: Optional Flag if only encrypted connections should be allowed, defaults to True
+        """
+        self.dynapi.SetFTPServerWAN(NewFTPWANEnable=str(int(enable)),NewFTPWANSSLOnly=str(int(sslonly)))
+    def setSMBServer(self,enable):
+        """
+        Enables or disables the SMB server in the local network.
+        
+        :param bool enable: Flag if the SMB server should be enabled
+        """
+        self.dynapi.SetSMBServer(NewSMBEnable=str(int(enable)))
+    def getSampler(self,configmaxage=3600.0):
+        """
+        Returns a low-overhead sampler for the storage state.
+        
+        See :py:class:`StorageSampler()` for the parameters.
+        
+        :return: Storage Sampler
+        :rtype: StorageSampler
+        """
+        return StorageSampler(self,configmaxage)
+
+class StorageInfo(object):
+    """
+    Information about the FTP and SMB servers.
+    
+    :param API_avm_storage api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_storage api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    Configuration Variables:
+    
+    :ivar bool ftp_enable: Flag if the FTP server is enabled in the local network
+    :ivar bool ftp_wan_enable: Flag if the FTP server is reachable from the internet
+    :ivar bool ftp_wan_sslonly: Flag if only encrypted connections are allowed from the internet
+    :ivar int ftp_wan_port: Port of the FTP server as seen from the internet
+    :ivar bool smb_enable: Flag if the SMB server is enabled
+    
+    Status Variables:
+    
+    :ivar str ftp_status: Status of the FTP server
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.ftp_enable = data["NewFTPEnable"]=="1"
+        self.ftp_status = data["NewFTPStatus"] or ""
+        self.ftp_wan_enable = data["NewFTPWANEnable"]=="1"
+        self.ftp_wan_sslonly = data["NewFTPWANSSLOnly"]=="1"
+        self.ftp_wan_port = int(data["NewFTPWANPort"] or 0)
+        self.smb_enable = data["NewSMBEnable"]=="1"
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetInfo()
+        self.info = d
+        self.loadData(d)
+
+class StorageSampler(object):
+    """
+    Low-overhead sampler for the storage state, e.g. for periodic monitoring.
+    
+    Every sample requests ``GetInfo``\ , as it is the only action returning the FTP status, which changes e.g. whenever clients connect.
+    The FTP and SMB configuration flags are part of the same response, so they are compared on every sample without any extra request.
+    The storage user returned by ``GetUserInfo`` only changes if it is reconfigured, so it is cached and only requested again once
+    it is older than ``configmaxage`` or after :py:meth:`invalidate()`\ . Its status may thus be up to ``configmaxage`` seconds old.
+    A sample therefore usually costs a single request instead of calling every getter of :py:class:`API_avm_storage()`\ .
+    
+    :param API_avm_storage api: API object to use when querying for data
+    :param float configmaxage: Optional maximum age of the cached storage user in seconds, defaults to one hour
+    
+    :ivar API_avm_storage api: stores the supplied API object
+    :ivar float configmaxage: stores the supplied maximum age
+    :ivar info: Storage information of the last sample, or ``None``
+    :type info: StorageInfo or None
+    :ivar user: Cached result of :py:meth:`API_avm_storage.getUserInfo()`\ , or ``None``
+    :type user: tuple or None
+    """
+    def __init__(self,api,configmaxage=3600.0):
+        self.api = api
+        self.configmaxage = configmaxage
+        self.info = None
+        self.user = None
+        self._configtime = 0
+    def sample(self):
+        """
+        Samples the storage state once.
+        
+        :return: Dictionary of all values that changed since the last sample, contains all values for the first sample
+        :rtype: dict
+        """
+        now = time.monotonic()
+        changed = {}
+        if self.user is None or now-self._configtime>self.configmaxage:
+            user = self.api.getUserInfo()
+            if user!=self.user:
+                changed["user_enable"],changed["user_status"] = user
+            self.user = user
+            self._configtime = now
+        if self.info is None:
+            self.info = self.api.getInfo()
+            old = {}
+        else:
+            old = dict(vars(self.info))
+            self.info.reloadData()
+        for k,v in vars(self.info).items():
+            if k not in ("api","info") and old.get(k)!=v:
+                changed[k] = v
+        return changed
+    def invalidate(self):
+        """
+        Forces the cached storage user to be requested again on the next sample.
+        """
+        self.user = None
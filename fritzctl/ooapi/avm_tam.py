@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  avm_tam.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import datetime
+import os
+import xml.etree.ElementTree as ET
+
+from urllib.parse import urlsplit,parse_qs
+
+from . import base
+
+class API_avm_tam(base.API_base):
+    """
+    AVM Answering Machine TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("avm_tam")`` or ``session.getOOAPI("urn:dslforum-org:service:X_AVM-DE_TAM:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getTAMList(self):
+        """
+        Returns all answering machines that are shown in the user interface.
+        
+        :return: List of Answering Machine Information Objects
+        :rtype: list
+        """
+        root = ET.fromstring(self.dynapi.GetList()["NewTAMList"])
+        out = []
+        for item in root.iter("Item"):
+            d = base.itemToDict(item)
+            if d.get("Display","1")!="1":
+                continue
+            out.append(TAMInfo(self,int(d["Index"]),{
+                "NewEnable":d.get("Enable","0"),
+                "NewName":d.get("Name",""),
+                }))
+        return out
+    def getInfo(self,index):
+        """
+        Returns information about the answering machine with the given index.
+        
+        :param int index: Index of the answering machine
+        :return: Answering Machine Information Object
+        :rtype: TAMInfo
+        :raises AssertionError: if the index is invalid, e.g. not an integer or lower than 0
+        """
+        assert isinstance(index,int) and index>=0
+        return TAMInfo(self,index,self.dynapi.GetInfo(NewIndex=index))
+    def setEnable(self,index,enable):
+        """
+        Enables or disables the answering machine with the given index.
+        
+        :param int index: Index of the answering machine
+        :param bool enable: Flag if the answering machine should be enabled
+        """
+        self.dynapi.SetEnable(NewIndex=index,NewEnable=str(int(enable)))
+    def getMessageListURL(self,index):
+        """
+        Returns the URL of the XML message list of the answering machine with the given index.
+        
+        The URL contains a session ID that is also valid for downloading the recordings, see :py:meth:`downloadMessage()`\ .
+        
+        :param int index: Index of the answering machine
+        :return: URL of the message list
+        :rtype: str
+        """
+        return self.dynapi.GetMessageList(NewIndex=index)["NewURL"]
+    def getMessages(self,index):
+        """
+        Returns all messages of the answering machine with the given index.
+        
+        :param int index: Index of the answering machine
+        :return: List of messages as returned by the server
+        :rtype: list
+        """
+        url = self.getMessageListURL(index)
+        r = self.session.getURL(url,stream=True)
+        try:
+            r.raw.decode_content = True
+            return [TAMMessage(self,index,url,base.itemToDict(item)) for item in base.iterXMLItems(r.raw,"Message")]
+        finally:
+            r.close()
+    def markMessage(self,index,msgindex,read=True):
+        """
+        Marks a message as read or unread.
+        
+        :param int index: Index of the answering machine
+        :param int msgindex: Index of the message
+        :param bool read: Optional Flag if the message should be marked as read, defaults to True
+        """
+        self.dynapi.MarkMessage(NewIndex=index,NewMessageIndex=msgindex,NewMarkedAsRead=str(int(read)))
+    def deleteMessage(self,index,msgindex):
+        """
+        Deletes a message.
+        
+        :param int index: Index of the answering machine
+        :param int msgindex: Index of the message
+        """
+        self.dynapi.DeleteMessage(NewIndex=index,NewMessageIndex=msgindex)
+    def downloadMessage(self,message,fname,chunksize=65536):
+        """
+        Downloads the recording of a message to a file.
+        
+        The recording is streamed to disk in chunks of ``chunksize`` bytes, so memory usage does not depend on its length.
+        It is first written to a temporary file next to ``fname`` that is only renamed once the download is complete.
+        
+        :param TAMMessage message: Message to download
+        :param str fname: Name of the file to write to
+        :param int chunksize: Optional size of the chunks in bytes, defaults to 64 KiB
+        :return: Number of bytes written
+        :rtype: int
+        :raises AssertionError: if the message has no recording
+        :raises requests.exceptions.HTTPError: if the server returned an error status
+        """
+        assert message.path
+        r = self.session.getURL(message.getDownloadURL(),stream=True)
+        size = 0
+        tmp = fname+".part"
+        try:
+            with open(tmp,"wb") as f:
+                for chunk in r.iter_content(chunksize):
+                    f.write(chunk)
+                    size+=len(chunk)
+            os.replace(tmp,fname)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            r.close()
+        return size
+    def getSync(self,dest,seen=None):
+        """
+        Returns a helper for downloading new messages of all answering machines.
+        
+        See :py:class:`TAMSync()` for the parameters.
+        
+        :return: Answering Machine Sync Helper
+        :rtype: TAMSync
+        """
+        return TAMSync(self,dest,seen)
+
+class TAMInfo(object):
+    """
+    Answering Machine Information Class.
+    
+    :param API_avm_tam api: API object to use when querying for data
+    :param int index: Index of this answering machine
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_tam api: stores the supplied API object
+    :ivar int index: stores the supplied index
+    :ivar dict info: stores the data in a dictionary
+    
+    :ivar bool enable: Flag if this answering machine is enabled
+    :ivar str name: Name of this answering machine
+    
+    Variables only available when requested via :py:meth:`API_avm_tam.getInfo()`\ , else ``None``\ :
+    
+    :ivar bool running: Flag if this answering machine is currently running
+    :ivar int capacity: Remaining recording capacity in minutes
+    :ivar int status: Status bit mask
+    """
+    def __init__(self,api,index,info):
+        self.api = api
+        self.index = index
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.enable = data["NewEnable"]=="1"
+        self.name = data["NewName"] or ""
+        self.running = data["NewTAMRunning"]=="1" if "NewTAMRunning" in data else None
+        self.capacity = int(data["NewCapacity"] or 0) if "NewCapacity" in data else None
+        self.status = int(data["NewStatus"] or 0) if "NewStatus" in data else None
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetInfo(NewIndex=self.index)
+        self.info = d
+        self.loadData(d)
+    def getMessages(self):
+        """
+        Returns all messages of this answering machine.
+        
+        See :py:meth:`API_avm_tam.getMessages()` for details.
+        """
+        return self.api.getMessages(self.index)
+
+class TAMMessage(object):
+    """
+    Single message of an answering machine.
+    
+    :param API_avm_tam api: API object this message was requested with
+    :param int tam: Index of the answering machine
+    :param str listurl: URL of the message list this message was taken from
+    :param dict info: Dictionary containing the entry of the message list; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_avm_tam api: stores the supplied API object
+    :ivar int tam: stores the supplied answering machine index
+    :ivar str listurl: stores the supplied URL
+    
+    :ivar int index: Index of this message
+    :ivar bool new: Flag if this message has not been marked as read yet
+    :ivar str caller: Number of the caller
+    :ivar str called: Number that was called
+    :ivar str name: Name of the caller as found in the phonebook
+    :ivar date: Date and time of the message, in local time of the server
+    :type date: datetime.datetime or None
+    :ivar int duration: Duration of the message in seconds, with a resolution of one minute
+    :ivar str path: Path of the recording on the server, may be empty
+    """
+    __slots__ = ["api","tam","listurl","index","new","caller","called","name","date","duration","path"]
+    def __init__(self,api,tam,listurl,info):
+        self.api = api
+        self.tam = tam
+        self.listurl = listurl
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied message list entry.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.index = int(data["Index"])
+        self.new = data.get("New","0")=="1"
+        self.caller = data.get("Number","")
+        self.called = data.get("Called","")
+        self.name = data.get("Name","")
+        try:
+            self.date = datetime.datetime.strptime(data.get("Date",""),"%d.%m.%y %H:%M")
+        except ValueError:
+            self.date = None
+        h,_,m = data.get("Duration","0:00").partition(":")
+        self.duration = int(h or 0)*3600+int(m or 0)*60
+        self.path = data.get("Path","")
+    def getDownloadURL(self):
+        """
+        Returns the URL for downloading the recording of this message.
+        
+        The session ID is taken from the URL of the message list.
+        
+        :rtype: str
+        """
+        u = urlsplit(self.listurl)
+        url = self.path
+        if "://" not in url:
+            url = "%s://%s%s"%(u.scheme,u.netloc,url) if u.netloc else url
+        sid = parse_qs(u.query).get("sid")
+        if sid and "sid=" not in url:
+            url+=("&" if "?" in url else "?")+"sid="+sid[0]
+        return url
+    def __repr__(self):
+        return "<TAMMessage(%d,%d,%s)>"%(self.tam,self.index,self.caller)
+
+class TAMSync(object):
+    """
+    Helper class for downloading new messages of all answering machines.
+    
+    Each call to :py:meth:`sync()` only downloads the recordings of messages whose index has not been seen before.
+    :py:attr:`seen` can be stored and passed to a new instance to resume the synchronization later.
+    
+    Note that the server may reuse the index of a deleted message for a later message.
+    Indices that are no longer in the message list are removed from :py:attr:`seen` on every sync,
+    so a later message reusing the index is downloaded as a new message. If a message is deleted and its index reused
+    between two syncs, the new message cannot be told apart from the old one and is not downloaded.
+    
+    :param API_avm_tam api: API object to use when querying for data
+    :param str dest: Directory to store the recordings in
+    :param dict seen: Optional Dictionary mapping answering machine indices to sets of message indices already seen
+    
+    :ivar API_avm_tam api: stores the supplied API object
+    :ivar str dest: stores the supplied directory
+    :ivar dict seen: Dictionary mapping answering machine indices to sets of message indices already seen
+    """
+    def __init__(self,api,dest,seen=None):
+        self.api = api
+        self.dest = dest
+        self.seen = {int(k):set(v) for k,v in (seen or {}).items()}
+    def getFilename(self,message):
+        """
+        Returns the name of the file the recording of the given message is stored in.
+        
+        The name contains the date of the message, so a later message reusing the index does not overwrite the recording.
+        May be overridden to customize the naming scheme.
+        
+        :param TAMMessage message: Message to name the file for
+        :rtype: str
+        """
+        if message.date is None:
+            return os.path.join(self.dest,"tam%d-%d.wav"%(message.tam,message.index))
+        return os.path.join(self.dest,"tam%d-%d-%s.wav"%(message.tam,message.index,message.date.strftime("%Y%m%d%H%M")))
+    def sync(self,tams=None,maxworkers=4,markread=True):
+        """
+        Downloads the recordings of all new messages.
+        
+        Recordings are downloaded concurrently using up to ``maxworkers`` concurrent requests.
+        Once all downloads have finished, the successfully downloaded messages are marked as read,
+        using one ``MarkMessage`` request per message, again with up to ``maxworkers`` concurrent requests.
+        
+        Messages that failed to download are not marked as seen and will be tried again on the next call.
+        Messages that were downloaded but could not be marked as read are contained in both lists,
+        they are still marked as new on the server but will not be downloaded again.
+        
+        :param list tams: Optional list of answering machine indices, defaults to all answering machines
+        :param int maxworkers: Optional maximum number of concurrent requests, defaults to 4
+        :param bool markread: Optional Flag if downloaded messages should be marked as read, defaults to True
+        :return: 2-tuple of ``(downloaded,failed)`` where downloaded is a list of 2-tuples of ``(message,filename)`` and failed is a list of 2-tuples of ``(message,exception)`` for all failed downloads and markings
+        :rtype: tuple
+        """
+        if tams is None:
+            tams = [t.index for t in self.api.getTAMList()]
+        todo = []
+        for tam in tams:
+            messages = self.api.getMessages(tam)
+            seen = self.seen.setdefault(tam,set())
+            seen.intersection_update(msg.index for msg in messages)
+            for msg in messages:
+                if msg.index in seen:
+                    continue
+                if not msg.path:
+                    # Nothing to download, e.g. a message without a recording
+                    seen.add(msg.index)
+                    continue
+                todo.append(msg)
+        if todo and not os.path.isdir(self.dest):
+            os.makedirs(self.dest)
+        downloaded,failed = [],[]
+        for msg,_,error in base.runConcurrent(lambda m:self.api.downloadMessage(m,self.getFilename(m)),todo,maxworkers):
+            if error is not None:
+                failed.append((msg,error))
+            else:
+                downloaded.append((msg,self.getFilename(msg)))
+                self.seen[msg.tam].add(msg.index)
+        if markread:
+            unread = [msg for msg,_ in downloaded if msg.new]
+            for msg,_,error in base.runConcurrent(lambda m:self.api.markMessage(m.tam,m.index),unread,maxworkers):
+                if error is not None:
+                    failed.append((msg,error))
+                else:
+                    msg.new = False
+        return downloaded,failed
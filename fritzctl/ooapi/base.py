@@ -22,6 +22,11 @@
 #  
 #  
 
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
 class API_base(object):
     """
     Base class for all Object-Oriented API Classes.
@@ -39,3 +44,245 @@ class API_base(object):
         self.session = session
         self.urn = urn
         self.dynapi = self.session.getAPI(self.urn)
+
+def runConcurrent(func,items,maxworkers=4):
+    """
+    Calls ``func`` once for every item, using at most ``maxworkers`` threads at once.
+    
+    Exceptions raised by ``func`` are caught and returned instead of being raised, so that one failed item does not abort the others.
+    
+    :param func: Callable taking a single item
+    :param items: Iterable of items
+    :param int maxworkers: Optional maximum number of concurrent calls, defaults to 4
+    :return: List of 3-tuples of ``(item,result,exception)`` in the same order as the items, where either result or exception is ``None``
+    :rtype: list
+    """
+    items = list(items)
+    if not items:
+        return []
+    def _call(item):
+        try:
+            return item,func(item),None
+        except Exception as e:
+            return item,None,e
+    if maxworkers<=1 or len(items)==1:
+        return [_call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(maxworkers,len(items))) as pool:
+        return list(pool.map(_call,items))
+
+class PeriodicWorker(object):
+    """
+    Base class for samplers and watchers that can run in a background thread.
+    
+    Subclasses implement :py:meth:`runOnce()` and may override :py:meth:`onError()`\ .
+    :py:meth:`runOnce()` is called every ``interval`` seconds at a fixed rate. Calls that could not be made in time
+    are skipped instead of being made in a burst.
+    
+    :param float interval: Time in seconds between two calls of :py:meth:`runOnce()`
+    
+    :ivar float interval: stores the supplied interval
+    """
+    threadname = "fritzctl-worker"
+    """
+    Name of the background thread.
+    """
+    def __init__(self,interval):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+    def runOnce(self):
+        """
+        Does the work once, called by the background thread.
+        """
+        raise NotImplementedError("runOnce() not implemented by %s"%self.__class__.__name__)
+    def onError(self,error):
+        """
+        Called by the background thread if :py:meth:`runOnce()` raised an error, errors are ignored by default.
+        
+        :param Exception error: Error raised
+        """
+        pass
+    def start(self):
+        """
+        Starts calling :py:meth:`runOnce()` in a background thread every :py:attr:`interval` seconds.
+        
+        Does nothing if the background thread is already running.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,name=self.threadname,daemon=True)
+        self._thread.start()
+    def stop(self):
+        """
+        Stops the background thread and waits for it to finish.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    def _run(self):
+        nextrun = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.runOnce()
+            except Exception as e:
+                self.onError(e)
+            nextrun += self.interval
+            delay = nextrun-time.monotonic()
+            if delay<0:
+                nextrun = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+class EnumerationCursor(object):
+    """
+    Cursor for walking an indexed table one entry at a time, e.g. the host list.
+    
+    The cursor keeps all entries fetched so far and the next index, so the walk can be continued with :py:meth:`step()`
+    after an error or spread across several calls, e.g. one per tick of a scheduler.
+    If an error occurs, the index is not advanced and the failed entry is fetched again on the next step.
+    
+    If ``version`` is given, it is called when the walk starts and again before every resumed step.
+    If the returned value changed, the table has been modified in between and the walk starts over,
+    so the result never mixes entries of different versions of the table.
+    
+    :param fetch: Callable taking an index and returning the entry, must raise :py:exc:`ValueError` if the index is out of range and ``length`` is not given
+    :param length: Optional Callable returning the number of entries, if not given the walk ends at the first :py:exc:`ValueError`
+    :param version: Optional Callable returning a value that changes whenever the table changes, e.g. a change counter
+    :param int limit: Optional maximum number of entries, defaults to no limit
+    
+    :ivar list items: Entries fetched so far, ordered by their index
+    :ivar int index: Index of the next entry to fetch
+    :ivar bool done: Flag if the walk is complete
+    :ivar int restarts: Number of times the walk started over because the table changed
+    """
+    def __init__(self,fetch,length=None,version=None,limit=-1):
+        self.fetch = fetch
+        self.length = length
+        self.version = version
+        self.limit = limit
+        self.restarts = 0
+        self.reset()
+    def reset(self):
+        """
+        Discards all progress, the next step starts the walk over.
+        """
+        self.items = []
+        self.index = 0
+        self.done = False
+        self._total = None
+        self._version = None
+        self._started = False
+    def _start(self):
+        self.items = []
+        self.index = 0
+        self.done = False
+        self._version = self.version() if self.version is not None else None
+        self._total = self.length() if self.length is not None else None
+        if self.limit>=0:
+            self._total = self.limit if self._total is None else min(self._total,self.limit)
+        self._started = True
+    def step(self,n=1):
+        """
+        Fetches up to ``n`` further entries.
+        
+        :param int n: Optional maximum number of entries to fetch, defaults to 1
+        :return: List of the entries fetched by this step
+        :rtype: list
+        :raises Exception: any exception raised while fetching, the cursor can be resumed afterwards
+        """
+        if self.done:
+            return []
+        if not self._started:
+            self._start()
+        elif self.version is not None and self.index>0:
+            v = self.version()
+            if v!=self._version:
+                self.restarts+=1
+                self._start()
+        out = []
+        while len(out)<n:
+            if self._total is not None and self.index>=self._total:
+                self.done = True
+                break
+            try:
+                item = self.fetch(self.index)
+            except ValueError:
+                if self.length is not None:
+                    raise
+                self.done = True
+                break
+            out.append(item)
+            self.items.append(item)
+            self.index+=1
+        if self._total is not None and self.index>=self._total:
+            self.done = True
+        return out
+    def run(self):
+        """
+        Fetches all remaining entries.
+        
+        :return: All entries, including those fetched by previous steps
+        :rtype: list
+        """
+        while not self.done:
+            self.step(64)
+        return self.items
+
+def iterXMLItems(f,tag):
+    """
+    Incrementally parses the XML document in the given file-like object and yields each element with the given tag.
+    
+    Elements are removed from the tree after being yielded, so memory usage does not depend on the size of the document.
+    You should not keep references to the yielded elements, use :py:func:`itemToDict()` or similiar to extract the data instead.
+    
+    Text of all elements without children that are not part of an yielded element is collected in the ``header``
+    dictionary of the returned iterator, e.g. the ``timestamp`` of a call list.
+    
+    :param f: File-like object to read the XML document from
+    :param str tag: Tag of the elements to return
+    :return: Iterator of :py:class:`xml.etree.ElementTree.Element` instances
+    """
+    return _XMLItemIterator(f,tag)
+
+def itemToDict(elem):
+    """
+    Converts a flat XML element, e.g. as returned by :py:func:`iterXMLItems()`\ , to a dictionary.
+    
+    :param elem: XML Element
+    :return: Dictionary mapping the tags of all direct children to their text, missing text is mapped to an empty string
+    :rtype: dict
+    """
+    return {child.tag:(child.text or "") for child in elem}
+
+class _XMLItemIterator(object):
+    def __init__(self,f,tag):
+        self.f = f
+        self.tag = tag
+        self.header = {}
+        self._it = self._iter()
+    def __iter__(self):
+        return self
+    def __next__(self):
+        return next(self._it)
+    def _iter(self):
+        stack = []
+        initem = 0
+        for event,elem in ET.iterparse(self.f,events=("start","end")):
+            if event=="start":
+                stack.append(elem)
+                if elem.tag==self.tag:
+                    initem+=1
+                continue
+            stack.pop()
+            if elem.tag==self.tag:
+                initem-=1
+                if initem==0:
+                    yield elem
+                    if stack:
+                        stack[-1].remove(elem)
+                    elem.clear()
+            elif initem==0 and stack and len(elem)==0:
+                self.header[elem.tag] = elem.text or ""
+                stack[-1].remove(elem)
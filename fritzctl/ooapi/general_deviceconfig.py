@@ -22,11 +22,24 @@
 #  
 #  
 
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
 import requests
-from requests.auth import HTTPDigestAuth
 
 from . import base
 
+class IncompleteConfigFileError(ValueError):
+    """
+    Raised if a downloaded configfile is incomplete, e.g. because the connection was closed early.
+    
+    Subclass of :py:exc:`ValueError`\ , so existing handlers for incomplete configfiles also handle this error.
+    """
+
 class API_general_deviceconfig(base.API_base):
     """
     Device Configuration TR64 Object-Oriented API.
@@ -119,11 +132,71 @@ class API_general_deviceconfig(base.API_base):
         """
         Helper method wrapping :py:meth:`getConfigFileURL()` for an easier way to get the configfile.
         
+        .. seealso::
+           
+           See :py:meth:`downloadConfigFile()` for writing the configfile directly to a file without keeping it in memory.
+        
         :param str password: Password used to encrypt the configfile, needed to decrypt
         :return: The raw encrypted Configfile
-        :rtype: str
+        :rtype: bytes
+        """
+        f = io.BytesIO()
+        self.downloadConfigFile(password,f)
+        return f.getvalue()
+    def downloadConfigFile(self,password,dest,chunksize=65536,timeout=None):
+        """
+        Downloads the encrypted configfile to a file, streaming it in chunks of ``chunksize`` bytes.
+        
+        The download uses the persistent connection of the session, see :py:meth:`Session.getURL() <fritzctl.session.Session.getURL>`\ .
+        
+        The configfile is verified before this method returns:
+        its size must match the size announced by the server and it must contain the complete export, including the end marker.
+        If ``dest`` is a file name, the configfile is first written to a temporary file next to it that is only renamed once it has been verified.
+        
+        :param str password: Password used to encrypt the configfile, needed to decrypt
+        :param dest: File name or binary file object to write to
+        :type dest: str or file
+        :param int chunksize: Optional size of the chunks in bytes, defaults to 64 KiB
+        :param float timeout: Optional timeout for connecting and between chunks, defaults to the timeout of the session
+        :return: 2-tuple of ``(size,sha256)`` with the size in bytes and the hex-encoded SHA-256 digest of the configfile
+        :rtype: tuple
+        :raises ValueError: if the password was rejected
+        :raises IncompleteConfigFileError: if the configfile is incomplete
+        :raises requests.exceptions.RequestException: if the download failed
         """
-        return requests.get(self.getConfigFileURL(password),auth=HTTPDigestAuth(self.session.user,self.session.pwd)).content
+        if isinstance(dest,str):
+            tmp = dest+".part"
+            try:
+                with open(tmp,"wb") as f:
+                    out = self.downloadConfigFile(password,f,chunksize,timeout)
+                os.replace(tmp,dest)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            return out
+        
+        r = self.session.getURL(self.getConfigFileURL(password),stream=True,auth=True,timeout=timeout)
+        h = hashlib.sha256()
+        size = 0
+        head = b""
+        tail = b""
+        try:
+            for chunk in r.iter_content(chunksize):
+                dest.write(chunk)
+                h.update(chunk)
+                size+=len(chunk)
+                if len(head)<4:
+                    head+=chunk[:4]
+                tail = (tail+chunk)[-64:]
+        finally:
+            r.close()
+        expected = r.headers.get("Content-Length")
+        if expected is not None and r.headers.get("Content-Encoding") is None and int(expected)!=size:
+            raise IncompleteConfigFileError("Incomplete configfile: got %d of %s bytes"%(size,expected))
+        if not head.startswith(b"****") or b"END OF EXPORT" not in tail:
+            raise IncompleteConfigFileError("Incomplete configfile: export markers missing")
+        return size,h.hexdigest()
     
     def setConfigFile(self,password,configurl):
         """
@@ -153,9 +226,57 @@ class API_general_deviceconfig(base.API_base):
         Make sure that your URLs end either with a slash or a questionmark, else you will get ConnectionErrors.
         Also, you must include a scheme.
         
+        The request uses the persistent connection and the timeout of the session, see :py:meth:`Session.getURL() <fritzctl.session.Session.getURL>`\ .
+        
         :param str url: URL to GET the data from
         :return: The raw page content
         :rtype: str
         :raises requests.exceptions.*: if there is an error while getting the URL
         """
-        return requests.get(url+self.createURLSessionID()).content
+        return self.session.getURL(url+self.createURLSessionID()).content
+
+def downloadConfigFiles(jobs,password,retries=2,retrydelay=1.0,maxworkers=8,timeout=None):
+    """
+    Downloads the configfiles of many servers concurrently.
+    
+    Every attempt requests a new URL via :py:meth:`API_general_deviceconfig.getConfigFileURL()` right before downloading,
+    so retries are not affected by the limited validity of the URL.
+    Seekable file objects are rewound and truncated before every attempt.
+    Other file objects, e.g. pipes or sockets, cannot be rewound, so the configfile is downloaded to a temporary file first
+    and only copied to ``dest`` once it has been verified.
+    Only transport errors and incomplete configfiles are retried, other errors like a rejected password are raised immediately.
+    Failed downloads are retried up to ``retries`` times, waiting ``retrydelay`` seconds before the first retry and twice as long before every further retry.
+    
+    :param list jobs: List of 2-tuples of ``(session,dest)``\ , see :py:meth:`API_general_deviceconfig.downloadConfigFile()` for ``dest``
+    :param str password: Password used to encrypt the configfiles
+    :param int retries: Optional maximum number of retries per server, defaults to 2
+    :param float retrydelay: Optional delay before the first retry in seconds, defaults to 1 second
+    :param int maxworkers: Optional maximum number of servers to download from concurrently, defaults to 8
+    :param float timeout: Optional timeout, see :py:meth:`API_general_deviceconfig.downloadConfigFile()`
+    :return: List of 3-tuples of ``(job,result,exception)`` in the order of ``jobs``\ , where result is the return value of :py:meth:`API_general_deviceconfig.downloadConfigFile()` or ``None`` if all attempts failed
+    :rtype: list
+    """
+    def _download(job):
+        session,dest = job
+        api = session.getOOAPI("general_deviceconfig")
+        if isinstance(dest,str) or (hasattr(dest,"seekable") and dest.seekable() and hasattr(dest,"truncate")):
+            return _attempts(api,dest)
+        with tempfile.TemporaryFile() as f:
+            out = _attempts(api,f)
+            f.seek(0)
+            shutil.copyfileobj(f,dest)
+        return out
+    def _attempts(api,dest):
+        delay = retrydelay
+        for attempt in range(retries+1):
+            if not isinstance(dest,str):
+                dest.seek(0)
+                dest.truncate()
+            try:
+                return api.downloadConfigFile(password,dest,timeout=timeout)
+            except (requests.RequestException,IncompleteConfigFileError):
+                if attempt==retries:
+                    raise
+            time.sleep(delay)
+            delay*=2
+    return base.runConcurrent(_download,jobs,maxworkers)
@@ -23,11 +23,35 @@
 #  
 
 import re
+import time
+import datetime
 
 _provisioningpattern = re.compile(r"[0-9]{3}\.[0-9]{3}\.[0-9]{3}\.[0-9]{3}")
+_logpattern = re.compile(r"^([0-9]{2}\.[0-9]{2}\.[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}) (.*)$")
 
 from . import base
 
+LOGCATEGORIES = [
+    ("WLAN","wlan"),
+    ("DSL","internet"),
+    ("Internet","internet"),
+    ("PPPoE","internet"),
+    ("IPv6","internet"),
+    ("Telefonie","telephony"),
+    ("Rufnummer","telephony"),
+    ("DECT","telephony"),
+    ("USB","usb"),
+    ("Smart Home","homeauto"),
+    ]
+"""
+List of ``(keyword,category)`` pairs used to assign a category to device log messages.
+
+The device log itself does not contain any categories, this list is checked in order and the category
+of the first keyword found in the message is used. Messages without any keyword are categorized as ``system``\ .
+
+You may modify this list to suit the language of your device.
+"""
+
 class API_general_deviceinfo(base.API_base):
     """
     Device Information TR64 Object-Oriented Wrapper API.
@@ -36,14 +60,19 @@ class API_general_deviceinfo(base.API_base):
     
     Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
     """
-    def getDeviceInfo(self):
+    def getDeviceInfo(self,log=True):
         """
         Returns an information object with all relevant data.
         
+        If ``log`` is ``False``\ , the device log contained in the response is discarded immediately and
+        :py:attr:`DeviceInfo.devicelog` will be ``None``\ . Note that the server always sends the whole log in the response,
+        so this only saves memory if the object is kept, not a request or any data transferred.
+        
+        :param bool log: Optional Flag if the device log should be stored, defaults to True
         :return: Information Object about the server
         :rtype: DeviceInfo
         """
-        return DeviceInfo(self,self.dynapi.GetInfo())
+        return DeviceInfo(self,self.dynapi.GetInfo(),log)
     def setProvisioningCode(self,code):
         """
         Sets the TR-069 Provisioning Code.
@@ -65,6 +94,27 @@ class API_general_deviceinfo(base.API_base):
         :rtype: str
         """
         return self.dynapi.GetDeviceLog()["NewDeviceLog"]
+    def getLogEntries(self):
+        """
+        Returns the device log since the last reboot as a list of structured entries.
+        
+        .. seealso::
+           
+           See :py:meth:`getLogTail()` if you need to poll the log regularly.
+        
+        :return: List of log entries, oldest first
+        :rtype: List of :py:class:`LogEntry()`
+        """
+        return parseDeviceLog(self.getDeviceLog())
+    def getLogTail(self,hwm=None):
+        """
+        Returns a helper object that only returns log entries not yet seen.
+        
+        :param hwm: Optional high-water mark to start from, see :py:attr:`DeviceLogTail.hwm`
+        :return: Log Tail Object
+        :rtype: DeviceLogTail
+        """
+        return DeviceLogTail(self,hwm)
     def getSecurityPort(self):
         """
         Returns the secure port number used for secure TR64 Connections.
@@ -80,9 +130,11 @@ class DeviceInfo(object):
     
     :param API_general_deviceinfo api: API object to use when querying for data
     :param dict info: Dictionary containing the TR64 Response with all the data about the device; automatically passed to :py:meth:`loadData()`
+    :param bool log: Optional Flag if the device log should be stored, defaults to True
     
     :ivar API_general_deviceinfo api: stores the supplied API object
-    :ivar dict info: stores the data in a dictionary
+    :ivar dict info: stores the data in a dictionary, without the ``NewDeviceLog`` key if :py:attr:`log` is ``False``
+    :ivar bool log: stores the supplied flag
     
     General Device Variables:
     
@@ -97,12 +149,16 @@ class DeviceInfo(object):
     :ivar str specversion: Version of the Specification, e.g. ``1.0``
     :ivar str provisioningcode: TR-069 Provisioning Code, can be set via :py:meth:`API_general_deviceinfo.setProvisioningCode()`
     :ivar int uptime: Uptime of the Device in seconds, as of the creation of this object. Can be refreshed with :py:meth:`reloadData()`
-    :ivar str devicelog: String containing the log of the device, see :py:meth:`API_general_deviceinfo.getDeviceLog()` for more information.
+    :ivar devicelog: String containing the log of the device, see :py:meth:`API_general_deviceinfo.getDeviceLog()` for more information.
+    :type devicelog: str or None
     
     All the examples are based on a FRITZ!Box 7580 on the newest Beta Firmware as of the 12th of July 2016.
     """
-    def __init__(self,api,info):
+    def __init__(self,api,info,log=True):
         self.api = api
+        self.log = log
+        if not log:
+            info.pop("NewDeviceLog",None)
         self.info = info
         self.loadData(info)
     def loadData(self,data):
@@ -121,11 +177,131 @@ class DeviceInfo(object):
         self.specversion = data["NewSpecVersion"]
         self.provisioningcode = data["NewProvisioningCode"]
         self.uptime = int(data["NewUpTime"])
-        self.devicelog = data["NewDeviceLog"]
+        self.devicelog = data["NewDeviceLog"] if self.log else None
     def reloadData(self):
         """
         Reloads the data from the server and updates it in-place.
+        
+        Note that the device log will only be stored if :py:attr:`log` is ``True``\ .
         """
         d = self.api.dynapi.GetInfo()
+        if not self.log:
+            d.pop("NewDeviceLog",None)
         self.info = d
         self.loadData(d)
+
+def parseDeviceLog(log,hwm=None):
+    """
+    Parses the raw device log as returned by :py:meth:`API_general_deviceinfo.getDeviceLog()`\ .
+    
+    Lines without a valid timestamp are treated as a continuation of the previous message, lines before the first entry are skipped.
+    
+    If a high-water mark is given, parsing stops as soon as an entry at or below the mark is reached,
+    since the device log is sorted newest first. This avoids re-parsing the whole log when polling.
+    
+    :param str log: Raw device log
+    :param hwm: Optional high-water mark, see :py:attr:`DeviceLogTail.hwm`
+    :return: List of log entries, oldest first
+    :rtype: List of :py:class:`LogEntry()`
+    """
+    out = []
+    for line in log.split("\n"):
+        m = _logpattern.match(line)
+        entry = None
+        if m is not None:
+            try:
+                entry = LogEntry(m.group(1),m.group(2))
+            except ValueError:
+                # Matches the pattern, but is not a valid date, e.g. 31.02.20
+                pass
+        if entry is None:
+            if out and line.strip():
+                out[-1].message += "\n"+line.strip()
+            continue
+        if hwm is not None and (entry.stamp,entry.message) in hwm[1]:
+            break
+        if hwm is not None and entry.timestamp<hwm[0]:
+            break
+        out.append(entry)
+    out.reverse()
+    return out
+
+class LogEntry(object):
+    """
+    Single entry of the device log.
+    
+    :param str stamp: Timestamp as found in the log, e.g. ``19.10.26 12:34:56``
+    :param str message: First line of the message
+    
+    :ivar datetime.datetime timestamp: Time this entry was logged at, in local time of the device
+    :ivar str category: Category of the message, see :py:data:`LOGCATEGORIES`
+    :ivar str message: Message of this entry, continuation lines are joined with newlines
+    :ivar str stamp: Raw timestamp as found in the log
+    """
+    __slots__ = ["timestamp","category","message","stamp"]
+    def __init__(self,stamp,message):
+        self.stamp = stamp
+        self.timestamp = datetime.datetime.strptime(stamp,"%d.%m.%y %H:%M:%S")
+        self.message = message
+        self.category = "system"
+        for keyword,category in LOGCATEGORIES:
+            if keyword in message:
+                self.category = category
+                break
+    def __iter__(self):
+        return iter((self.timestamp,self.category,self.message))
+    def __repr__(self):
+        return "<LogEntry(%s,%s,%r)>"%(self.stamp,self.category,self.message)
+
+class DeviceLogTail(object):
+    """
+    Helper class for incrementally reading the device log.
+    
+    Each call to :py:meth:`tail()` only returns entries that have not been returned before.
+    
+    :param API_general_deviceinfo api: API object to use when querying for data
+    :param hwm: Optional high-water mark to start from, e.g. a previously stored :py:attr:`hwm`
+    
+    :ivar API_general_deviceinfo api: stores the supplied API object
+    :ivar hwm: High-water mark, 2-tuple of ``(timestamp,entries)`` where entries is a set of ``(stamp,message)`` tuples
+               of all entries with the newest timestamp seen so far, or ``None`` if nothing has been read yet.
+               Can be stored and passed to a new instance to resume.
+    """
+    def __init__(self,api,hwm=None):
+        self.api = api
+        self.hwm = hwm
+    def poll(self):
+        """
+        Requests the device log once and returns all new entries.
+        
+        :return: List of new log entries, oldest first
+        :rtype: List of :py:class:`LogEntry()`
+        """
+        entries = parseDeviceLog(self.api.getDeviceLog(),self.hwm)
+        if entries:
+            newest = entries[-1].timestamp
+            if self.hwm is not None and self.hwm[0]==newest:
+                seen = set(self.hwm[1])
+            else:
+                seen = set()
+            for entry in entries:
+                if entry.timestamp==newest:
+                    seen.add((entry.stamp,entry.message.split("\n")[0]))
+            self.hwm = (newest,frozenset(seen))
+        return entries
+    def tail(self,follow=False,interval=30.0):
+        """
+        Generator yielding all new entries since the last poll.
+        
+        If ``follow`` is ``True``\ , this generator will not stop and poll the device every ``interval`` seconds.
+        
+        :param bool follow: Optional Flag if the log should be polled continuously, defaults to False
+        :param float interval: Optional Time in seconds between polls, only used if ``follow`` is set
+        :return: Generator of new log entries, oldest first
+        """
+        while True:
+            for entry in self.poll():
+                yield entry
+            if not follow:
+                return
+            time.sleep(interval)
@@ -22,6 +22,9 @@
 #  
 #  
 
+import threading
+import time
+
 from . import base
 
 class API_general_hosts(base.API_base):
@@ -63,7 +66,7 @@ class API_general_hosts(base.API_base):
         :raises ValueError: if the MAC Address is unknown
         """
         assert isinstance(mac,str)
-        d = self.dynapi.GetSpecificHostEntry(NewMACAdress=mac)
+        d = self.dynapi.GetSpecificHostEntry(NewMACAddress=mac)
         d["NewMACAddress"]=mac
         if ext:
             d.update(self.dynapi.callAPI("X_AVM-DE_GetSpecificHostEntryExt",NewMACAddress=mac))
@@ -91,6 +94,54 @@ class API_general_hosts(base.API_base):
         for i in range(self.getHostListLength()):
             out.append(self.getHostByIndex(i,ext=ext))
         return out
+    def getHostListCursor(self,ext=True):
+        """
+        Returns a cursor for walking the host list that can be resumed after an error.
+        
+        If the server supports the change counter, see :py:meth:`getChangeCounter()`\ , the walk starts over
+        whenever the host list changed between two steps.
+        
+        :param bool ext: Optional Flag if information from the AVM Extension should be integrated, defaults to True
+        :return: Cursor yielding :py:class:`Host()` instances
+        :rtype: fritzctl.ooapi.base.EnumerationCursor
+        """
+        version = None
+        if self.session.hasAction(self.urn,"X_AVM-DE_GetChangeCounter"):
+            version = self.getChangeCounter
+        return base.EnumerationCursor(lambda i:self.getHostByIndex(i,ext=ext),self.getHostListLength,version)
+    def getHostListPath(self):
+        """
+        Returns the path of the XML host list containing all hosts with extension information.
+        
+        The path contains a session ID and is only valid for a limited time.
+        
+        :return: Path of the host list, relative to the server
+        :rtype: str
+        """
+        return self.dynapi.callAPI("X_AVM-DE_GetHostListPath")["NewX_AVM-DE_HostListPath"]
+    def getHostTable(self,maxage=None):
+        """
+        Returns a snapshot of all hosts, requested with a single download instead of one request per host.
+        
+        If ``maxage`` is given, the snapshot may be taken from the cache of the session, see :py:meth:`Session.getCached() <fritzctl.session.Session.getCached>`\ .
+        
+        :param float maxage: Optional maximum age in seconds of a cached snapshot, defaults to always downloading the host list
+        :return: Host Table
+        :rtype: HostTable
+        """
+        table = HostTable(self)
+        table.loadData(self.session.getCached("hosts",table.downloadData,maxage))
+        return table
+    def getPresenceWatcher(self,interval=2.0,mininterval=5.0,fullinterval=300.0,wlan=True,walkinterval=60.0):
+        """
+        Returns a watcher detecting hosts joining and leaving the network.
+        
+        See :py:class:`PresenceWatcher()` for the parameters.
+        
+        :return: Presence Watcher
+        :rtype: PresenceWatcher
+        """
+        return PresenceWatcher(self,interval,mininterval,fullinterval,wlan,walkinterval)
     def getMacByIndex(self,index):
         """
         Returns the MAC Address of the device associated with the given index.
@@ -240,3 +291,266 @@ class Host(object):
         Sends a WakeOnLAN request to this host and tries to wake it up.
         """
         self.api.wakeUp(self.mac)
+
+class HostTable(object):
+    """
+    Local snapshot of all hosts, indexed by MAC and IP Address.
+    
+    The snapshot is downloaded as a single XML file via :py:meth:`API_general_hosts.getHostListPath()`
+    and only updated by :py:meth:`reloadData()`\ .
+    
+    :param API_general_hosts api: API object to use when querying for data
+    
+    :ivar API_general_hosts api: stores the supplied API object
+    :ivar list hosts: List of all hosts, ordered by their index
+    
+    The :py:attr:`Host.info` dictionary of each host additionally contains all other values of the host list,
+    e.g. ``NewX_AVM-DE_Disallow`` and ``NewX_AVM-DE_WANAccess``\ .
+    Note that the host list does not contain ``NewAddressSource`` and ``NewLeaseTimeRemaining``\ , they are set to empty values.
+    """
+    def __init__(self,api):
+        self.api = api
+        self.hosts = []
+        self._bymac = {}
+        self._byip = {}
+    def reloadData(self):
+        """
+        Downloads the host list and replaces the snapshot.
+        """
+        self.loadData(self.downloadData())
+    def downloadData(self):
+        """
+        Downloads the host list without changing the snapshot.
+        
+        :return: List of dictionaries in the format of :py:attr:`Host.info`
+        :rtype: list
+        """
+        r = self.api.session.getURL(self.api.getHostListPath(),stream=True)
+        r.raw.decode_content = True
+        hosts = []
+        for item in base.iterXMLItems(r.raw,"Item"):
+            d = {"NewAddressSource":"","NewLeaseTimeRemaining":"0"}
+            for k,v in base.itemToDict(item).items():
+                d["New"+k] = v
+            for k in ["NewX_AVM-DE_Port","NewX_AVM-DE_Speed"]:
+                if not d.get(k):
+                    d[k] = "0"
+            d.setdefault("NewX_AVM-DE_UpdateAvailable","0")
+            d.setdefault("NewX_AVM-DE_UpdateSuccessful","")
+            d.setdefault("NewX_AVM-DE_InfoURL","")
+            d.setdefault("NewX_AVM-DE_Model","")
+            d.setdefault("NewX_AVM-DE_URL","")
+            d["_ext"]=True
+            hosts.append(d)
+        return hosts
+    def loadData(self,data):
+        """
+        Replaces the snapshot with the given hosts.
+        
+        :param list data: List of dictionaries as returned by :py:meth:`downloadData()`
+        """
+        hosts = [Host(self.api,i,dict(d)) for i,d in enumerate(data)]
+        self.hosts = hosts
+        self._bymac = {h.mac.upper():h for h in hosts}
+        self._byip = {h.ip:h for h in hosts if h.ip}
+    def __len__(self):
+        return len(self.hosts)
+    def __iter__(self):
+        return iter(self.hosts)
+    def getByMAC(self,mac):
+        """
+        Returns the host with the given MAC Address from the snapshot.
+        
+        :param str mac: MAC Address of the host, case-insensitive
+        :return: Host Information Object or ``None`` if there is no such host
+        :rtype: Host or None
+        """
+        return self._bymac.get(mac.upper())
+    def getByIP(self,ip):
+        """
+        Returns the host with the given IP Address from the snapshot.
+        
+        :param str ip: IP Address of the host
+        :return: Host Information Object or ``None`` if there is no such host
+        :rtype: Host or None
+        """
+        return self._byip.get(ip)
+
+class PresenceEvent(object):
+    """
+    Single event emitted by :py:class:`PresenceWatcher()`\ .
+    
+    :ivar str type: Type of the event, either ``join``\ , ``leave`` or ``ipchange``
+    :ivar str mac: MAC Address of the host
+    :ivar str ip: Current IP Address of the host, may be empty
+    :ivar str oldip: Previous IP Address of the host, only set for ``ipchange`` events, else ``None``
+    :ivar host: Host Information Object, ``None`` if the host is no longer known to the server
+    :type host: Host or None
+    :ivar float time: Time the event was detected at, as returned by :py:func:`time.time()`
+    """
+    __slots__ = ["type","mac","ip","oldip","host","time"]
+    def __init__(self,type,mac,ip,oldip,host,time):
+        self.type = type
+        self.mac = mac
+        self.ip = ip
+        self.oldip = oldip
+        self.host = host
+        self.time = time
+    def __repr__(self):
+        return "<PresenceEvent(%s,%s,%s)>"%(self.type,self.mac,self.ip)
+
+class PresenceWatcher(base.PeriodicWorker):
+    """
+    Watcher detecting hosts joining and leaving the network without polling the full host list.
+    
+    Every poll only requests the change counter of the host list, see :py:meth:`API_general_hosts.getChangeCounter()`\ ,
+    and optionally the number of associated devices of every WLAN.
+    Only if one of these values changed, a snapshot of all hosts is requested and compared to the previous snapshot.
+    Snapshots are requested at most every ``mininterval`` seconds, changes detected in between are handled once the interval has passed.
+    Additionally, a snapshot is requested every ``fullinterval`` seconds to catch changes that are not reflected by these values.
+    
+    If the server does not support the change counter, hosts leaving the LAN are not reflected by any watched value,
+    so a snapshot is requested whenever the minimum interval has passed.
+    If the server does not provide the host list path, see :py:meth:`API_general_hosts.getHostListPath()`\ ,
+    every snapshot has to walk the host list with one request per host. Such snapshots are requested at most every
+    ``walkinterval`` seconds instead of every ``mininterval`` seconds.
+    
+    The first poll only requests the initial snapshot and does not emit any events.
+    
+    Events can be received in three ways:
+    
+    - By calling :py:meth:`poll()` regularly and using the returned events
+    - By registering callbacks with :py:meth:`addCallback()` and polling in a background thread via :py:meth:`start()`
+    - By iterating asynchronously over the watcher, e.g. ``async for event in watcher:``
+    
+    :param API_general_hosts api: API object to use when querying for data
+    :param float interval: Optional Time in seconds between polls when running in the background, defaults to 2 seconds
+    :param float mininterval: Optional minimum time in seconds between two snapshots, defaults to 5 seconds
+    :param float fullinterval: Optional maximum time in seconds between two snapshots, ``None`` disables periodic snapshots, defaults to 5 minutes
+    :param bool wlan: Optional Flag if the number of associated WLAN devices should be watched, defaults to True
+    :param float walkinterval: Optional minimum time in seconds between two snapshots walking the host list, defaults to 1 minute
+    
+    :ivar API_general_hosts api: stores the supplied API object
+    :ivar float interval: stores the supplied interval
+    :ivar float mininterval: stores the supplied minimum interval
+    :ivar float fullinterval: stores the supplied maximum interval
+    :ivar float walkinterval: stores the supplied minimum interval for walking the host list
+    :ivar dict hosts: Dictionary mapping MAC Addresses of all active hosts to their IP Address
+    :ivar int snapshots: Number of snapshots requested so far
+    
+    Polling in a background thread is controlled via :py:meth:`start()` and :py:meth:`stop()`\ , see :py:class:`fritzctl.ooapi.base.PeriodicWorker()`\ .
+    Errors while polling are ignored, the next poll will continue normally.
+    """
+    threadname = "fritzctl-presencewatcher"
+    def __init__(self,api,interval=2.0,mininterval=5.0,fullinterval=300.0,wlan=True,walkinterval=60.0):
+        super(PresenceWatcher,self).__init__(interval)
+        self.api = api
+        self.mininterval = mininterval
+        self.fullinterval = fullinterval
+        self.walkinterval = walkinterval
+        self.hosts = None
+        self.snapshots = 0
+        self.callbacks = []
+        session = api.session
+        self._counter = session.hasAction(api.urn,"X_AVM-DE_GetChangeCounter")
+        self._table = session.hasAction(api.urn,"X_AVM-DE_GetHostListPath")
+        self._wlans = []
+        if wlan:
+            for urn in sorted(api.session.urns):
+                if urn.startswith("urn:dslforum-org:service:WLANConfiguration:") and session.hasAction(urn,"GetTotalAssociations",True):
+                    self._wlans.append(api.session.getAPI(urn))
+        self._signature = None
+        self._pending = False
+        self._lastsnapshot = None
+        self._lock = threading.Lock()
+    def addCallback(self,callback):
+        """
+        Registers a callable that is called with every :py:class:`PresenceEvent()`\ .
+        
+        Callbacks are called by the thread calling :py:meth:`poll()`\ , exceptions raised by callbacks are ignored.
+        
+        :param callback: Callable taking a single event
+        """
+        self.callbacks.append(callback)
+    def removeCallback(self,callback):
+        """
+        Removes a callable registered with :py:meth:`addCallback()`\ .
+        
+        :param callback: Callable to remove
+        """
+        self.callbacks.remove(callback)
+    def _getSignature(self):
+        sig = []
+        if self._counter:
+            sig.append(self.api.getChangeCounter())
+        for api in self._wlans:
+            sig.append(int(api.GetTotalAssociations()["NewTotalAssociations"]))
+        return tuple(sig)
+    def _getSnapshot(self):
+        if self._table:
+            hosts = self.api.getHostTable().hosts
+        else:
+            hosts = self.api.getHostList(ext=False)
+        return {h.mac.upper():h for h in hosts}
+    def poll(self):
+        """
+        Polls the server once and returns all detected events.
+        
+        :return: List of :py:class:`PresenceEvent()` instances
+        :rtype: list
+        """
+        with self._lock:
+            now = time.monotonic()
+            sig = self._getSignature()
+            if sig!=self._signature:
+                self._signature = sig
+                self._pending = True
+            if self.hosts is not None:
+                elapsed = now-self._lastsnapshot
+                minint = self.mininterval if self._table else max(self.mininterval,self.walkinterval)
+                due = self._pending or not self._counter
+                due = due or (self.fullinterval is not None and elapsed>=self.fullinterval)
+                if not due or elapsed<minint:
+                    return []
+            snapshot = self._getSnapshot()
+            self._lastsnapshot = now
+            self._pending = False
+            self.snapshots+=1
+            events = self._diff(snapshot)
+        for event in events:
+            for callback in self.callbacks:
+                try:
+                    callback(event)
+                except Exception:
+                    pass
+        return events
+    def _diff(self,snapshot):
+        active = {mac:h.ip for mac,h in snapshot.items() if h.active}
+        old,self.hosts = self.hosts,active
+        if old is None:
+            return []
+        now = time.time()
+        events = []
+        for mac,ip in active.items():
+            if mac not in old:
+                events.append(PresenceEvent("join",mac,ip,None,snapshot[mac],now))
+            elif old[mac]!=ip:
+                events.append(PresenceEvent("ipchange",mac,ip,old[mac],snapshot[mac],now))
+        for mac,ip in old.items():
+            if mac not in active:
+                events.append(PresenceEvent("leave",mac,ip,None,snapshot.get(mac),now))
+        return events
+    
+    def runOnce(self):
+        self.poll()
+    
+    def __aiter__(self):
+        return self._aiter()
+    async def _aiter(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            # Requests are blocking, keep them off the event loop
+            for event in await loop.run_in_executor(None,self.poll):
+                yield event
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  net_wan_commoninterfacecfg.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import time
+import array
+import threading
+
+from . import base
+
+class API_net_wan_commoninterfacecfg(base.API_base):
+    """
+    WAN Common Interface Configuration TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("net_wan_commoninterfacecfg")`` or ``session.getOOAPI("urn:dslforum-org:service:WANCommonInterfaceConfig:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getLinkProperties(self):
+        """
+        Returns information about the physical WAN link.
+        
+        :return: Link Information Object
+        :rtype: LinkProperties
+        """
+        return LinkProperties(self,self.dynapi.GetCommonLinkProperties())
+    def getTotalBytesSent(self):
+        """
+        Returns the total number of bytes sent.
+        
+        Note that this is a 32-bit counter and will wrap around every 4 GiB.
+        
+        :return: Total number of bytes sent
+        :rtype: int
+        """
+        return int(self.dynapi.GetTotalBytesSent()["NewTotalBytesSent"])
+    def getTotalBytesReceived(self):
+        """
+        Returns the total number of bytes received.
+        
+        Note that this is a 32-bit counter and will wrap around every 4 GiB.
+        
+        :return: Total number of bytes received
+        :rtype: int
+        """
+        return int(self.dynapi.GetTotalBytesReceived()["NewTotalBytesReceived"])
+    def getAddonInfos(self):
+        """
+        Returns the current traffic counters and rates with a single request.
+        
+        :return: Traffic Information Object
+        :rtype: AddonInfo
+        """
+        return AddonInfo(self,self.dynapi.GetAddonInfos())
+    def getOnlineMonitor(self,syncgroup=0):
+        """
+        Returns the data displayed by the online monitor of the web interface.
+        
+        :param int syncgroup: Optional Index of the sync group, defaults to 0
+        :return: Online Monitor Information Object
+        :rtype: OnlineMonitorInfo
+        :raises AssertionError: if the index is invalid, e.g. not an integer or less than 0
+        :raises ValueError: if the index is out of bounds
+        """
+        assert isinstance(syncgroup,int) and syncgroup>=0
+        return OnlineMonitorInfo(self,syncgroup,self.dynapi.callAPI("X_AVM-DE_GetOnlineMonitor",NewSyncGroupIndex=syncgroup))
+    def getTrafficSampler(self,interval=1.0,size=3600):
+        """
+        Returns a sampler computing traffic rates from the byte counters.
+        
+        See :py:class:`TrafficSampler()` for the parameters.
+        
+        :return: Traffic Sampler
+        :rtype: TrafficSampler
+        """
+        return TrafficSampler(self,interval,size)
+
+class LinkProperties(object):
+    """
+    Information about the physical WAN link.
+    
+    :param API_net_wan_commoninterfacecfg api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_net_wan_commoninterfacecfg api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    Link Variables:
+    
+    :ivar str accesstype: Type of the WAN access, e.g. ``DSL``
+    :ivar int maxrate_up: Maximum upstream bitrate of the link in bits/s
+    :ivar int maxrate_down: Maximum downstream bitrate of the link in bits/s
+    :ivar str status: Status of the physical link, e.g. ``Up``
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.accesstype = data["NewWANAccessType"]
+        self.maxrate_up = int(data["NewLayer1UpstreamMaxBitRate"])
+        self.maxrate_down = int(data["NewLayer1DownstreamMaxBitRate"])
+        self.status = data["NewPhysicalLinkStatus"]
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetCommonLinkProperties()
+        self.info = d
+        self.loadData(d)
+
+class AddonInfo(object):
+    """
+    Traffic counters and rates as returned by ``GetAddonInfos``\ .
+    
+    :param API_net_wan_commoninterfacecfg api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_net_wan_commoninterfacecfg api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    Traffic Variables:
+    
+    :ivar int rate_sent: Current send rate in bytes/s, as computed by the server
+    :ivar int rate_received: Current receive rate in bytes/s, as computed by the server
+    :ivar int bytes_sent: Total number of bytes sent, 32-bit counter
+    :ivar int bytes_received: Total number of bytes received, 32-bit counter
+    :ivar bytes_sent64: Total number of bytes sent, 64-bit counter
+    :type bytes_sent64: int or None
+    :ivar bytes_received64: Total number of bytes received, 64-bit counter
+    :type bytes_received64: int or None
+    
+    The 64-bit counters are only available on newer firmware versions and are ``None`` otherwise.
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.rate_sent = int(data["NewByteSendRate"])
+        self.rate_received = int(data["NewByteReceiveRate"])
+        self.bytes_sent = int(data["NewTotalBytesSent"])
+        self.bytes_received = int(data["NewTotalBytesReceived"])
+        sent64 = data.get("NewX_AVM_DE_TotalBytesSent64")
+        received64 = data.get("NewX_AVM_DE_TotalBytesReceived64")
+        self.bytes_sent64 = int(sent64) if sent64 else None
+        self.bytes_received64 = int(received64) if received64 else None
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetAddonInfos()
+        self.info = d
+        self.loadData(d)
+
+class OnlineMonitorInfo(object):
+    """
+    Data of the online monitor for a single sync group.
+    
+    All rate lists contain the most recent samples as computed by the server, newest first.
+    
+    :param API_net_wan_commoninterfacecfg api: API object to use when querying for data
+    :param int syncgroup: Index of the sync group
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_net_wan_commoninterfacecfg api: stores the supplied API object
+    :ivar int syncgroup: stores the supplied index
+    :ivar dict info: stores the data in a dictionary
+    
+    Online Monitor Variables:
+    
+    :ivar int syncgroups: Total number of sync groups
+    :ivar str name: Name of the sync group
+    :ivar str mode: Mode of the sync group
+    :ivar int max_down: Maximum downstream rate in bytes/s
+    :ivar int max_up: Maximum upstream rate in bytes/s
+    :ivar list rates_down: Downstream rates in bytes/s
+    :ivar list rates_up: Upstream rates in bytes/s
+    """
+    def __init__(self,api,syncgroup,info):
+        self.api = api
+        self.syncgroup = syncgroup
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.syncgroups = int(data["NewTotalNumberSyncGroups"])
+        self.name = data["NewSyncGroupName"]
+        self.mode = data["NewSyncGroupMode"]
+        self.max_down = int(data["Newmax_ds"])
+        self.max_up = int(data["Newmax_us"])
+        self.rates_down = [int(i) for i in (data["Newds_current_bps"] or "").split(",") if i]
+        self.rates_up = [int(i) for i in (data["Newus_current_bps"] or "").split(",") if i]
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.callAPI("X_AVM-DE_GetOnlineMonitor",NewSyncGroupIndex=self.syncgroup)
+        self.info = d
+        self.loadData(d)
+
+class TrafficSampler(base.PeriodicWorker):
+    """
+    Sampler computing send and receive rates from the WAN byte counters.
+    
+    Every sample costs exactly one ``GetAddonInfos`` request. The 64-bit counters are used if the server supports them,
+    else the 32-bit counters are used and wraparounds are corrected, as long as less than 4 GiB are transferred between two samples.
+    
+    Rates are stored in a fixed-size ring buffer, once it is full the oldest rates are overwritten.
+    
+    :param API_net_wan_commoninterfacecfg api: API object to use when querying for data
+    :param float interval: Optional Time in seconds between samples when running in the background, defaults to 1 second
+    :param int size: Optional Number of rates to store, defaults to 3600
+    
+    :ivar API_net_wan_commoninterfacecfg api: stores the supplied API object
+    :ivar float interval: stores the supplied interval
+    :ivar int size: stores the supplied size
+    :ivar int count: Total number of rates computed so far
+    
+    Sampling in a background thread is controlled via :py:meth:`start()` and :py:meth:`stop()`\ , see :py:class:`fritzctl.ooapi.base.PeriodicWorker()`\ .
+    Errors while sampling are ignored, the next sample will continue normally.
+    """
+    threadname = "fritzctl-trafficsampler"
+    def __init__(self,api,interval=1.0,size=3600):
+        assert size>0
+        super(TrafficSampler,self).__init__(interval)
+        self.api = api
+        self.size = size
+        self.count = 0
+        self._times = array.array("d",[0.0])*size
+        self._sent = array.array("d",[0.0])*size
+        self._received = array.array("d",[0.0])*size
+        self._last = None
+        self._lock = threading.Lock()
+    def sample(self):
+        """
+        Requests the counters once and stores the rates since the last sample.
+        
+        The first sample only initializes the counters and does not compute a rate.
+        
+        :return: 2-tuple of ``(sendrate,receiverate)`` in bytes/s, or ``None`` for the first sample
+        :rtype: tuple or None
+        """
+        info = self.api.getAddonInfos()
+        mono = time.monotonic()
+        now = time.time()
+        if info.bytes_sent64 is not None and info.bytes_received64 is not None:
+            cur = (info.bytes_sent64,info.bytes_received64,None)
+        else:
+            cur = (info.bytes_sent,info.bytes_received,0x100000000)
+        with self._lock:
+            last,self._last = self._last,(mono,cur)
+            if last is None or last[1][2]!=cur[2] or mono<=last[0]:
+                return None
+            dt = mono-last[0]
+            sent = self._delta(last[1][0],cur[0],cur[2])/dt
+            received = self._delta(last[1][1],cur[1],cur[2])/dt
+            i = self.count%self.size
+            self._times[i] = now
+            self._sent[i] = sent
+            self._received[i] = received
+            self.count+=1
+        return sent,received
+    def _delta(self,old,new,wrap):
+        if wrap is not None:
+            return (new-old)%wrap
+        # 64-bit counters only go backwards if they have been reset
+        return new-old if new>=old else new
+    def getRates(self):
+        """
+        Returns all stored rates.
+        
+        :return: List of 3-tuples of ``(timestamp,sendrate,receiverate)`` with Unix timestamps, oldest first
+        :rtype: list
+        """
+        with self._lock:
+            n = min(self.count,self.size)
+            start = self.count-n
+            out = []
+            for j in range(start,self.count):
+                i = j%self.size
+                out.append((self._times[i],self._sent[i],self._received[i]))
+        return out
+    def getLatest(self):
+        """
+        Returns the most recent rate.
+        
+        :return: 3-tuple of ``(timestamp,sendrate,receiverate)`` or ``None`` if no rate has been computed yet
+        :rtype: tuple or None
+        """
+        with self._lock:
+            if self.count==0:
+                return None
+            i = (self.count-1)%self.size
+            return self._times[i],self._sent[i],self._received[i]
+    
+    def runOnce(self):
+        self.sample()
+    def onError(self,error):
+        # Start over, the rate over a failed sample would be inaccurate
+        self._last = None
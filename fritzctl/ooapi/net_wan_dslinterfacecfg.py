@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  net_wan_dslinterfacecfg.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import sys
+import time
+import json
+import zlib
+import array
+import struct
+import bisect
+
+from . import base
+
+DSLSTATFIELDS = {
+    "rate_up":"NewUpstreamCurrRate",
+    "rate_down":"NewDownstreamCurrRate",
+    "maxrate_up":"NewUpstreamMaxRate",
+    "maxrate_down":"NewDownstreamMaxRate",
+    "snr_up":"NewUpstreamNoiseMargin",
+    "snr_down":"NewDownstreamNoiseMargin",
+    "attenuation_up":"NewUpstreamAttenuation",
+    "attenuation_down":"NewDownstreamAttenuation",
+    "power_up":"NewUpstreamPower",
+    "power_down":"NewDownstreamPower",
+    "fec_errors":"NewFECErrors",
+    "fec_errors_atuc":"NewATUCFECErrors",
+    "crc_errors":"NewCRCErrors",
+    "crc_errors_atuc":"NewATUCCRCErrors",
+    "hec_errors":"NewHECErrors",
+    "hec_errors_atuc":"NewATUCHECErrors",
+    "errored_secs":"NewErroredSecs",
+    "severely_errored_secs":"NewSeverelyErroredSecs",
+    "link_retrains":"NewLinkRetrain",
+    "init_errors":"NewInitErrors",
+    }
+"""
+Mapping of the field names used by :py:class:`DSLStatsCollector()` to TR64 State Variables.
+
+The first ten fields are taken from ``GetInfo``\\ , the others from ``GetStatisticsTotal``\\ .
+Noise margins, attenuations and powers are stored as integers in units of 0.1 dB, as returned by the server.
+"""
+
+_STATBLOCKSIZE = 1440
+_STATMAGIC = b"FRITZCTL-DSLSTATS\x01"
+
+def _appendVarint(buf,value):
+    # Zigzag encoding maps small negative and positive values to small unsigned values
+    value = value<<1 if value>=0 else ((-value)<<1)-1
+    while value>0x7f:
+        buf.append((value&0x7f)|0x80)
+        value>>=7
+    buf.append(value)
+
+def _iterVarints(buf):
+    value = shift = 0
+    for b in buf:
+        value|=(b&0x7f)<<shift
+        if b&0x80:
+            shift+=7
+        else:
+            yield (value>>1)^-(value&1)
+            value = shift = 0
+
+class API_net_wan_dslinterfacecfg(base.API_base):
+    """
+    WAN DSL Interface Configuration TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("net_wan_dslinterfacecfg")`` or ``session.getOOAPI("urn:dslforum-org:service:WANDSLInterfaceConfig:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    """
+    def getInfo(self):
+        """
+        Returns information about the DSL line.
+        
+        :return: DSL Line Information Object
+        :rtype: DSLInfo
+        """
+        return DSLInfo(self,self.dynapi.GetInfo())
+    def getStatistics(self):
+        """
+        Returns the error counters of the DSL line since the last reboot.
+        
+        :return: Dictionary mapping the TR64 State Variables to integers
+        :rtype: dict
+        """
+        return {k:int(v) for k,v in self.dynapi.GetStatisticsTotal().items() if v is not None}
+    def getStatsCollector(self,fields=None):
+        """
+        Returns a collector for periodically sampling the line statistics.
+        
+        See :py:class:`DSLStatsCollector()` for the parameters.
+        
+        :return: DSL Statistics Collector
+        :rtype: DSLStatsCollector
+        """
+        return DSLStatsCollector(self,fields)
+
+class DSLInfo(object):
+    """
+    DSL line information object.
+    
+    :param API_net_wan_dslinterfacecfg api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_net_wan_dslinterfacecfg api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    Line Variables, all rates are in kbit/s and all levels in dB:
+    
+    :ivar bool enable: Flag if the DSL interface is enabled
+    :ivar str status: Status of the line, e.g. ``Up``
+    :ivar int rate_up: Current upstream sync rate
+    :ivar int rate_down: Current downstream sync rate
+    :ivar int maxrate_up: Maximum attainable upstream rate
+    :ivar int maxrate_down: Maximum attainable downstream rate
+    :ivar float snr_up: Upstream noise margin
+    :ivar float snr_down: Downstream noise margin
+    :ivar float attenuation_up: Upstream attenuation
+    :ivar float attenuation_down: Downstream attenuation
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.enable = data["NewEnable"]=="1"
+        self.status = data["NewStatus"]
+        self.rate_up = int(data["NewUpstreamCurrRate"])
+        self.rate_down = int(data["NewDownstreamCurrRate"])
+        self.maxrate_up = int(data["NewUpstreamMaxRate"])
+        self.maxrate_down = int(data["NewDownstreamMaxRate"])
+        self.snr_up = float(data["NewUpstreamNoiseMargin"])/10
+        self.snr_down = float(data["NewDownstreamNoiseMargin"])/10
+        self.attenuation_up = float(data["NewUpstreamAttenuation"])/10
+        self.attenuation_down = float(data["NewDownstreamAttenuation"])/10
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        d = self.api.dynapi.GetInfo()
+        self.info = d
+        self.loadData(d)
+
+class DSLStatsCollector(object):
+    """
+    Collector for DSL line statistics.
+    
+    Samples are stored as differences to the previous sample, encoded as zigzag varints in one :py:class:`bytearray` per field.
+    Unchanged values and small changes take a single byte per sample instead of eight.
+    Each sample costs one ``GetInfo`` and one ``GetStatisticsTotal`` request.
+    
+    :param API_net_wan_dslinterfacecfg api: API object to use when querying for data
+    :param list fields: Optional list of fields to collect, see :py:data:`DSLSTATFIELDS`\\ , defaults to all fields
+    
+    :ivar API_net_wan_dslinterfacecfg api: stores the supplied API object
+    :ivar list fields: Names of the collected fields
+    :ivar int count: Number of samples stored
+    """
+    def __init__(self,api,fields=None):
+        self.api = api
+        self.fields = list(fields) if fields is not None else list(DSLSTATFIELDS.keys())
+        for f in self.fields:
+            if f not in DSLSTATFIELDS:
+                raise ValueError("Unknown field %s"%f)
+        self.count = 0
+        self._deltas = {f:bytearray() for f in ["time"]+self.fields}
+        self._last = None
+    def sample(self,now=None):
+        """
+        Requests the line statistics once and stores them.
+        
+        :param int now: Optional timestamp of the sample in seconds, defaults to the current time
+        :return: Dictionary of all fields that changed since the last sample, contains all fields for the first sample
+        :rtype: dict
+        """
+        data = self.api.dynapi.GetInfo()
+        data.update(self.api.dynapi.GetStatisticsTotal())
+        values = {"time":int(now if now is not None else time.time())}
+        for f in self.fields:
+            v = data.get(DSLSTATFIELDS[f])
+            values[f] = int(v) if v not in (None,"") else 0
+        return self.add(values)
+    def add(self,values):
+        """
+        Stores a sample, e.g. one that has been collected elsewhere.
+        
+        :param dict values: Dictionary mapping the ``time`` key and all fields to integers
+        :return: Dictionary of all fields that changed since the last sample
+        :rtype: dict
+        """
+        last = self._last if self._last is not None else dict.fromkeys(values,0)
+        changed = {}
+        for f,col in self._deltas.items():
+            _appendVarint(col,values[f]-last[f])
+            if f!="time" and (self._last is None or values[f]!=last[f]):
+                changed[f] = values[f]
+        self._last = dict(values)
+        self.count+=1
+        return changed
+    def getValues(self,field):
+        """
+        Returns all stored values of a field.
+        
+        :param str field: Name of the field or ``time``
+        :return: List of values, oldest first
+        :rtype: List of int
+        """
+        out = []
+        v = 0
+        for d in _iterVarints(self._deltas[field]):
+            v+=d
+            out.append(v)
+        return out
+    def export(self,fname):
+        """
+        Writes all stored samples to a columnar file.
+        
+        The file is split into blocks of 1440 samples, each column of each block is stored compressed and independently of the others,
+        allowing :py:class:`DSLStatsFile()` to only read the blocks and columns needed for a query.
+        
+        :param str fname: Name of the file to write to
+        """
+        columns = {f:self.getValues(f) for f in self._deltas}
+        writeStatsFile(fname,columns,self.count)
+
+def writeStatsFile(fname,columns,count):
+    """
+    Writes the given columns to a columnar file readable by :py:class:`DSLStatsFile()`\\ .
+    
+    Each column is split into blocks, the first value of each block is stored as is and all others delta-encoded.
+    
+    :param str fname: Name of the file to write to
+    :param dict columns: Dictionary mapping column names to lists of integers, must include a ``time`` column sorted in ascending order
+    :param int count: Number of values in each column
+    """
+    blocks = []
+    data = []
+    offset = 0
+    for start in range(0,count,_STATBLOCKSIZE):
+        end = min(start+_STATBLOCKSIZE,count)
+        block = {"start":columns["time"][start],"end":columns["time"][end-1],"count":end-start,"columns":{}}
+        for name,values in columns.items():
+            col = array.array("q",values[start:end])
+            for i in range(len(col)-1,0,-1):
+                col[i]-=col[i-1]
+            if sys.byteorder!="little":
+                col.byteswap()
+            raw = zlib.compress(col.tobytes())
+            block["columns"][name] = [offset,len(raw)]
+            data.append(raw)
+            offset+=len(raw)
+        blocks.append(block)
+    header = json.dumps({"columns":list(columns.keys()),"count":count,"blocks":blocks}).encode("utf-8")
+    with open(fname,"wb") as f:
+        f.write(_STATMAGIC)
+        f.write(struct.pack(">I",len(header)))
+        f.write(header)
+        for raw in data:
+            f.write(raw)
+
+class DSLStatsFile(object):
+    """
+    Reader for files written by :py:meth:`DSLStatsCollector.export()`\\ .
+    
+    Only the header is read upon construction, queries only read and decompress the blocks and columns they need.
+    
+    :param str fname: Name of the file to read
+    
+    :ivar str fname: stores the supplied file name
+    :ivar list columns: Names of all columns, including ``time``
+    :ivar int count: Total number of samples in the file
+    :raises ValueError: if the file is not a statistics file
+    """
+    def __init__(self,fname):
+        self.fname = fname
+        with open(fname,"rb") as f:
+            if f.read(len(_STATMAGIC))!=_STATMAGIC:
+                raise ValueError("Not a DSL statistics file: %s"%fname)
+            hlen = struct.unpack(">I",f.read(4))[0]
+            header = json.loads(f.read(hlen).decode("utf-8"))
+        self._dataoffset = len(_STATMAGIC)+4+hlen
+        self.columns = header["columns"]
+        self.count = header["count"]
+        self._blocks = header["blocks"]
+        self._blockends = [b["end"] for b in self._blocks]
+    def query(self,start=None,end=None,fields=None):
+        """
+        Returns all samples between ``start`` and ``end``\\ , inclusive.
+        
+        :param int start: Optional start timestamp, defaults to the first sample
+        :param int end: Optional end timestamp, defaults to the last sample
+        :param list fields: Optional list of fields to return, defaults to all fields
+        :return: Dictionary mapping ``time`` and all requested fields to lists of values
+        :rtype: dict
+        """
+        fields = [f for f in (fields if fields is not None else self.columns) if f!="time"]
+        out = {f:[] for f in ["time"]+fields}
+        first = bisect.bisect_left(self._blockends,start) if start is not None else 0
+        with open(self.fname,"rb") as f:
+            for block in self._blocks[first:]:
+                if end is not None and block["start"]>end:
+                    break
+                times = self._readColumn(f,block,"time")
+                lo = bisect.bisect_left(times,start) if start is not None else 0
+                hi = bisect.bisect_right(times,end) if end is not None else len(times)
+                if lo>=hi:
+                    continue
+                out["time"].extend(times[lo:hi])
+                for name in fields:
+                    out[name].extend(self._readColumn(f,block,name)[lo:hi])
+        return out
+    def _readColumn(self,f,block,name):
+        offset,length = block["columns"][name]
+        f.seek(self._dataoffset+offset)
+        col = array.array("q")
+        col.frombytes(zlib.decompress(f.read(length)))
+        if sys.byteorder!="little":
+            col.byteswap()
+        for i in range(1,len(col)):
+            col[i]+=col[i-1]
+        return col.tolist()
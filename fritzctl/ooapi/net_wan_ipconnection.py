@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  net_wan_ipconnection.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+from . import base
+
+class API_net_wan_ipconnection(base.API_base):
+    """
+    WAN IP Connection TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("net_wan_ipconnection")`` or ``session.getOOAPI("urn:dslforum-org:service:WANIPConnection:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    
+    This class is also the base class of :py:class:`fritzctl.ooapi.net_wan_pppconnection.API_net_wan_pppconnection()`\ ,
+    since both services share the same port mapping actions.
+    """
+    def getExternalIP(self):
+        """
+        Returns the external IPv4 Address of the connection.
+        
+        :return: External IP Address
+        :rtype: str
+        """
+        return self.dynapi.GetExternalIPAddress()["NewExternalIPAddress"]
+    def getStatus(self):
+        """
+        Returns the status of the connection.
+        
+        :return: 3-tuple of ``(status,lasterror,uptime)`` where status is e.g. ``Connected`` and uptime is in seconds
+        :rtype: tuple
+        """
+        d = self.dynapi.GetStatusInfo()
+        return d["NewConnectionStatus"],d["NewLastConnectionError"],int(d["NewUptime"])
+
+    def getPortMappingCount(self):
+        """
+        Returns the number of port mappings.
+        
+        :return: Number of port mappings
+        :rtype: int
+        """
+        return int(self.dynapi.GetPortMappingNumberOfEntries()["NewPortMappingNumberOfEntries"])
+    def getPortMappingByIndex(self,index):
+        """
+        Returns the port mapping with the given index.
+        
+        :param int index: Index of the port mapping
+        :return: Port Mapping Object
+        :rtype: PortMapping
+        :raises AssertionError: if the index is invalid, e.g. not an integer or less than 0
+        :raises ValueError: if the index is out of bounds
+        """
+        assert isinstance(index,int) and index>=0
+        return PortMapping(self,self.dynapi.GetGenericPortMappingEntry(NewPortMappingIndex=index))
+    def getPortMapping(self,extport,protocol,remotehost=""):
+        """
+        Returns the port mapping identified by the given external port, protocol and remote host.
+        
+        :param int extport: External Port
+        :param str protocol: Protocol, either ``TCP`` or ``UDP``
+        :param str remotehost: Optional Remote Host, defaults to an empty string meaning any host
+        :return: Port Mapping Object
+        :rtype: PortMapping
+        :raises ValueError: if there is no such port mapping
+        """
+        d = self.dynapi.GetSpecificPortMappingEntry(NewRemoteHost=remotehost,NewExternalPort=extport,NewProtocol=protocol)
+        d.update({"NewRemoteHost":remotehost,"NewExternalPort":str(extport),"NewProtocol":protocol})
+        return PortMapping(self,d)
+    def newPortMapping(self,extport,protocol,intport,client,description="",enabled=True,remotehost="",leaseduration=0):
+        """
+        Creates a new port mapping object without sending it to the server.
+        
+        Use :py:meth:`addPortMapping()` or :py:meth:`PortMappingTable.reconcile()` to actually create it.
+        
+        :param int extport: External Port
+        :param str protocol: Protocol, either ``TCP`` or ``UDP``
+        :param int intport: Internal Port
+        :param str client: IP Address of the internal client
+        :param str description: Optional Description
+        :param bool enabled: Optional Flag if the port mapping is enabled, defaults to True
+        :param str remotehost: Optional Remote Host, defaults to an empty string meaning any host
+        :param int leaseduration: Optional Lease Duration in seconds, defaults to 0 meaning infinite
+        :return: Port Mapping Object
+        :rtype: PortMapping
+        :raises AssertionError: if the protocol is invalid
+        """
+        assert protocol in ("TCP","UDP")
+        return PortMapping(self,{
+            "NewRemoteHost":remotehost,
+            "NewExternalPort":str(extport),
+            "NewProtocol":protocol,
+            "NewInternalPort":str(intport),
+            "NewInternalClient":client,
+            "NewEnabled":"1" if enabled else "0",
+            "NewPortMappingDescription":description,
+            "NewLeaseDuration":str(leaseduration),
+            })
+    def addPortMapping(self,mapping):
+        """
+        Adds the given port mapping to the server.
+        
+        Existing port mappings with the same key may be rejected by the server, e.g. if the internal client differs,
+        use :py:meth:`PortMappingTable.reconcile()` to delete them first.
+        
+        :param PortMapping mapping: Port mapping to add
+        :raises ValueError: if the port mapping was rejected by the server
+        """
+        self.dynapi.AddPortMapping(**mapping.toDict())
+    def deletePortMapping(self,extport,protocol,remotehost=""):
+        """
+        Deletes the port mapping identified by the given external port, protocol and remote host.
+        
+        :param int extport: External Port
+        :param str protocol: Protocol, either ``TCP`` or ``UDP``
+        :param str remotehost: Optional Remote Host, defaults to an empty string meaning any host
+        :raises ValueError: if there is no such port mapping
+        """
+        self.dynapi.DeletePortMapping(NewRemoteHost=remotehost,NewExternalPort=extport,NewProtocol=protocol)
+    def getPortMappingTable(self,maxworkers=4):
+        """
+        Returns a snapshot of all port mappings.
+        
+        :param int maxworkers: Optional maximum number of concurrent requests, defaults to 4
+        :return: Port Mapping Table
+        :rtype: PortMappingTable
+        """
+        table = PortMappingTable(self,maxworkers)
+        table.reloadData()
+        return table
+
+class PortMapping(object):
+    """
+    Single port mapping.
+    
+    :param API_net_wan_ipconnection api: API object to use when querying for data
+    :param dict info: Dictionary containing the TR64 Response; automatically passed to :py:meth:`loadData()`
+    
+    :ivar API_net_wan_ipconnection api: stores the supplied API object
+    :ivar dict info: stores the data in a dictionary
+    
+    Port Mapping Variables:
+    
+    :ivar str remotehost: Remote Host this port mapping is restricted to, empty for any host
+    :ivar int extport: External Port
+    :ivar str protocol: Protocol, either ``TCP`` or ``UDP``
+    :ivar int intport: Internal Port
+    :ivar str client: IP Address of the internal client
+    :ivar bool enabled: Flag if the port mapping is enabled
+    :ivar str description: Description of the port mapping
+    :ivar int leaseduration: Lease Duration in seconds, 0 means infinite
+    
+    Two port mappings compare equal if all variables except :py:attr:`leaseduration` are equal.
+    """
+    def __init__(self,api,info):
+        self.api = api
+        self.info = info
+        self.loadData(info)
+    def loadData(self,data):
+        """
+        Populates instance variables with the supplied TR64 response.
+        This method is automatically called upon construction with the supplied info dict.
+        """
+        self.remotehost = data["NewRemoteHost"] or ""
+        self.extport = int(data["NewExternalPort"])
+        self.protocol = data["NewProtocol"]
+        self.intport = int(data["NewInternalPort"])
+        self.client = data["NewInternalClient"]
+        self.enabled = data["NewEnabled"]=="1"
+        self.description = data["NewPortMappingDescription"] or ""
+        self.leaseduration = int(data["NewLeaseDuration"] or 0)
+    def reloadData(self):
+        """
+        Reloads the data from the server in-place.
+        """
+        self.info = self.api.getPortMapping(self.extport,self.protocol,self.remotehost).info
+        self.loadData(self.info)
+    @property
+    def key(self):
+        """
+        Read-only Property containing the 3-tuple ``(remotehost,extport,protocol)`` identifying this port mapping.
+        """
+        return self.remotehost,self.extport,self.protocol
+    def toDict(self):
+        """
+        Converts this port mapping to the arguments of ``AddPortMapping``\ .
+        
+        :return: Dictionary mapping TR64 State Variables to values
+        :rtype: dict
+        """
+        return {
+            "NewRemoteHost":self.remotehost,
+            "NewExternalPort":self.extport,
+            "NewProtocol":self.protocol,
+            "NewInternalPort":self.intport,
+            "NewInternalClient":self.client,
+            "NewEnabled":"1" if self.enabled else "0",
+            "NewPortMappingDescription":self.description,
+            "NewLeaseDuration":self.leaseduration,
+            }
+    def _cmp(self):
+        return self.key,self.intport,self.client,self.enabled,self.description
+    def __eq__(self,other):
+        return isinstance(other,PortMapping) and self._cmp()==other._cmp()
+    def __ne__(self,other):
+        return not self==other
+    def __hash__(self):
+        return hash(self._cmp())
+    def __repr__(self):
+        return "<PortMapping(%s:%d/%s -> %s:%d)>"%(self.remotehost or "*",self.extport,self.protocol,self.client,self.intport)
+
+class PortMappingTable(object):
+    """
+    Local snapshot of all port mappings of a connection, indexed by key and internal client.
+    
+    The snapshot is only updated by :py:meth:`reloadData()` and by changes made via :py:meth:`apply()` and :py:meth:`reconcile()`\ .
+    
+    :param API_net_wan_ipconnection api: API object to use when querying for data
+    :param int maxworkers: Optional maximum number of concurrent requests, defaults to 4
+    
+    :ivar API_net_wan_ipconnection api: stores the supplied API object
+    :ivar int maxworkers: stores the supplied maximum number of concurrent requests
+    :ivar dict mappings: Dictionary mapping keys as returned by :py:attr:`PortMapping.key` to :py:class:`PortMapping()` objects
+    """
+    def __init__(self,api,maxworkers=4):
+        self.api = api
+        self.maxworkers = maxworkers
+        self.mappings = {}
+        self._byclient = {}
+    def reloadData(self):
+        """
+        Reads all port mappings from the server, using up to :py:attr:`maxworkers` concurrent requests.
+        
+        :raises ValueError: if a port mapping could not be read, e.g. because the table changed while reading it
+        """
+        results = base.runConcurrent(self.api.getPortMappingByIndex,range(self.api.getPortMappingCount()),self.maxworkers)
+        for index,mapping,error in results:
+            if error is not None:
+                raise error
+        self.mappings = {}
+        self._byclient = {}
+        for index,mapping,error in results:
+            self._insert(mapping)
+    def _insert(self,mapping):
+        old = self.mappings.get(mapping.key)
+        if old is not None:
+            self._remove(old)
+        self.mappings[mapping.key] = mapping
+        self._byclient.setdefault(mapping.client,set()).add(mapping.key)
+    def _remove(self,mapping):
+        del self.mappings[mapping.key]
+        keys = self._byclient.get(mapping.client,set())
+        keys.discard(mapping.key)
+        if not keys:
+            self._byclient.pop(mapping.client,None)
+    def __len__(self):
+        return len(self.mappings)
+    def __iter__(self):
+        return iter(list(self.mappings.values()))
+    def get(self,extport,protocol,remotehost=""):
+        """
+        Returns the port mapping with the given key from the snapshot.
+        
+        :return: Port Mapping Object or ``None`` if there is no such port mapping
+        :rtype: PortMapping or None
+        """
+        return self.mappings.get((remotehost,extport,protocol))
+    def getByClient(self,client):
+        """
+        Returns all port mappings pointing to the given internal client.
+        
+        :param str client: IP Address of the internal client
+        :return: List of port mappings
+        :rtype: List of :py:class:`PortMapping()`
+        """
+        return [self.mappings[k] for k in sorted(self._byclient.get(client,()))]
+    def diff(self,desired,delete=True):
+        """
+        Computes the minimal set of changes needed to make the snapshot equal to the desired port mappings.
+        
+        Port mappings with an unchanged key but other changed variables are returned in both lists, the existing port mapping
+        is deleted and the desired one added again, as the server may reject adding a port mapping with a different internal client
+        over an existing one.
+        
+        :param desired: Iterable of port mappings that should exist
+        :param bool delete: Optional Flag if port mappings not in ``desired`` should be deleted, defaults to True
+        :return: 2-tuple of ``(add,delete)`` lists of port mappings
+        :rtype: tuple
+        :raises ValueError: if ``desired`` contains multiple port mappings with the same key
+        """
+        want = {}
+        for mapping in desired:
+            if mapping.key in want:
+                raise ValueError("Duplicate port mapping %r"%(mapping,))
+            want[mapping.key] = mapping
+        add = [m for k,m in want.items() if self.mappings.get(k)!=m]
+        remove = [m for k,m in self.mappings.items() if k in want and want[k]!=m]
+        if delete:
+            remove.extend(m for k,m in self.mappings.items() if k not in want)
+        return add,remove
+    def apply(self,add,delete):
+        """
+        Executes the given changes concurrently, using up to :py:attr:`maxworkers` concurrent requests.
+        
+        Deletions are executed before additions. Additions of port mappings whose key could not be deleted are skipped,
+        only the failed deletion is reported for them. The snapshot is updated for every successful change.
+        
+        :param list add: List of port mappings to add
+        :param list delete: List of port mappings to delete
+        :return: List of 2-tuples of ``(mapping,exception)`` for every failed change, empty if all changes succeeded
+        :rtype: list
+        """
+        failed = []
+        for mapping,_,error in base.runConcurrent(lambda m:self.api.deletePortMapping(m.extport,m.protocol,m.remotehost),delete,self.maxworkers):
+            if error is not None:
+                failed.append((mapping,error))
+            elif mapping.key in self.mappings:
+                self._remove(self.mappings[mapping.key])
+        blocked = set(m.key for m,_ in failed)
+        add = [m for m in add if m.key not in blocked]
+        for mapping,_,error in base.runConcurrent(self.api.addPortMapping,add,self.maxworkers):
+            if error is not None:
+                failed.append((mapping,error))
+            else:
+                self._insert(mapping)
+        return failed
+    def reconcile(self,desired,delete=True):
+        """
+        Makes the port mappings on the server equal to the desired port mappings.
+        
+        Only the changes computed by :py:meth:`diff()` are executed, so the number of requests is proportional to the number of changes.
+        
+        :param desired: Iterable of port mappings that should exist
+        :param bool delete: Optional Flag if port mappings not in ``desired`` should be deleted, defaults to True
+        :return: List of 2-tuples of ``(mapping,exception)`` for every failed change, empty if all changes succeeded
+        :rtype: list
+        """
+        add,remove = self.diff(desired,delete)
+        return self.apply(add,remove)
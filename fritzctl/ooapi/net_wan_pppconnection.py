@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  net_wan_pppconnection.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+from . import net_wan_ipconnection
+
+class API_net_wan_pppconnection(net_wan_ipconnection.API_net_wan_ipconnection):
+    """
+    WAN PPP Connection TR64 Object-Oriented API.
+    
+    Can be instantiated via ``session.getOOAPI("net_wan_pppconnection")`` or ``session.getOOAPI("urn:dslforum-org:service:WANPPPConnection:1")``\ .
+    
+    Same parameters and attributes as :py:class:`fritzctl.ooapi.base.API_base()`\ .
+    
+    All port mapping methods are inherited from :py:class:`fritzctl.ooapi.net_wan_ipconnection.API_net_wan_ipconnection()`
+    and return the classes defined in :py:mod:`fritzctl.ooapi.net_wan_ipconnection`\ .
+    """
+    def getUsername(self):
+        """
+        Returns the username used for authenticating the PPP connection.
+        
+        :return: PPP Username
+        :rtype: str
+        """
+        return self.dynapi.GetUserName()["NewUserName"]
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  resilience.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+"""
+Module containing the retry and circuit breaker policies used by :py:meth:`Session.execute() <fritzctl.session.Session.execute>`\ .
+
+Every session has a :py:class:`RetryPolicy()`\ , a :py:class:`CircuitBreaker()` and a :py:class:`SingleFlight()`\ , see :py:attr:`Session.policy <fritzctl.session.Session>`\ ,
+:py:attr:`Session.breaker <fritzctl.session.Session>` and :py:attr:`Session.singleflight <fritzctl.session.Session>`\ .
+All of them can be replaced or disabled by passing ``None`` when creating the session.
+
+Only transport errors, e.g. timeouts or refused connections, are retried and counted by the circuit breaker.
+Errors reported by the server, which are raised as :py:exc:`ValueError`\ , mean that the server is alive and are never retried.
+
+Metrics can be collected by registering hooks via :py:meth:`RetryPolicy.addHook()` and :py:meth:`CircuitBreaker.addHook()`\ .
+A hook is called with the name of the event and a dictionary with details about the event, exceptions raised by hooks are ignored.
+Hooks can also be registered via :py:meth:`SingleFlight.addHook()`\ .
+"""
+
+import random
+import threading
+import time
+
+import requests
+import urllib3
+
+READ = "read"
+"""
+Idempotency class of actions that do not change anything on the server and can always be retried.
+"""
+WRITE = "write"
+"""
+Idempotency class of actions that may change something on the server.
+
+These actions are only retried if the connection could not be established, as the server cannot have received the request in that case.
+"""
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of sending a request while the circuit breaker is open.
+    
+    Subclass of :py:exc:`requests.exceptions.ConnectionError`\ , so existing handlers for transport errors also handle this error.
+    """
+
+class _Hooks(object):
+    def __init__(self):
+        self.hooks = []
+    def addHook(self,hook):
+        """
+        Registers a hook that is called with ``(event,info)`` on every event.
+        
+        :param hook: Callable to register
+        """
+        self.hooks.append(hook)
+    def removeHook(self,hook):
+        """
+        Removes a hook registered with :py:meth:`addHook()`\ .
+        
+        :param hook: Callable to remove
+        """
+        self.hooks.remove(hook)
+    def _emit(self,event,info):
+        for hook in self.hooks:
+            try:
+                hook(event,info)
+            except Exception:
+                pass
+
+def classifyAction(action):
+    """
+    Returns the default idempotency class of an action based on its name.
+    
+    Actions starting with ``Get`` or ``X_AVM-DE_Get`` are considered :py:data:`READ`\ , all others :py:data:`WRITE`\ .
+    
+    :param str action: Name of the action
+    :rtype: str
+    """
+    if action.startswith("Get") or action.startswith("X_AVM-DE_Get"):
+        return READ
+    return WRITE
+
+class RetryPolicy(_Hooks):
+    """
+    Policy deciding which actions are retried and how long to wait between attempts.
+    
+    Delays use exponential backoff with full jitter, the delay before retry ``n`` (starting at 0) is chosen uniformly
+    between 0 and ``min(maxbackoff,backoff*2**n)`` seconds. This prevents many clients from retrying in lockstep.
+    
+    :param int retries: Optional maximum number of retries per action, defaults to 3
+    :param float backoff: Optional base delay in seconds, defaults to 0.1
+    :param float maxbackoff: Optional maximum delay in seconds, defaults to 2 seconds
+    :param dict classes: Optional Dictionary mapping action names to :py:data:`READ` or :py:data:`WRITE`\ , overriding :py:func:`classifyAction()`
+    :param dict timeouts: Optional Dictionary mapping action names to timeouts, overriding the timeout of the session
+    
+    :ivar int retries: stores the supplied number of retries
+    :ivar float backoff: stores the supplied base delay
+    :ivar float maxbackoff: stores the supplied maximum delay
+    :ivar dict classes: stores the supplied idempotency classes
+    :ivar dict timeouts: stores the supplied timeouts
+    
+    Events emitted to hooks:
+    
+    ============ ====================================================================
+    Event        Keys of the info dictionary
+    ============ ====================================================================
+    ``success``  ``action``\ , ``attempts``\ , ``duration``
+    ``retry``    ``action``\ , ``attempt``\ , ``delay``\ , ``error``
+    ``failure``  ``action``\ , ``attempts``\ , ``duration``\ , ``error``
+    ============ ====================================================================
+    
+    Errors reported by the server count as ``success`` as far as the transport is concerned.
+    """
+    def __init__(self,retries=3,backoff=0.1,maxbackoff=2.0,classes=None,timeouts=None):
+        super(RetryPolicy,self).__init__()
+        assert retries>=0
+        self.retries = retries
+        self.backoff = backoff
+        self.maxbackoff = maxbackoff
+        self.classes = dict(classes or {})
+        self.timeouts = dict(timeouts or {})
+    def getClass(self,action):
+        """
+        Returns the idempotency class of the given action.
+        
+        :param str action: Name of the action
+        :return: :py:data:`READ` or :py:data:`WRITE`
+        :rtype: str
+        """
+        return self.classes.get(action) or classifyAction(action)
+    def getTimeout(self,action,default):
+        """
+        Returns the timeout to use for the given action.
+        
+        :param str action: Name of the action
+        :param float default: Timeout to use if there is no specific timeout for this action
+        :rtype: float
+        """
+        return self.timeouts.get(action,default)
+    def canRetry(self,action,error):
+        """
+        Checks if the given action may be retried after the given error.
+        
+        :param str action: Name of the action
+        :param Exception error: Transport error raised by the last attempt
+        :rtype: bool
+        """
+        if isinstance(error,CircuitOpenError):
+            return False
+        if self.getClass(action)==READ:
+            return True
+        # The request has definitely not been sent if connecting failed, e.g. because of a timeout or a refused connection
+        if isinstance(error,requests.exceptions.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        return isinstance(getattr(reason,"reason",reason),urllib3.exceptions.NewConnectionError)
+    def getDelay(self,attempt):
+        """
+        Returns a randomized delay before the given retry.
+        
+        :param int attempt: Number of the retry, starting at 0
+        :return: Delay in seconds
+        :rtype: float
+        """
+        return random.uniform(0,min(self.maxbackoff,self.backoff*2**attempt))
+    def call(self,action,func,breaker=None):
+        """
+        Calls ``func`` until it succeeds or no retries are left.
+        
+        :param str action: Name of the action, used for deciding if retries are allowed
+        :param func: Callable without arguments sending the request
+        :param CircuitBreaker breaker: Optional circuit breaker to consult before and inform after every attempt
+        :return: The return value of ``func``
+        :raises requests.exceptions.RequestException: if the last attempt failed with a transport error
+        :raises CircuitOpenError: if the circuit breaker is open
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                if breaker is not None:
+                    breaker.before()
+                out = func()
+            except (requests.exceptions.ConnectionError,requests.exceptions.Timeout) as e:
+                if breaker is not None and not isinstance(e,CircuitOpenError):
+                    breaker.failure()
+                if attempt>=self.retries or not self.canRetry(action,e):
+                    self._emit("failure",{"action":action,"attempts":attempt+1,"duration":time.monotonic()-start,"error":e})
+                    raise
+                delay = self.getDelay(attempt)
+                self._emit("retry",{"action":action,"attempt":attempt,"delay":delay,"error":e})
+                time.sleep(delay)
+                attempt+=1
+                continue
+            except Exception:
+                # The server answered, so it is alive
+                if breaker is not None:
+                    breaker.success()
+                self._emit("success",{"action":action,"attempts":attempt+1,"duration":time.monotonic()-start})
+                raise
+            except BaseException:
+                # The outcome is unknown, e.g. after a KeyboardInterrupt
+                if breaker is not None:
+                    breaker.cancel()
+                raise
+            if breaker is not None:
+                breaker.success()
+            self._emit("success",{"action":action,"attempts":attempt+1,"duration":time.monotonic()-start})
+            return out
+
+class CircuitBreaker(_Hooks):
+    """
+    Circuit breaker preventing requests to a server that has stopped responding.
+    
+    After ``threshold`` consecutive transport errors the breaker opens and all requests fail immediately with :py:exc:`CircuitOpenError`
+    for ``resettimeout`` seconds. Afterwards, a single request is let through: if it succeeds the breaker closes, else it opens again.
+    
+    :param int threshold: Optional number of consecutive transport errors opening the breaker, defaults to 5
+    :param float resettimeout: Optional time in seconds until a trial request is let through, defaults to 30 seconds
+    
+    :ivar int threshold: stores the supplied threshold
+    :ivar float resettimeout: stores the supplied timeout
+    :ivar str state: Current state, either ``closed``\ , ``open`` or ``halfopen``
+    :ivar int failures: Number of consecutive transport errors
+    
+    The events ``open`` and ``close`` are emitted to hooks when the state changes, the info dictionary contains the key ``failures``\ .
+    """
+    def __init__(self,threshold=5,resettimeout=30.0):
+        super(CircuitBreaker,self).__init__()
+        assert threshold>0
+        self.threshold = threshold
+        self.resettimeout = resettimeout
+        self.state = "closed"
+        self.failures = 0
+        self._openedat = 0
+        self._trial = False
+        self._lock = threading.Lock()
+    def before(self):
+        """
+        Called before every request.
+        
+        :raises CircuitOpenError: if the breaker is open
+        """
+        with self._lock:
+            if self.state=="closed":
+                return
+            if self.state=="open" and time.monotonic()-self._openedat>=self.resettimeout:
+                self.state = "halfopen"
+                self._trial = False
+            if self.state=="halfopen" and not self._trial:
+                self._trial = True
+                return
+            raise CircuitOpenError("Circuit open after %d consecutive failures"%self.failures)
+    def success(self):
+        """
+        Called after every request that reached the server.
+        """
+        with self._lock:
+            changed = self.state!="closed"
+            failures = self.failures
+            self.state = "closed"
+            self.failures = 0
+        if changed:
+            self._emit("close",{"failures":failures})
+    def failure(self):
+        """
+        Called after every request that failed with a transport error.
+        """
+        with self._lock:
+            self.failures+=1
+            opened = self.state=="halfopen" or (self.state=="closed" and self.failures>=self.threshold)
+            if opened:
+                self.state = "open"
+                self._openedat = time.monotonic()
+            failures = self.failures
+        if opened:
+            self._emit("open",{"failures":failures})
+    def cancel(self):
+        """
+        Called after every request that was interrupted before its outcome was known.
+        
+        If the request was the trial request of the half-open breaker, the next request is let through as trial request instead.
+        """
+        with self._lock:
+            self._trial = False
+    def reset(self):
+        """
+        Closes the breaker manually.
+        """
+        self.success()
+
+class _Flight(object):
+    __slots__ = ["event","result","error"]
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight(_Hooks):
+    """
+    Deduplication of concurrent identical calls.
+    
+    While a call is in flight, identical calls do not send their own request but wait for the running one and share its result or error.
+    Only :py:data:`READ` actions are shared by default, as every call of a :py:data:`WRITE` action is expected to reach the server.
+    
+    Calls are identical if their keys are equal, :py:meth:`Session.executePrepared() <fritzctl.session.Session.executePrepared>`
+    uses the base URL of the server, the user, the control URL, the action and the request body, which contains all arguments,
+    so a single instance may be shared by sessions for different servers and users.
+    Every caller receives its own shallow copy of the result, so callers can modify it without affecting each other.
+    
+    Calls are not queued or delayed, so there is no overhead besides a dictionary lookup if no identical call is in flight.
+    
+    :param dict actions: Optional Dictionary mapping action names to flags if calls should be shared, overriding the idempotency class
+    
+    :ivar dict actions: stores the supplied flags
+    
+    The event ``shared`` is emitted to hooks for every call that waited for another call, the info dictionary contains the key ``action``\ .
+    """
+    def __init__(self,actions=None):
+        super(SingleFlight,self).__init__()
+        self.actions = dict(actions or {})
+        self._flights = {}
+        self._lock = threading.Lock()
+    def isShared(self,action):
+        """
+        Checks if concurrent calls of the given action may be shared.
+        
+        :param str action: Name of the action
+        :rtype: bool
+        """
+        shared = self.actions.get(action)
+        if shared is None:
+            return classifyAction(action)==READ
+        return shared
+    def call(self,action,key,func):
+        """
+        Calls ``func``\ , unless an identical call is already in flight.
+        
+        :param str action: Name of the action, used for deciding if calls may be shared
+        :param key: Hashable key identifying the call
+        :param func: Callable without arguments sending the request and returning a dictionary
+        :return: Copy of the return value of ``func``
+        :rtype: dict
+        """
+        if not self.isShared(action):
+            return func()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if leader:
+            try:
+                flight.result = func()
+            except BaseException as e:
+                # Waiting callers must not be left without a result, e.g. after a KeyboardInterrupt
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.event.set()
+        else:
+            self._emit("shared",{"action":action})
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+        return dict(flight.result)
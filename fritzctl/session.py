@@ -24,7 +24,10 @@
 
 __all__ = ["NAME_TO_URN","Session"]
 
-import simpletr64
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+
+# simpletr64, requests and modules depending on them are imported on first use, to keep importing this module fast
 
 from . import dynapi
 from . import ooapi
@@ -36,18 +39,18 @@ NAME_TO_URN = {
     "avm_homeauto":"urn:dslforum-org:service:X_AVM-DE_Homeauto:1",              # OO Done -> fritzctl.ooapi.avm_homeauto.API_avm_homeauto
     "avm_myfritz":"urn:dslforum-org:service:X_AVM-DE_MyFritz:1",                # Priority: medium
     "avm_remoteaccess":"urn:dslforum-org:service:X_AVM-DE_RemoteAccess:1",      # Priority: medium
-    "avm_storage":"urn:dslforum-org:service:X_AVM-DE_Storage:1",                # Priority: medium-high
-    "avm_speedtest":"urn:dslforum-org:service:X_AVM-DE_Speedtest:1",
+    "avm_storage":"urn:dslforum-org:service:X_AVM-DE_Storage:1",                # OO Done -> fritzctl.ooapi.avm_storage.API_avm_storage
+    "avm_speedtest":"urn:dslforum-org:service:X_AVM-DE_Speedtest:1",            # OO Done -> fritzctl.ooapi.avm_speedtest.API_avm_speedtest
     "avm_appsetup":"urn:dslforum-org:service:X_AVM-DE_AppSetup:1",              # Priority: lowest
-    "avm_dect":"urn:dslforum-org:service:X_AVM-DE_Dect:1",
+    "avm_dect":"urn:dslforum-org:service:X_AVM-DE_Dect:1",                      # OO Done -> fritzctl.ooapi.avm_dect.API_avm_dect
     "avm_upnp":"urn:dslforum-org:service:X_AVM-DE_UPnP:1",                      # Priority: medium-high
-    "avm_ontel":"urn:dslforum-org:service:X_AVM-DE_OnTel:1",
+    "avm_ontel":"urn:dslforum-org:service:X_AVM-DE_OnTel:1",                    # OO Done -> fritzctl.ooapi.avm_ontel.API_avm_ontel
     "avm_filelinks":"urn:dslforum-org:service:X_AVM-DE_Filelinks:1",            # Priority: medium-low
     "avm_webdavclient":"urn:dslforum-org:service:X_AVM-DE_WebDAVClient:1",      # Priority: medium-low
     "avm_homeplug":"urn:dslforum-org:service:X_AVM-DE_Homeplug:1",              # OO Done -> fritzctl.ooapi.avm_homeplug.API_avm_homeplug
-    "avm_tam":"urn:dslforum-org:service:X_AVM-DE_TAM:1",                        # Priority: low
+    "avm_tam":"urn:dslforum-org:service:X_AVM-DE_TAM:1",                        # OO Done -> fritzctl.ooapi.avm_tam.API_avm_tam
     "avm_auth": "urn:dslforum-org:service:X_AVM-DE_Auth:1",
-    "avm_hostfilter": "urn:dslforum-org:service:X_AVM-DE_HostFilter:1",
+    "avm_hostfilter": "urn:dslforum-org:service:X_AVM-DE_HostFilter:1",        # OO Done -> fritzctl.ooapi.avm_hostfilter.API_avm_hostfilter
 
     # General Purpose APIs
     
@@ -61,10 +64,10 @@ NAME_TO_URN = {
     "general_x_voip":"urn:dslforum-org:service:X_VoIP:1",
     
     "net_wan_dsllinkconfig":"urn:dslforum-org:service:WANDSLLinkConfig:1",
-    "net_wan_ipconnection":"urn:dslforum-org:service:WANIPConnection:1",
-    "net_wan_commoninterfacecfg":"urn:dslforum-org:service:WANCommonInterfaceConfig:1",
-    "net_wan_dslinterfacecfg":"urn:dslforum-org:service:WANDSLInterfaceConfig:1",
-    "net_wan_pppconnection":"urn:dslforum-org:service:WANPPPConnection:1",
+    "net_wan_ipconnection":"urn:dslforum-org:service:WANIPConnection:1",        # OO Done -> fritzctl.ooapi.net_wan_ipconnection.API_net_wan_ipconnection
+    "net_wan_commoninterfacecfg":"urn:dslforum-org:service:WANCommonInterfaceConfig:1", # OO Done -> fritzctl.ooapi.net_wan_commoninterfacecfg.API_net_wan_commoninterfacecfg
+    "net_wan_dslinterfacecfg":"urn:dslforum-org:service:WANDSLInterfaceConfig:1", # OO Done -> fritzctl.ooapi.net_wan_dslinterfacecfg.API_net_wan_dslinterfacecfg
+    "net_wan_pppconnection":"urn:dslforum-org:service:WANPPPConnection:1",      # OO Done -> fritzctl.ooapi.net_wan_pppconnection.API_net_wan_pppconnection
     "net_wan_ethernetlinkcfg":"urn:dslforum-org:service:WANEthernetLinkConfig:1",
     
     "net_lan_configsecurity":"urn:dslforum-org:service:LANConfigSecurity:1",
@@ -98,18 +101,18 @@ Name                     URN
 avm_homeauto             ``urn:dslforum-org:service:X_AVM-DE_Homeauto:1``        Yes
 avm_myfritz              ``urn:dslforum-org:service:X_AVM-DE_MyFritz:1``         No
 avm_remoteaccess         ``urn:dslforum-org:service:X_AVM-DE_RemoteAccess:1``    No
-avm_storage              ``urn:dslforum-org:service:X_AVM-DE_Storage:1``         No
-avm_speedtest            ``urn:dslforum-org:service:X_AVM-DE_Speedtest:1``       No
+avm_storage              ``urn:dslforum-org:service:X_AVM-DE_Storage:1``         Yes
+avm_speedtest            ``urn:dslforum-org:service:X_AVM-DE_Speedtest:1``       Yes
 avm_appsetup             ``urn:dslforum-org:service:X_AVM-DE_AppSetup:1``        No
-avm_dect                 ``urn:dslforum-org:service:X_AVM-DE_Dect:1``            No
+avm_dect                 ``urn:dslforum-org:service:X_AVM-DE_Dect:1``            Yes
 avm_upnp                 ``urn:dslforum-org:service:X_AVM-DE_UPnP:1``            No
-avm_ontel                ``urn:dslforum-org:service:X_AVM-DE_OnTel:1``           No
+avm_ontel                ``urn:dslforum-org:service:X_AVM-DE_OnTel:1``           Yes
 avm_filelinks            ``urn:dslforum-org:service:X_AVM-DE_Filelinks:1``       No
 avm_webdavclient         ``urn:dslforum-org:service:X_AVM-DE_WebDAVClient:1``    No
 avm_homeplug             ``urn:dslforum-org:service:X_AVM-DE_Homeplug:1``        Yes
-avm_tam                  ``urn:dslforum-org:service:X_AVM-DE_TAM:1``             No
+avm_tam                  ``urn:dslforum-org:service:X_AVM-DE_TAM:1``             Yes
 avm_auth                 ``urn:dslforum-org:service:X_AVM-DE_Auth:1``            No
-avm_hostfilter           ``urn:dslforum-org:service:X_AVM-DE_HostFilter:1``      No
+avm_hostfilter           ``urn:dslforum-org:service:X_AVM-DE_HostFilter:1``      Yes
 general_time             ``urn:dslforum-org:service:Time:1``                     Yes
 general_deviceinfo       ``urn:dslforum-org:service:DeviceInfo:1``               Yes
 general_deviceconfig     ``urn:dslforum-org:service:DeviceConfig:1``             Yes
@@ -119,10 +122,10 @@ general_managementserver ``urn:dslforum-org:service:ManagementServer:1``
 general_layer3fwd        ``urn:dslforum-org:service:Layer3Forwarding:1``         No
 general_x_voip           ``urn:dslforum-org:service:X_VoIP:1``                   No
 net_wan_dsllinkconfig    ``urn:dslforum-org:service:WANDSLLinkConfig:1``         No
-net_wan_ipconnection     ``urn:dslforum-org:service:WANIPConnection:1``          No
-|urn_net_wan_cmifacecfg| ``urn:dslforum-org:service:WANCommonInterfaceConfig:1`` No
-net_wan_dslinterfacecfg  ``urn:dslforum-org:service:WANDSLInterfaceConfig:1``    No
-net_wan_pppconnection    ``urn:dslforum-org:service:WANPPPConnection:1``         No
+net_wan_ipconnection     ``urn:dslforum-org:service:WANIPConnection:1``          Yes
+|urn_net_wan_cmifacecfg| ``urn:dslforum-org:service:WANCommonInterfaceConfig:1`` Yes
+net_wan_dslinterfacecfg  ``urn:dslforum-org:service:WANDSLInterfaceConfig:1``    Yes
+net_wan_pppconnection    ``urn:dslforum-org:service:WANPPPConnection:1``         Yes
 net_wan_ethernetlinkcfg  ``urn:dslforum-org:service:WANEthernetLinkConfig:1``    No
 net_lan_configsecurity   ``urn:dslforum-org:service:LANConfigSecurity:1``        No
 |urn_net_lan_hostcfgmgr| ``urn:dslforum-org:service:LANHostConfigManagement:1``  No
@@ -149,6 +152,26 @@ You may be able to make an educated guess about which network is which by queryi
 See the :py:mod:`fritzctl.ooapi` package for specific OO APIs, as indicated in the table.
 """
 
+SOAP_ENVELOPE = """<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/" xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">
+<s:Body><u:%(action)s xmlns:u="%(urn)s">%(args)s</u:%(action)s></s:Body>
+</s:Envelope>"""
+"""
+Template used by :py:meth:`Session.execute()` for building SOAP requests.
+"""
+
+def escape(data):
+    """
+    Escapes ``&``\ , ``<`` and ``>`` in the given string for use as the value of an argument in :py:data:`SOAP_ENVELOPE`\ .
+    
+    Same as :py:func:`xml.sax.saxutils.escape()`\ , which is not used as importing it is slow.
+    
+    :param str data: String to escape
+    :rtype: str
+    """
+    return data.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+
+
 
 class Session(object):
     """
@@ -161,6 +184,21 @@ class Session(object):
     :param bool authcheck: If the credentials should be checked, simply requests the ``general_deviceinfo`` API.
     :param float timeout: Timeout for all TR64 requests
     :param float authcheck_method: Method to use for authcheck, either ``deviceinfo`` (the default) or ``smarthome``
+    :param str location: Optional URL of the device description, e.g. as found by :py:func:`fritzctl.discovery.discover()`\ ; overrides ``server`` and ``port``
+    :param https: Optional Flag if all actions should be executed via HTTPS on the secure port of the server, ``"auto"`` only upgrades if the server supports it, defaults to False
+    :type https: bool or str
+    :param str fingerprint: Optional hex-encoded SHA-256 fingerprint of the certificate of the server, if not given the certificate presented on first connect is trusted and pinned
+    :param policy: Optional retry policy for actions, defaults to a :py:class:`RetryPolicy() <fritzctl.resilience.RetryPolicy>` with default settings, ``None`` disables retries
+    :type policy: fritzctl.resilience.RetryPolicy or None
+    :param breaker: Optional circuit breaker for actions, defaults to a :py:class:`CircuitBreaker() <fritzctl.resilience.CircuitBreaker>` with default settings, ``None`` disables it
+    :type breaker: fritzctl.resilience.CircuitBreaker or None
+    :param singleflight: Optional deduplication of concurrent identical actions, defaults to a :py:class:`SingleFlight() <fritzctl.resilience.SingleFlight>` with default settings, ``None`` disables it; may be shared by several sessions
+    :type singleflight: fritzctl.resilience.SingleFlight or None
+    :param bool loadscpd: Optional Flag if the SCPDs of all services should be fetched, defaults to True; see below
+    :param cache: Optional cache backend for sharing the device description, the SCPDs and snapshots with other sessions, see :py:mod:`fritzctl.cache`
+    :type cache: fritzctl.cache.CacheBackend or None
+    
+    All parameters after ``authcheck_method`` are keyword-only, so positional calls written for older versions keep working.
     
     Instance Variables:
     
@@ -169,6 +207,28 @@ class Session(object):
     :ivar pwd: Password for authentification
     :ivar device: :py:class:`simpletr64.DeviceTR64()` Instance used for managing authentification
     :ivar urns: List of URNs found on the server, can be used for debugging
+    :ivar codecs: Dictionary caching the codecs returned by :py:meth:`getCodec()`\ , keyed by ``(urn,action)``
+    :ivar baseurl: Base URL of the server, used for resolving relative URLs returned by some actions
+    :ivar http: :py:class:`requests.Session()` used for all requests to the server, keeps connections alive between requests
+    :ivar policy: Retry policy used by :py:meth:`execute()`\ , see :py:mod:`fritzctl.resilience`
+    :ivar breaker: Circuit breaker used by :py:meth:`execute()`\ , see :py:mod:`fritzctl.resilience`
+    :ivar singleflight: Deduplication used by :py:meth:`execute()`\ , see :py:mod:`fritzctl.resilience`
+    :ivar fingerprint: Hex-encoded SHA-256 fingerprint of the pinned certificate, ``None`` if HTTPS is not used
+    :ivar location: URL of the device description
+    :ivar cache: stores the supplied cache backend
+    
+    The certificate of the server is usually self-signed, so it is not validated against any certificate authority.
+    Instead, its fingerprint is pinned and every HTTPS connection to the server is rejected if the certificate does not match.
+    Store :py:attr:`fingerprint` and pass it to later sessions to detect changed certificates.
+    
+    Connections are kept alive and reused, so the TLS handshake is only done once per pooled connection, not per action.
+    
+    Fetching the SCPDs requires one request per service. If ``loadscpd`` is ``False``\ , only the device description is fetched.
+    Arguments are then not validated and the methods of :py:class:`DynamicAPI() <fritzctl.dynapi.DynamicAPI>` are resolved on access,
+    this is intended for use with wrappers generated by :py:mod:`fritzctl.codegen`\ .
+    
+    If a cache is given, the device description and the SCPDs are only fetched if they are not cached yet for ``location``\ .
+    Concurrent sessions for the same server wait for the first one to fetch them instead of fetching them too.
     """
     def __init__(self,
                  server="fritz.box",
@@ -177,34 +237,105 @@ class Session(object):
                  authcheck=True,
                  timeout=2.0,
                  authcheck_method="deviceinfo",
+                 *,
+                 location=None,
+                 policy=True,
+                 breaker=True,
+                 singleflight=True,
+                 https=False,
+                 fingerprint=None,
+                 loadscpd=True,
+                 cache=None,
                  ):
+        if location is not None:
+            u = urlsplit(location)
+            server,port = u.hostname,u.port or 80
+        else:
+            location = "http://"+server+":"+str(port)+"/tr64desc.xml"
         self.server = server
+        self.location = location
+        self.cache = cache
         
         self.user = user if user is not None else ""
         self.pwd = pwd if pwd is not None else ""
         self.timeout = timeout
 
-        # TODO: add SCPD caching
+        import simpletr64
+        import requests
+        from requests.auth import HTTPDigestAuth
+        from . import resilience
+
+        self.baseurl = "http://"+self.server+":"+str(port)
+        self.http = requests.Session()
+        self._auth = HTTPDigestAuth(self.user,self.pwd) if self.pwd else None
+        self.policy = resilience.RetryPolicy() if policy is True else policy
+        self.breaker = resilience.CircuitBreaker() if breaker is True else breaker
+        self.singleflight = resilience.SingleFlight() if singleflight is True else singleflight
+
         self.device = simpletr64.DeviceTR64(server, port=port)
         self.device.username = self.user
         self.device.password = self.pwd
 
-        # TODO: auto-upgrade to HTTPS if supported
-        self.device.loadDeviceDefinitions("http://"+self.server+":"+str(self.device.port)+"/tr64desc.xml", timeout=timeout)
-        self.device.loadSCPD()
-        self.urns = list(self.device.deviceSCPD.keys())
+        if cache is None:
+            self.device.loadDeviceDefinitions(location, timeout=timeout)
+            if loadscpd:
+                self.device.loadSCPD()
+        else:
+            self._loadCachedDefinitions(loadscpd)
+        if loadscpd:
+            self.urns = list(self.device.deviceSCPD.keys())
+        else:
+            self.urns = list(self.device.deviceServiceDefinitions.keys())
+        self.codecs = {}
+
+        self.fingerprint = None
+        if https:
+            self.upgradeHTTPS(fingerprint,required=https!="auto")
 
         if authcheck:
             if not self.do_authcheck(authcheck_method):
                 raise ValueError("Invalid Credentials for user %s, ensure they have the correct permissions!" % user)
 
-    def getAPI(self,name):
+    def _loadCachedDefinitions(self,loadscpd):
+        def loadDescription():
+            self.device.loadDeviceDefinitions(self.location, timeout=self.timeout)
+            return {"services":dict(self.device.deviceServiceDefinitions),"informations":dict(self.device.deviceInformations)}
+        desc = self.cache.getOrSet("fritzctl:desc:"+self.location,loadDescription)
+        self.device.deviceServiceDefinitions.update(desc["services"])
+        self.device.deviceInformations.update(desc["informations"])
+        # simpletr64 only raises errors for unknown services if it parsed the description itself
+        self.device._DeviceTR64__deviceXMLInitialized = True
+        if loadscpd:
+            def loadSCPD():
+                self.device.loadSCPD()
+                return dict(self.device.deviceSCPD)
+            self.device.deviceSCPD.update(self.cache.getOrSet("fritzctl:scpd:"+self.location,loadSCPD))
+
+    def getCached(self,name,func,maxage=None):
+        """
+        Returns a value cached for this server, calling ``func`` and storing its result if it is missing or too old.
+        
+        Values are shared via :py:attr:`cache` with all sessions of the same user for the same server.
+        The age is checked against the ``maxage`` of every caller, see :py:meth:`CacheBackend.getOrRefresh() <fritzctl.cache.CacheBackend.getOrRefresh>`\ .
+        If no cache backend is used or ``maxage`` is ``None``\ , ``func`` is always called.
+        
+        :param str name: Name of the value, e.g. ``hosts``
+        :param func: Callable without arguments returning the value
+        :param float maxage: Optional maximum age in seconds of a cached value, defaults to ``None``
+        :return: Cached or newly computed value
+        """
+        if self.cache is None or maxage is None:
+            return func()
+        return self.cache.getOrRefresh("fritzctl:%s:%s@%s"%(name,self.user,self.location),func,maxage)
+
+    def getAPI(self,name,typed=False):
         """
         Requests an API object by either URN or user-friendly name.
         
         See :py:data:`NAME_TO_URN` for a list of user-friendly names.
         
         :param str name: API Name, either Service Type URN or user-friendly name
+        :param bool typed: Optional Flag if results should be converted to native types, defaults to False
         :return: A :py:class:`DynamicAPI() <fritzctl.dynapi.DynamicAPI>` instance ready-for-use
         :raises ValueError: if the URN is not known or is not in :py:data:`NAME_TO_URN`
         """
@@ -216,7 +347,45 @@ class Session(object):
             if name not in NAME_TO_URN:
                 raise ValueError("Invalid Name!")
             urn = NAME_TO_URN[name]
-        return dynapi.DynamicAPI(self,urn)
+        return dynapi.DynamicAPI(self,urn,typed)
+
+    def hasAction(self,urn,action,default=False):
+        """
+        Checks if the given service provides the given action.
+        
+        If the SCPD of the service has not been loaded, e.g. because the session was created with ``loadscpd`` set to ``False``\ ,
+        this cannot be checked and ``default`` is returned instead.
+        
+        :param str urn: Service Type URN of the service
+        :param str action: Name of the action
+        :param bool default: Optional value to return if the SCPD of the service is not known, defaults to False
+        :rtype: bool
+        """
+        actions = self.device.deviceSCPD.get(urn)
+        if actions is None:
+            return default
+        return action in actions
+
+    def getCodec(self,urn,action):
+        """
+        Returns the codec for validating and converting the arguments of the given action.
+        
+        Codecs are compiled from the SCPD on first use and cached in :py:attr:`codecs` for the lifetime of this session.
+        
+        :param str urn: Service Type URN of the service
+        :param str action: Name of the action
+        :return: Codec for the action, ``None`` if the action is not defined in the SCPD
+        :rtype: :py:class:`ActionCodec() <fritzctl.dynapi.ActionCodec>` or None
+        """
+        key = (urn,action)
+        try:
+            return self.codecs[key]
+        except KeyError:
+            pass
+        definition = self.device.deviceSCPD.get(urn,{}).get(action)
+        codec = dynapi.ActionCodec(action,definition) if definition is not None else None
+        self.codecs[key] = codec
+        return codec
 
     def getOOAPI(self,name):
         """
@@ -240,15 +409,148 @@ class Session(object):
             urn = NAME_TO_URN[name]
         return OO_APIS[urn](self,urn)
     
-    def execute(self,*args,**kwargs):
+    def execute(self,uri,urn,action,timeout=None,**kwargs):
         """
         Executes the given action on the server.
         
-        This method simply passes through all parameters to the internal :py:class:`simpletr64.DeviceTR64()` instance.
+        The request is sent via :py:attr:`http`\ , the connection and the digest authentication
+        state are kept alive and reused by later calls.
+        
+        Transport errors are retried according to :py:attr:`policy` and requests are refused
+        while :py:attr:`breaker` is open, see :py:mod:`fritzctl.resilience` for details.
+        Concurrent identical calls of read actions share a single request, see :py:attr:`singleflight`\ .
+        
+        :param str uri: Control URL of the service, e.g. ``/upnp/control/hosts``
+        :param str urn: Service Type URN of the service
+        :param str action: Name of the action to execute
+        :param float timeout: Optional timeout, defaults to the timeout of the policy for this action or the timeout of this session
+        :param kwargs: Arguments of the action, converted to strings
+        :return: Dictionary mapping the names of all output arguments to their values
+        :rtype: dict
+        :raises ValueError: if the server rejected the action, e.g. because of an invalid argument
+        :raises requests.exceptions.RequestException: if the server could not be reached, even after retrying
+        :raises fritzctl.resilience.CircuitOpenError: if the circuit breaker is open
         """
-        if 'timeout' not in kwargs:
-            kwargs['timeout'] = self.timeout
-        return self.device.execute(*args,**kwargs)
+        args = "".join(["<%s>%s</%s>"%(k,escape(str(v)),k) for k,v in kwargs.items()])
+        body = SOAP_ENVELOPE%{"action":action,"urn":urn,"args":args}
+        return self.executePrepared(uri,urn,action,body,timeout,kwargs)
+    def executePrepared(self,uri,urn,action,body,timeout=None,kwargs=None):
+        """
+        Executes the given action with an already built SOAP request body.
+        
+        Behaves like :py:meth:`execute()`\ , but skips building the body, e.g. for wrappers generated by :py:mod:`fritzctl.codegen`\ .
+        
+        :param str uri: Control URL of the service
+        :param str urn: Service Type URN of the service
+        :param str action: Name of the action to execute
+        :param str body: Complete SOAP envelope, see :py:data:`SOAP_ENVELOPE`
+        :param float timeout: Optional timeout, see :py:meth:`execute()`
+        :param dict kwargs: Optional arguments contained in the body, only used for error messages
+        :return: Dictionary mapping the names of all output arguments to their values
+        :rtype: dict
+        """
+        if kwargs is None:
+            kwargs = {}
+        if timeout is None:
+            timeout = self.policy.getTimeout(action,self.timeout) if self.policy is not None else self.timeout
+        send = lambda:self._send(uri,urn,action,body,timeout,kwargs)
+        if self.policy is not None:
+            call = lambda:self.policy.call(action,send,self.breaker)
+        elif self.breaker is not None:
+            from . import resilience
+            call = lambda:resilience.RetryPolicy(retries=0).call(action,send,self.breaker)
+        else:
+            call = send
+        if self.singleflight is not None:
+            return self.singleflight.call(action,(self.baseurl,self.user,uri,action,body),call)
+        return call()
+    def _send(self,uri,urn,action,body,timeout,kwargs):
+        headers = {"Content-Type":'text/xml; charset="utf-8"',
+                   "SOAPAction":'"%s#%s"'%(urn,action),
+                   }
+        r = self.http.post(self.baseurl+uri,
+                           data=body.encode("utf-8"),
+                           headers=headers,
+                           auth=self._auth,
+                           timeout=timeout,
+                           )
+        if r.status_code!=200:
+            raise ValueError('Could not execute "%s%s": %s - %s -- %s'%(action,kwargs,r.status_code,r.reason,_extractError(r.content)))
+        try:
+            resp = ET.fromstring(r.content)[0][0]
+        except (ET.ParseError,IndexError) as e:
+            raise ValueError("Could not parse the result of %s: %s"%(action,e))
+        return {child.tag:child.text for child in resp}
+
+    def upgradeHTTPS(self,fingerprint=None,required=True):
+        """
+        Switches all further requests to HTTPS on the secure port of the server.
+        
+        This method is called automatically if the session has been created with ``https`` set.
+        
+        :param str fingerprint: Optional hex-encoded SHA-256 fingerprint of the certificate, see :py:class:`Session()`
+        :param bool required: Optional Flag if an error should be raised if the server does not support HTTPS, defaults to True
+        :return: Flag if HTTPS is used now
+        :rtype: bool
+        :raises ValueError: if HTTPS is required but not supported by the server
+        :raises ssl.SSLError: if the certificate does not match the given fingerprint
+        """
+        import hashlib
+        import socket
+        import ssl
+        from ._adapters import PinnedAdapter
+
+        try:
+            port = self.getOOAPI("general_deviceinfo").getSecurityPort()
+        except (ValueError,KeyError):
+            if required:
+                raise ValueError("Server does not support HTTPS")
+            return False
+        if fingerprint is None:
+            # The certificate is self-signed, so it is trusted on first use and pinned afterwards
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            with socket.create_connection((self.server,port),self.timeout) as sock:
+                with context.wrap_socket(sock,server_hostname=self.server) as tls:
+                    der = tls.getpeercert(True)
+            fingerprint = hashlib.sha256(der).hexdigest()
+        fingerprint = fingerprint.replace(":","").lower()
+        adapter = PinnedAdapter(fingerprint)
+        host = "https://"+self.server
+        self.http.mount(host+":",adapter)
+        self.http.mount(host+"/",adapter)
+        self.fingerprint = fingerprint
+        self.baseurl = host+":"+str(port)
+        return True
+
+    def getURL(self,url,params=None,stream=False,auth=False,timeout=None):
+        """
+        Requests the given URL from the server via HTTP GET.
+        
+        This method should be used for downloading files whose URL has been returned by an action, e.g. call lists.
+        The connection is kept alive and will be reused by later calls.
+        
+        :param str url: URL to request, relative URLs are resolved against :py:attr:`baseurl`
+        :param dict params: Optional additional query parameters
+        :param bool stream: Optional Flag if the response body should be streamed, defaults to False
+        :param bool auth: Optional Flag if HTTP Digest Authentication with the credentials of this session should be used, defaults to False
+        :param float timeout: Optional timeout, defaults to the timeout of this session
+        :return: The response object
+        :rtype: requests.Response
+        :raises requests.exceptions.HTTPError: if the server returned an error status
+        """
+        from requests.auth import HTTPDigestAuth
+        if url.startswith("/"):
+            url = self.baseurl+url
+        r = self.http.get(url,
+                          params=params,
+                          stream=stream,
+                          auth=HTTPDigestAuth(self.user,self.pwd) if auth else None,
+                          timeout=timeout if timeout is not None else self.timeout,
+                          )
+        r.raise_for_status()
+        return r
 
     def do_authcheck(self, method):
         # TODO: allow for printing of check-failing error
@@ -266,3 +568,15 @@ class Session(object):
             raise ValueError("Invalid authcheck method "+method)
 
         return True
+
+
+def _extractError(content):
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return ""
+    out = []
+    for elem in root.iter():
+        if elem.tag.endswith("errorCode") or elem.tag.endswith("errorDescription"):
+            out.append(elem.text or "")
+    return " ".join(out)
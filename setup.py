@@ -47,6 +47,7 @@ setup(name='fritzctl',
       url="https://pypi.python.org/pypi/fritzctl",
       packages=['fritzctl', "fritzctl.ooapi"],
       install_requires=["requests", "simpletr64"],
+      entry_points={"console_scripts":["fritzctl=fritzctl.cli:main"]},
       provides=["fritzctl"],
       classifiers=[
         "Development Status :: 5 - Production/Stable",
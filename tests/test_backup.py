@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_backup.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+
+from fritzctl import backup
+
+CONFIG1 = b"**** FRITZ!Box configuration 1\n**** END OF EXPORT ****\n"
+CONFIG2 = b"**** FRITZ!Box configuration 2\n**** END OF EXPORT ****\n"
+
+def fetch(url):
+    try:
+        with urllib.request.urlopen(url,timeout=5) as r:
+            return r.status,r.read()
+    except urllib.error.HTTPError as e:
+        return e.code,None
+
+class FakeDeviceConfigAPI(object):
+    def __init__(self):
+        self.urls = []
+        self.data = None
+    def setConfigFile(self,password,configurl):
+        assert password=="secret"
+        self.urls.append(configurl)
+        self.data = fetch(configurl)[1]
+
+class FakeSession(object):
+    def __init__(self):
+        self.api = FakeDeviceConfigAPI()
+    def getOOAPI(self,name):
+        assert name=="general_deviceconfig"
+        return self.api
+
+class TestBackupStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = backup.BackupStore(self.path)
+    def tearDown(self):
+        shutil.rmtree(self.path)
+    def add(self,name,data):
+        fname = self.store.getTempPath()
+        with open(fname,"wb") as f:
+            f.write(data)
+        return self.store.addFile(name,fname)
+    def countObjects(self):
+        return sum(len(files) for _,_,files in os.walk(os.path.join(self.path,"objects")))
+    def test_dedup(self):
+        r1 = self.add("office",CONFIG1)
+        r2 = self.add("home",CONFIG1)
+        r3 = self.add("office",CONFIG2)
+        self.assertEqual(r1["sha256"],hashlib.sha256(CONFIG1).hexdigest())
+        self.assertEqual(r1["size"],len(CONFIG1))
+        self.assertEqual([r1["new"],r2["new"],r3["new"]],[True,False,True])
+        self.assertEqual(r1["sha256"],r2["sha256"])
+        self.assertEqual(self.countObjects(),2)
+        self.assertEqual(os.listdir(os.path.join(self.path,"tmp")),[])
+        with open(self.store.getObjectPath(r1["sha256"]),"rb") as f:
+            self.assertEqual(f.read(),CONFIG1)
+    def test_history(self):
+        self.assertEqual(self.store.getHistory("office"),[])
+        self.assertIsNone(self.store.getLatest("office"))
+        r1 = self.add("office",CONFIG1)
+        r2 = self.add("office",CONFIG2)
+        self.add("home",CONFIG1)
+        self.assertEqual(self.store.getHistory("office"),[r1,r2])
+        self.assertEqual(self.store.getLatest("office"),r2)
+        self.assertEqual(self.store.getNames(),["home","office"])
+        self.assertRaises(AssertionError,self.store.getHistory,"../office")
+    def test_prune(self):
+        r1 = self.add("office",CONFIG1)
+        r2 = self.add("office",CONFIG2)
+        self.add("office",CONFIG2)
+        self.assertEqual(self.store.prune(keep=2),1)
+        self.assertEqual([r["sha256"] for r in self.store.getHistory("office")],[r2["sha256"]]*2)
+        self.assertFalse(self.store.hasObject(r1["sha256"]))
+        self.assertTrue(self.store.hasObject(r2["sha256"]))
+        # Configfiles still referenced by another server are kept
+        self.add("office",CONFIG1)
+        self.add("home",CONFIG1)
+        self.assertEqual(self.store.prune(keep=1),1)
+        self.assertTrue(self.store.hasObject(r1["sha256"]))
+        self.assertFalse(self.store.hasObject(r2["sha256"]))
+
+class TestRestore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = backup.BackupStore(self.path)
+        fname = self.store.getTempPath()
+        with open(fname,"wb") as f:
+            f.write(CONFIG1)
+        self.record = self.store.addFile("office",fname)
+    def tearDown(self):
+        shutil.rmtree(self.path)
+    def test_restore(self):
+        session = FakeSession()
+        orch = backup.BackupOrchestrator(self.store,"secret")
+        out = orch.restore({"office":session},host="127.0.0.1",timeout=5)
+        self.assertEqual(out,[("office",self.record["sha256"],None)])
+        self.assertEqual(session.api.data,CONFIG1)
+        # Every server gets its own URL containing a random token
+        url = session.api.urls[0]
+        self.assertRegex(url,"^http://127.0.0.1:[0-9]+/config/%s/[0-9a-f]{32}$"%self.record["sha256"])
+    def test_unknown_name(self):
+        orch = backup.BackupOrchestrator(self.store,"secret")
+        self.assertRaises(ValueError,orch.restore,{"home":FakeSession()},host="127.0.0.1")
+    def test_token(self):
+        server = backup.ConfigFileServer(self.store)
+        server.start()
+        try:
+            sha256 = self.record["sha256"]
+            url = server.getURL(sha256,"127.0.0.1","abc123")
+            base = "http://127.0.0.1:%d/config/%s"%(server.port,sha256)
+            self.assertEqual(fetch(base),(404,None))
+            self.assertEqual(fetch(base+"/other"),(404,None))
+            self.assertFalse(server.waitServed(url,0))
+            self.assertEqual(fetch(url),(200,CONFIG1))
+            self.assertTrue(server.waitServed(url,5))
+        finally:
+            server.stop()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_cache.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from fritzctl import cache
+from fritzctl.session import Session
+
+def getSession(backend):
+    session = Session.__new__(Session)
+    session.cache = backend
+    session.user = "user"
+    session.location = "http://192.168.178.1:49000/tr64desc.xml"
+    return session
+
+class BackendMixin(object):
+    def getBackend(self):
+        raise NotImplementedError()
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.backend = self.getBackend()
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    def test_get_set(self):
+        self.assertIsNone(self.backend.get("a"))
+        self.assertEqual(self.backend.get("a",1),1)
+        self.backend.set("a",{"hosts":[1,2,3]})
+        self.assertEqual(self.backend.get("a"),{"hosts":[1,2,3]})
+        self.backend.set("a",2)
+        self.assertEqual(self.backend.get("a"),2)
+    def test_ttl(self):
+        self.backend.set("a",1,0.05)
+        self.backend.set("b",2)
+        self.assertEqual(self.backend.get("a"),1)
+        time.sleep(0.1)
+        self.assertIsNone(self.backend.get("a"))
+        self.assertEqual(self.backend.get("b"),2)
+    def test_delete_clear(self):
+        self.backend.set("a",1)
+        self.backend.set("b",2)
+        self.backend.delete("a")
+        self.backend.delete("c")
+        self.assertIsNone(self.backend.get("a"))
+        self.assertEqual(self.backend.get("b"),2)
+        self.backend.clear()
+        self.assertIsNone(self.backend.get("b"))
+    def test_getorset(self):
+        calls = []
+        def func():
+            calls.append(1)
+            time.sleep(0.05)
+            return "value"
+        results = []
+        threads = [threading.Thread(target=lambda:results.append(self.backend.getOrSet("a",func))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results,["value"]*8)
+        self.assertEqual(len(calls),1)
+    def test_maxage_per_caller(self):
+        session = getSession(self.backend)
+        self.assertEqual(session.getCached("hosts",lambda:"old",300),"old")
+        time.sleep(0.2)
+        self.assertEqual(session.getCached("hosts",lambda:"new",0.05),"new")
+        self.assertEqual(session.getCached("hosts",lambda:"newer",300),"new")
+    def test_maxage_none(self):
+        session = getSession(self.backend)
+        self.assertEqual(session.getCached("hosts",lambda:1,None),1)
+        self.assertEqual(session.getCached("hosts",lambda:2,None),2)
+
+class TestLRUCache(BackendMixin,unittest.TestCase):
+    def getBackend(self):
+        return cache.LRUCache()
+    def test_maxsize(self):
+        backend = cache.LRUCache(maxsize=2)
+        backend.set("a",1)
+        backend.set("b",2)
+        backend.get("a")
+        backend.set("c",3)
+        self.assertEqual(len(backend),2)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"),1)
+
+class TestMmapCache(BackendMixin,unittest.TestCase):
+    def getBackend(self):
+        return cache.MmapCache(os.path.join(self.tmpdir,"cache"),size=1<<16)
+    def tearDown(self):
+        self.backend.close()
+        super(TestMmapCache,self).tearDown()
+    def test_shared(self):
+        other = self.getBackend()
+        try:
+            self.backend.set("a",1)
+            self.assertEqual(other.get("a"),1)
+        finally:
+            other.close()
+    def test_size(self):
+        self.assertRaises(ValueError,self.backend.set,"a",b"x"*(1<<16))
+
+class TestSQLiteCache(BackendMixin,unittest.TestCase):
+    def getBackend(self):
+        return cache.SQLiteCache(os.path.join(self.tmpdir,"cache.db"))
+    def test_shared(self):
+        self.backend.set("a",1)
+        self.assertEqual(self.getBackend().get("a"),1)
+
+if __name__ == "__main__":
+    unittest.main()
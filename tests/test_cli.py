@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_cli.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from fritzctl import cli
+
+class FakeHost(object):
+    def __init__(self,mac,ip,active):
+        self.mac = mac
+        self.ip = ip
+        self.active = active
+
+class FakeHostsAPI(object):
+    def getHostTable(self):
+        return [FakeHost("AA:BB:CC:DD:EE:01","192.168.178.2",True),FakeHost("AA:BB:CC:DD:EE:02","",False)]
+    def wakeUp(self,mac):
+        raise ValueError("Unknown host %s"%mac)
+
+class FakeSession(object):
+    def getOOAPI(self,name):
+        assert name=="general_hosts"
+        return FakeHostsAPI()
+
+class TestParser(unittest.TestCase):
+    def test_commands(self):
+        parser = cli.buildParser()
+        args = parser.parse_args(["hosts","list","--active"])
+        self.assertEqual((args.cmd,args.active),("hosts.list",True))
+        args = parser.parse_args(["-f","csv","wlan","info","--band","2"])
+        self.assertEqual((args.cmd,args.band,args.format),("wlan.info",2,"csv"))
+        args = parser.parse_args(["call","general_time","GetInfo","NewNTPServer1=ntp.example.com"])
+        self.assertEqual((args.cmd,args.service,args.action,args.arguments),("call","general_time","GetInfo",["NewNTPServer1=ntp.example.com"]))
+        args = parser.parse_args(["daemon","--idle","60"])
+        self.assertEqual((args.cmd,args.idle),("daemon",60.0))
+    def test_invalid(self):
+        parser = cli.buildParser()
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit,parser.parse_args,["hosts"])
+            self.assertRaises(SystemExit,parser.parse_args,["wlan","info","--band","4"])
+    def test_environment(self):
+        env = {"FRITZCTL_SERVER":"192.168.178.1","FRITZCTL_USER":"admin","FRITZCTL_PASSWORD":"secret"}
+        with mock.patch.dict(os.environ,env):
+            args = cli.buildParser().parse_args(["hosts","list"])
+        self.assertEqual((args.server,args.user,args.password),("192.168.178.1","admin","secret"))
+
+class TestFormat(unittest.TestCase):
+    def test_json(self):
+        self.assertEqual(cli.formatResult({"b":1,"a":None}),'{\n "a": null,\n "b": 1\n}')
+        self.assertEqual(cli.formatResult(None),"null")
+    def test_csv(self):
+        # Columns are the union of all rows, in the order they first appeared
+        rows = [{"mac":"AA","ip":"1"},{"mac":"BB","name":"x"}]
+        self.assertEqual(cli.formatResult(rows,"csv"),"mac,ip,name\nAA,1,\nBB,,x")
+        self.assertEqual(cli.formatResult({"mac":"AA"},"csv"),"mac\nAA")
+        self.assertEqual(cli.formatResult(None,"csv"),"")
+    def test_invalid(self):
+        self.assertRaises(ValueError,cli.formatResult,{},"xml")
+
+class TestBatch(unittest.TestCase):
+    def run_batch(self,argv,stdin):
+        out = io.StringIO()
+        err = io.StringIO()
+        with mock.patch.object(cli,"openSession",lambda args:FakeSession()), \
+                mock.patch("sys.stdin",io.StringIO(stdin)), \
+                contextlib.redirect_stdout(out),contextlib.redirect_stderr(err):
+            code = cli.main(argv)
+        return code,out.getvalue(),err.getvalue()
+    def test_json(self):
+        stdin = "# comment\n\nhosts list --active\nhosts wake AA:BB:CC:DD:EE:03\nhosts frobnicate\n"
+        code,out,err = self.run_batch(["--batch"],stdin)
+        self.assertEqual(code,1)
+        lines = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(lines[0],{"command":"hosts list --active","result":[{"mac":"AA:BB:CC:DD:EE:01","ip":"192.168.178.2","active":True}]})
+        self.assertEqual(lines[1],{"command":"hosts wake AA:BB:CC:DD:EE:03","error":"ValueError: Unknown host AA:BB:CC:DD:EE:03"})
+        self.assertEqual(lines[2],{"command":"hosts frobnicate","error":"Invalid command"})
+        self.assertEqual(len(lines),3)
+    def test_csv(self):
+        code,out,err = self.run_batch(["--format","csv","--batch"],"hosts list\nhosts list --active\n")
+        self.assertEqual(code,0)
+        self.assertEqual(out,"mac,ip,active\nAA:BB:CC:DD:EE:01,192.168.178.2,True\nAA:BB:CC:DD:EE:02,,False\n\n"
+                             "mac,ip,active\nAA:BB:CC:DD:EE:01,192.168.178.2,True\n\n")
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir,"fritzctl.sock")
+        self.sessions = []
+        servers = []
+        class Server(socketserver.ThreadingUnixStreamServer):
+            def __init__(self,*args,**kwargs):
+                super(Server,self).__init__(*args,**kwargs)
+                servers.append(self)
+        def openSession(args):
+            if args.password!="secret":
+                raise ValueError("Invalid password")
+            self.sessions.append(FakeSession())
+            return self.sessions[-1]
+        self.patches = [mock.patch.object(socketserver,"ThreadingUnixStreamServer",Server),mock.patch.object(cli,"openSession",openSession)]
+        for p in self.patches:
+            p.start()
+        self.thread = threading.Thread(target=cli.serve,args=(self.path,))
+        self.thread.start()
+        deadline = time.monotonic()+5
+        while not servers and time.monotonic()<deadline:
+            time.sleep(0.01)
+        self.server = servers[0]
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        for p in self.patches:
+            p.stop()
+        self.assertFalse(os.path.exists(self.path))
+        shutil.rmtree(self.dir)
+    def test_roundtrip(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode),0o600)
+        parser = cli.buildParser()
+        client = cli.DaemonClient(self.path)
+        try:
+            output,error = client.run(parser.parse_args(["--password","secret","hosts","list","--active"]))
+            self.assertIsNone(error)
+            self.assertEqual(json.loads(output),[{"mac":"AA:BB:CC:DD:EE:01","ip":"192.168.178.2","active":True}])
+            output,error = client.run(parser.parse_args(["--password","secret","-f","csv","hosts","list"]))
+            self.assertEqual(output.splitlines()[0],"mac,ip,active")
+            # The session is kept open between commands
+            self.assertEqual(len(self.sessions),1)
+            output,error = client.run(parser.parse_args(["--password","wrong","hosts","list"]))
+            self.assertEqual((output,error),(None,"ValueError: Invalid password"))
+        finally:
+            client.close()
+    def test_main(self):
+        for i in range(2):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                code = cli.main(["--socket",self.path,"--password","secret","hosts","list"])
+            self.assertEqual(code,0)
+            self.assertEqual(len(json.loads(out.getvalue())),2)
+        # Both commands were run by the daemon using the same session
+        self.assertEqual(len(self.sessions),1)
+
+if __name__ == "__main__":
+    unittest.main()
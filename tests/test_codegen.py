@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_codegen.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import datetime
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from fritzctl import codegen
+from fritzctl import session
+
+FIXTURES = os.path.join(os.path.dirname(__file__),"fixtures")
+
+URN = "urn:dslforum-org:service:Hosts:1"
+
+class FakeSession(object):
+    def __init__(self,response):
+        self.response = response
+        self.calls = []
+    def executePrepared(self,url,urn,action,body,timeout,kwargs):
+        self.calls.append((url,urn,action,body,timeout,kwargs))
+        return dict(self.response)
+
+class TestCodegen(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join(FIXTURES,"hostsSCPD.xml"),"rb") as f:
+            cls.services = {URN:{"controlURL":"/upnp/control/hosts","actions":codegen.parseSCPD(f.read())}}
+        cls.dir = tempfile.mkdtemp()
+        cls.modules = codegen.generatePackage(cls.services,os.path.join(cls.dir,"fritzgen_test"))
+        sys.path.insert(0,cls.dir)
+        try:
+            cls.pkg = importlib.import_module("fritzgen_test")
+            cls.mod = importlib.import_module("fritzgen_test.general_hosts")
+        finally:
+            sys.path.remove(cls.dir)
+    @classmethod
+    def tearDownClass(cls):
+        for name in ["fritzgen_test","fritzgen_test.general_hosts"]:
+            sys.modules.pop(name,None)
+        shutil.rmtree(cls.dir)
+    def call(self,method,response,*args,**kwargs):
+        s = FakeSession(response)
+        result = getattr(self.mod.API_general_hosts(s),method)(*args,**kwargs)
+        self.assertEqual(len(s.calls),1)
+        return result,s.calls[0]
+    def test_package(self):
+        self.assertEqual(self.modules,["general_hosts"])
+        self.assertEqual(self.pkg.MODULES,{URN:"general_hosts"})
+        self.assertEqual((self.mod.URN,self.mod.CONTROL_URL),(URN,"/upnp/control/hosts"))
+        api = self.mod.API_general_hosts
+        for name in ["GetGenericHostEntry","X_AVM_DE_SetHostNameByMACAddress","X_AVM_DE_SetWakeOnLAN","X_AVM_DE_GetChangeCounter"]:
+            self.assertTrue(callable(getattr(api,name,None)),name)
+    def test_request(self):
+        result,(url,urn,action,body,timeout,kwargs) = self.call("GetGenericHostEntry",{},3,timeout=5)
+        self.assertEqual((url,urn,action,timeout,kwargs),("/upnp/control/hosts",URN,"GetGenericHostEntry",5,{"NewIndex":3}))
+        envelope = session.SOAP_ENVELOPE%{"action":"GetGenericHostEntry","urn":URN,"args":"<NewIndex>3</NewIndex>"}
+        self.assertEqual(body,envelope)
+    def test_encoding(self):
+        _,call = self.call("X_AVM_DE_SetWakeOnLAN",{},"AA:BB:CC:DD:EE:01",True,-5)
+        self.assertIn("<NewMACAddress>AA:BB:CC:DD:EE:01</NewMACAddress><NewEnable>1</NewEnable><NewOffset>-5</NewOffset>",call[3])
+        _,call = self.call("X_AVM_DE_SetWakeOnLAN",{},"AA:BB:CC:DD:EE:01","false","7")
+        self.assertIn("<NewEnable>0</NewEnable><NewOffset>7</NewOffset>",call[3])
+        _,call = self.call("X_AVM_DE_SetHostNameByMACAddress",{},"AA:BB:CC:DD:EE:01","a<b&c")
+        self.assertIn("<NewHostName>a&lt;b&amp;c</NewHostName>",call[3])
+        api = self.mod.API_general_hosts(FakeSession({}))
+        self.assertRaises(ValueError,api.X_AVM_DE_SetWakeOnLAN,"AA:BB:CC:DD:EE:01",True,128)
+        self.assertRaises(ValueError,api.X_AVM_DE_SetWakeOnLAN,"AA:BB:CC:DD:EE:01","maybe",0)
+        self.assertRaises(ValueError,api.GetGenericHostEntry,-1)
+    def test_result(self):
+        result,_ = self.call("GetGenericHostEntry",{"NewIPAddress":"192.168.178.2","NewLeaseTimeRemaining":"-1","NewActive":"1"},0)
+        self.assertIsInstance(result,self.mod.GetGenericHostEntryResult)
+        self.assertEqual(result.asDict(),{"NewIPAddress":"192.168.178.2","NewLeaseTimeRemaining":-1,"NewActive":True})
+        result,_ = self.call("X_AVM_DE_GetChangeCounter",{"NewX_AVM-DE_ChangeCounter":"42","NewX_AVM-DE_LastChange":"2022-03-01T12:30:00"})
+        self.assertEqual(result.NewX_AVM_DE_ChangeCounter,42)
+        self.assertEqual(result.NewX_AVM_DE_LastChange,datetime.datetime(2022,3,1,12,30))
+        result,_ = self.call("X_AVM_DE_SetHostNameByMACAddress",{},"AA:BB:CC:DD:EE:01","nas")
+        self.assertIsNone(result)
+
+if __name__ == "__main__":
+    unittest.main()
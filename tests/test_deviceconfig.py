@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_deviceconfig.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import io
+import unittest
+
+import requests
+
+from fritzctl.ooapi import general_deviceconfig
+
+CONFIG = b"**** FRITZ!Box configuration\n...\n**** END OF EXPORT 12345678 ****\n"
+
+class FakeDeviceConfigAPI(object):
+    def __init__(self,failures):
+        self.failures = list(failures)
+        self.attempts = 0
+    def downloadConfigFile(self,password,dest,timeout=None):
+        self.attempts+=1
+        dest.write(CONFIG[:10])
+        if self.failures:
+            raise self.failures.pop(0)
+        dest.write(CONFIG[10:])
+        return len(CONFIG),"digest"
+
+class FakeSession(object):
+    def __init__(self,api):
+        self.api = api
+    def getOOAPI(self,name):
+        assert name=="general_deviceconfig"
+        return self.api
+
+class Pipe(object):
+    # Write-only file object like a pipe or a socket file
+    def __init__(self):
+        self.data = b""
+    def write(self,data):
+        self.data+=data
+        return len(data)
+
+class TestDownloadConfigFiles(unittest.TestCase):
+    def download(self,dest,failures,retries=2):
+        api = FakeDeviceConfigAPI(failures)
+        job = (FakeSession(api),dest)
+        out = general_deviceconfig.downloadConfigFiles([job],"secret",retries=retries,retrydelay=0)
+        self.assertEqual(len(out),1)
+        self.assertIs(out[0][0],job)
+        return api,out[0][1],out[0][2]
+    def test_retry_seekable(self):
+        f = io.BytesIO()
+        api,result,exc = self.download(f,[requests.ConnectionError("reset"),general_deviceconfig.IncompleteConfigFileError("short")])
+        self.assertIsNone(exc)
+        self.assertEqual(result,(len(CONFIG),"digest"))
+        self.assertEqual(api.attempts,3)
+        self.assertEqual(f.getvalue(),CONFIG)
+    def test_retry_unseekable(self):
+        pipe = Pipe()
+        api,result,exc = self.download(pipe,[requests.ConnectionError("reset")])
+        self.assertIsNone(exc)
+        self.assertEqual(api.attempts,2)
+        self.assertEqual(pipe.data,CONFIG)
+    def test_failed_unseekable(self):
+        pipe = Pipe()
+        api,result,exc = self.download(pipe,[requests.ConnectionError("reset")]*2,retries=1)
+        self.assertIsInstance(exc,requests.ConnectionError)
+        self.assertIsNone(result)
+        self.assertEqual(api.attempts,2)
+        self.assertEqual(pipe.data,b"")
+    def test_no_retry(self):
+        f = io.BytesIO()
+        api,result,exc = self.download(f,[ValueError("Invalid password")])
+        self.assertIsInstance(exc,ValueError)
+        self.assertEqual(api.attempts,1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_deviceinfo.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import datetime
+import unittest
+
+from fritzctl.ooapi import general_deviceinfo
+
+LOG = """19.10.26 12:35:10 WLAN-Gerät angemeldet (5 GHz), 866 Mbit/s, laptop, IP 192.168.178.20.
+19.10.26 12:35:10 Rufnummer 987654 wurde erfolgreich registriert.
+19.10.26 12:34:56 DSL ist verfügbar (DSL-Synchronisierung besteht mit 100000/40000 kbit/s).
+Zusätzliche Informationen zur Synchronisierung.
+31.02.26 00:00:00 Fehlerhafter Zeitstempel.
+19.10.26 12:30:00 Das System wurde neu gestartet."""
+
+class FakeDynAPI(object):
+    def __init__(self):
+        self.log = LOG
+    def GetInfo(self):
+        return {"NewManufacturerName":"AVM","NewManufacturerOUI":"00040E","NewModelName":"FRITZ!Box 7590",
+                "NewDescription":"FRITZ!Box 7590 154.07.29","NewProductClass":"FRITZ!Box","NewSerialNumber":"0004AB123456",
+                "NewSoftwareVersion":"154.07.29","NewHardwareVersion":"FRITZ!Box 7590","NewSpecVersion":"1.0",
+                "NewProvisioningCode":"","NewUpTime":"3600","NewDeviceLog":self.log}
+    def GetDeviceLog(self):
+        return {"NewDeviceLog":self.log}
+
+class FakeSession(object):
+    def __init__(self):
+        self.dynapi = FakeDynAPI()
+    def getAPI(self,name):
+        return self.dynapi
+
+def getAPI():
+    return general_deviceinfo.API_general_deviceinfo(FakeSession(),"urn:dslforum-org:service:DeviceInfo:1")
+
+class TestParseDeviceLog(unittest.TestCase):
+    def test_entries(self):
+        entries = general_deviceinfo.parseDeviceLog(LOG)
+        self.assertEqual(len(entries),4)
+        self.assertEqual(entries[0].timestamp,datetime.datetime(2026,10,19,12,30))
+        self.assertEqual(entries[0].category,"system")
+        self.assertEqual(entries[2].category,"telephony")
+        self.assertEqual(entries[3].category,"wlan")
+        self.assertEqual(list(entries[3])[:2],[datetime.datetime(2026,10,19,12,35,10),"wlan"])
+    def test_continuation(self):
+        entry = general_deviceinfo.parseDeviceLog(LOG)[1]
+        self.assertEqual(entry.category,"internet")
+        self.assertEqual(entry.message.split("\n")[1:],["Zusätzliche Informationen zur Synchronisierung.",
+                                                        "31.02.26 00:00:00 Fehlerhafter Zeitstempel."])
+    def test_leading_garbage(self):
+        entries = general_deviceinfo.parseDeviceLog("99.99.99 99:99:99 Kaputt\n"+LOG)
+        self.assertEqual(len(entries),4)
+        self.assertEqual(general_deviceinfo.parseDeviceLog(""),[])
+
+class TestDeviceLogTail(unittest.TestCase):
+    def test_poll(self):
+        api = getAPI()
+        tail = api.getLogTail()
+        self.assertEqual(len(tail.poll()),4)
+        self.assertEqual(tail.poll(),[])
+        api.dynapi.log = "19.10.26 12:35:10 Neuer Eintrag mit gleicher Zeit.\n"+LOG
+        self.assertEqual([e.message for e in tail.poll()],["Neuer Eintrag mit gleicher Zeit."])
+        api.dynapi.log = "19.10.26 12:40:00 Später.\n"+api.dynapi.log
+        self.assertEqual([e.message for e in tail.poll()],["Später."])
+        resumed = api.getLogTail(tail.hwm)
+        self.assertEqual(resumed.poll(),[])
+
+class TestDeviceInfo(unittest.TestCase):
+    def test_log(self):
+        info = getAPI().getDeviceInfo()
+        self.assertTrue(info.log)
+        self.assertEqual(info.devicelog,LOG)
+        self.assertEqual(info.uptime,3600)
+        self.assertEqual(info.info,FakeDynAPI().GetInfo())
+    def test_without_log(self):
+        info = getAPI().getDeviceInfo(log=False)
+        self.assertIsNone(info.devicelog)
+        self.assertNotIn("NewDeviceLog",info.info)
+        self.assertFalse(any(k.startswith("_") for k in info.info))
+        info.reloadData()
+        self.assertIsNone(info.devicelog)
+        self.assertNotIn("NewDeviceLog",info.info)
+        self.assertEqual(info.modelname,"FRITZ!Box 7590")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_discovery.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import time
+import unittest
+
+from fritzctl import discovery
+
+LOCATION = "http://127.0.0.1:49000/tr64desc.xml"
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.responder = discovery.SSDPResponder(LOCATION,maxage=60)
+        self.responder.start()
+    def tearDown(self):
+        self.responder.stop()
+    def test_search(self):
+        devices = discovery.search(timeout=0.5,addr=self.responder.addr)
+        self.assertEqual(len(devices),1)
+        d = devices[0]
+        self.assertEqual(d.location,LOCATION)
+        self.assertEqual((d.host,d.port),("127.0.0.1",49000))
+        self.assertEqual(d.st,discovery.TR64_ST)
+        self.assertEqual(d.maxage,60)
+        # Both retransmissions are answered, the location is only reported once
+        self.assertEqual(self.responder.requests,2)
+    def test_search_st(self):
+        self.assertEqual(discovery.search("urn:example:device:Other:1",timeout=0.3,addr=self.responder.addr),[])
+        self.assertEqual(self.responder.requests,0)
+        self.assertEqual(len(discovery.search("ssdp:all",timeout=0.3,addr=self.responder.addr)),1)
+    def test_cache(self):
+        cache = discovery.DiscoveryCache(ttl=300)
+        devices = cache.discover(timeout=0.3,addr=self.responder.addr)
+        self.assertEqual([d.location for d in devices],[LOCATION])
+        requests = self.responder.requests
+        # The max-age of the response caps the time the results are cached
+        expires = cache._cache[(discovery.TR64_ST,tuple(self.responder.addr))][0]
+        self.assertLessEqual(expires-time.monotonic(),60)
+        self.assertGreater(expires-time.monotonic(),50)
+        self.assertEqual(cache.discover(timeout=0.3,addr=self.responder.addr),devices)
+        self.assertEqual(self.responder.requests,requests)
+        cache.discover(timeout=0.3,addr=self.responder.addr,refresh=True)
+        self.assertGreater(self.responder.requests,requests)
+    def test_parseResponse(self):
+        self.assertIsNone(discovery.parseResponse(b"M-SEARCH * HTTP/1.1\r\nST: ssdp:all\r\n\r\n"))
+        self.assertIsNone(discovery.parseResponse(b"HTTP/1.1 200 OK\r\nST: ssdp:all\r\n\r\n"))
+        headers = discovery.parseResponse(b"HTTP/1.1 200 OK\r\nLocation: http://[fe80::1]/desc.xml\r\nCache-Control: no-cache\r\n\r\n")
+        d = discovery.DiscoveredDevice(headers)
+        self.assertEqual((d.host,d.port,d.maxage),("fe80::1",80,0))
+
+if __name__ == "__main__":
+    unittest.main()
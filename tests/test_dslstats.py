@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_dslstats.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fritzctl.ooapi import net_wan_dslinterfacecfg as dsl
+
+class FakeDynAPI(object):
+    def __init__(self):
+        self.info = {"NewUpstreamCurrRate":"40000","NewDownstreamCurrRate":"100000","NewUpstreamNoiseMargin":"60"}
+        self.stats = {"NewCRCErrors":"0","NewFECErrors":""}
+    def GetInfo(self):
+        return dict(self.info)
+    def GetStatisticsTotal(self):
+        return dict(self.stats)
+
+class FakeAPI(object):
+    def __init__(self):
+        self.dynapi = FakeDynAPI()
+
+class TestDSLStatsCollector(unittest.TestCase):
+    def test_unknown_field(self):
+        self.assertRaises(ValueError,dsl.DSLStatsCollector,FakeAPI(),["rate_up","unknown"])
+    def test_sample(self):
+        api = FakeAPI()
+        c = dsl.DSLStatsCollector(api,["rate_up","snr_up","crc_errors","fec_errors"])
+        self.assertEqual(c.sample(1000),{"rate_up":40000,"snr_up":60,"crc_errors":0,"fec_errors":0})
+        api.dynapi.info["NewUpstreamNoiseMargin"] = "55"
+        self.assertEqual(c.sample(1060),{"snr_up":55})
+        self.assertEqual(c.sample(1120),{})
+        self.assertEqual(c.count,3)
+        self.assertEqual(c.getValues("time"),[1000,1060,1120])
+        self.assertEqual(c.getValues("snr_up"),[60,55,55])
+    def test_values(self):
+        c = dsl.DSLStatsCollector(None,["snr_up","crc_errors"])
+        values = [(-2**62,0),(2**62,5),(0,5),(-1,2**40),(63,2**40),(-64,2**40+1)]
+        for i,(snr,crc) in enumerate(values):
+            c.add({"time":i*60,"snr_up":snr,"crc_errors":crc})
+        self.assertEqual(c.getValues("snr_up"),[v[0] for v in values])
+        self.assertEqual(c.getValues("crc_errors"),[v[1] for v in values])
+    def test_compact(self):
+        c = dsl.DSLStatsCollector(None,["crc_errors"])
+        for i in range(1000):
+            c.add({"time":1577836800+i*60,"crc_errors":1000+i//100})
+        self.assertLess(len(c._deltas["crc_errors"]),1010)
+        self.assertLess(len(c._deltas["time"]),1010)
+
+class TestDSLStatsFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir,"dsl.stats")
+        self.collector = dsl.DSLStatsCollector(None,["rate_up","crc_errors"])
+        # More than two blocks
+        for i in range(3500):
+            self.collector.add({"time":1000+i*60,"rate_up":40000-(i%7),"crc_errors":i//10})
+        self.collector.export(self.fname)
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    def test_header(self):
+        f = dsl.DSLStatsFile(self.fname)
+        self.assertEqual(f.columns,["time","rate_up","crc_errors"])
+        self.assertEqual(f.count,3500)
+        self.assertEqual(len(f._blocks),3)
+    def test_query_all(self):
+        data = dsl.DSLStatsFile(self.fname).query()
+        for field in ("time","rate_up","crc_errors"):
+            self.assertEqual(data[field],self.collector.getValues(field))
+    def test_query_range(self):
+        times = self.collector.getValues("time")
+        start,end = times[1400],times[2900]
+        data = dsl.DSLStatsFile(self.fname).query(start,end,["crc_errors"])
+        self.assertEqual(sorted(data.keys()),["crc_errors","time"])
+        self.assertEqual(data["time"],times[1400:2901])
+        self.assertEqual(data["crc_errors"],self.collector.getValues("crc_errors")[1400:2901])
+    def test_query_between_samples(self):
+        data = dsl.DSLStatsFile(self.fname).query(1001,1059)
+        self.assertEqual(data["time"],[])
+        data = dsl.DSLStatsFile(self.fname).query(1030,1090)
+        self.assertEqual(data["time"],[1060])
+    def test_invalid_file(self):
+        fname = os.path.join(self.tmpdir,"other")
+        with open(fname,"wb") as f:
+            f.write(b"not a statistics file")
+        self.assertRaises(ValueError,dsl.DSLStatsFile,fname)
+
+if __name__ == "__main__":
+    unittest.main()
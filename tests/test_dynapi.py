@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_dynapi.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import datetime
+import os
+import unittest
+
+from fritzctl import codegen
+from fritzctl import dynapi
+from fritzctl.session import Session
+
+FIXTURES = os.path.join(os.path.dirname(__file__),"fixtures")
+
+URN = "urn:dslforum-org:service:Hosts:1"
+
+def loadSCPD():
+    with open(os.path.join(FIXTURES,"hostsSCPD.xml"),"rb") as f:
+        return codegen.parseSCPD(f.read())
+
+class FakeDevice(object):
+    def __init__(self,scpd):
+        self.deviceSCPD = scpd
+
+class TestActionCodec(unittest.TestCase):
+    def setUp(self):
+        self.scpd = loadSCPD()
+    def getCodec(self,action):
+        return dynapi.ActionCodec(action,self.scpd[action])
+    def test_types(self):
+        codec = self.getCodec("X_AVM-DE_SetWakeOnLAN")
+        self.assertEqual(codec.intypes,{"NewMACAddress":"string","NewEnable":"boolean","NewOffset":"i1"})
+        self.assertEqual(codec.outtypes,{})
+    def test_encode(self):
+        codec = self.getCodec("X_AVM-DE_SetWakeOnLAN")
+        self.assertEqual(codec.encode({"NewMACAddress":"AA:BB:CC:DD:EE:FF","NewEnable":True,"NewOffset":-5}),
+                         {"NewMACAddress":"AA:BB:CC:DD:EE:FF","NewEnable":"1","NewOffset":"-5"})
+        for v in ("0","false","No",False,0):
+            self.assertEqual(codec.encode({"NewEnable":v}),{"NewEnable":"0"})
+        self.assertEqual(codec.encode({"NewOffset":"127"}),{"NewOffset":"127"})
+    def test_encode_invalid(self):
+        codec = self.getCodec("X_AVM-DE_SetWakeOnLAN")
+        self.assertRaises(ValueError,codec.encode,{"NewEnable":"maybe"})
+        self.assertRaises(ValueError,codec.encode,{"NewEnable":2})
+        self.assertRaises(ValueError,codec.encode,{"NewOffset":128})
+        self.assertRaises(ValueError,codec.encode,{"NewOffset":"abc"})
+        self.assertRaises(ValueError,codec.encode,{"NewUnknown":"1"})
+        self.assertRaises(ValueError,self.getCodec("GetGenericHostEntry").encode,{"NewIndex":-1})
+    def test_decode(self):
+        codec = self.getCodec("GetGenericHostEntry")
+        data = codec.decode({"NewIPAddress":"192.168.178.20","NewLeaseTimeRemaining":"-1","NewActive":"1"})
+        self.assertEqual(data,{"NewIPAddress":"192.168.178.20","NewLeaseTimeRemaining":-1,"NewActive":True})
+        codec = self.getCodec("X_AVM-DE_GetChangeCounter")
+        data = codec.decode({"NewX_AVM-DE_ChangeCounter":"42","NewX_AVM-DE_LastChange":"2020-01-01T12:00:00"})
+        self.assertEqual(data["NewX_AVM-DE_ChangeCounter"],42)
+        self.assertEqual(data["NewX_AVM-DE_LastChange"],datetime.datetime(2020,1,1,12))
+    def test_decode_invalid(self):
+        codec = self.getCodec("GetGenericHostEntry")
+        data = codec.decode({"NewLeaseTimeRemaining":"n/a","NewActive":None})
+        self.assertEqual(data,{"NewLeaseTimeRemaining":"n/a","NewActive":None})
+    def test_session_cache(self):
+        session = Session.__new__(Session)
+        session.device = FakeDevice({URN:self.scpd})
+        session.codecs = {}
+        codec = session.getCodec(URN,"GetGenericHostEntry")
+        self.assertIsInstance(codec,dynapi.ActionCodec)
+        self.assertIs(session.getCodec(URN,"GetGenericHostEntry"),codec)
+        self.assertIsNone(session.getCodec(URN,"GetUnknown"))
+        self.assertIsNone(session.getCodec("urn:dslforum-org:service:Unknown:1","GetInfo"))
+
+if __name__ == "__main__":
+    unittest.main()
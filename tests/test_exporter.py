@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_exporter.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import unittest
+
+from fritzctl import exporter
+from fritzctl.session import NAME_TO_URN
+
+BANDS = ["2.4ghz","2nd","3rd"]
+
+class FakeWLAN(object):
+    def __init__(self,band):
+        self.band = band
+    def GetInfo(self):
+        return {"NewSSID":"ssid-"+self.band,"NewChannel":"1","NewStatus":"Up","NewEnable":"1"}
+    def GetTotalAssociations(self):
+        return {"NewTotalAssociations":str(len(self.band))}
+
+class FakeSession(object):
+    def __init__(self,apis):
+        self.urns = [NAME_TO_URN[name] for name in apis]
+    def getAPI(self,name):
+        return FakeWLAN(name[len("net_wlan_"):])
+
+class TestScrapePlan(unittest.TestCase):
+    def test_cover_cheapest(self):
+        plan = exporter.ScrapePlan(FakeSession(["net_wan_commoninterfacecfg"]))
+        self.assertEqual(plan.sources,["addoninfo","linkproperties"])
+        self.assertEqual(plan.assignment["fritz_wan_bytes_sent_total"],"addoninfo")
+        self.assertEqual(plan.cost,2)
+        self.assertIn("fritz_dsl_sync_rate_kbits",[m.name for m in plan.unavailable])
+    def test_alternative_source(self):
+        metrics = [m for m in exporter.METRICS if m.name=="fritz_wan_bytes_sent_total"]
+        sources = dict(exporter.SOURCES)
+        del sources["addoninfo"]
+        plan = exporter.ScrapePlan(FakeSession(["net_wan_commoninterfacecfg"]),metrics,sources)
+        self.assertEqual(plan.sources,["bytessent"])
+    def test_all_wlan_bands(self):
+        plan = exporter.ScrapePlan(FakeSession(["net_wlan_"+band for band in BANDS]))
+        for band in BANDS:
+            self.assertIn("wlan_"+band,plan.sources)
+            self.assertIn("wlanassoc_"+band,plan.sources)
+            self.assertEqual(plan.assignment["fritz_wlan_info:"+band],"wlan_"+band)
+        self.assertEqual(plan.cost,6)
+    def test_available_wlan_bands(self):
+        plan = exporter.ScrapePlan(FakeSession(["net_wlan_2.4ghz","net_wlan_2nd"]))
+        self.assertEqual(sorted(plan.sources),["wlan_2.4ghz","wlan_2nd","wlanassoc_2.4ghz","wlanassoc_2nd"])
+        self.assertIn("fritz_wlan_info:3rd",[m.key for m in plan.unavailable])
+
+class TestExporter(unittest.TestCase):
+    def test_wlan_family(self):
+        e = exporter.Exporter(FakeSession(["net_wlan_"+band for band in BANDS]))
+        collected = dict((m.name,samples) for m,samples in e.collect())
+        self.assertEqual(sorted(labels["band"] for labels,value in collected["fritz_wlan_associations"]),sorted(BANDS))
+        text = e.getText()
+        self.assertEqual(text.count("# TYPE fritz_wlan_info gauge"),1)
+        self.assertIn('fritz_wlan_associations{band="3rd"} 3',text)
+        self.assertIn('fritz_wlan_info{band="2nd",channel="1",ssid="ssid-2nd",status="Up"} 1',text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_ontel.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import gc
+import io
+import os
+import unittest
+
+from fritzctl.ooapi import avm_ontel
+
+FIXTURES = os.path.join(os.path.dirname(__file__),"fixtures")
+
+class Raw(io.BytesIO):
+    pass
+
+class FakeResponse(object):
+    def __init__(self,data):
+        self.raw = Raw(data)
+        self.closed = False
+    def close(self):
+        self.closed = True
+
+class FakeSession(object):
+    def __init__(self):
+        self.responses = []
+        self.urls = []
+    def getAPI(self,name):
+        return self
+    def GetCallList(self):
+        return {"NewCallListURL":"http://192.168.178.1:49000/calllist.lua?sid=0123456789abcdef"}
+    def getURL(self,url,stream=False):
+        self.urls.append(url)
+        with open(os.path.join(FIXTURES,"calllist.xml"),"rb") as f:
+            r = FakeResponse(f.read())
+        self.responses.append(r)
+        return r
+
+class TestCallList(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.api = avm_ontel.API_avm_ontel(self.session,"urn:dslforum-org:service:X_AVM-DE_OnTel:1")
+    def test_exhausted(self):
+        it = self.api.iterCallList()
+        calls = list(it)
+        self.assertEqual([c.id for c in calls],[3,2,1])
+        self.assertEqual(it.header["timestamp"],"1577836800")
+        self.assertTrue(self.session.responses[0].closed)
+    def test_getcalllist(self):
+        self.assertEqual(len(self.api.getCallList(max=10)),3)
+        self.assertTrue(self.session.urls[0].endswith("&max=10"))
+        self.assertTrue(self.session.responses[0].closed)
+    def test_context_manager(self):
+        with self.api.iterCallList() as calls:
+            for call in calls:
+                break
+        self.assertTrue(self.session.responses[0].closed)
+    def test_garbage_collected(self):
+        it = self.api.iterCallList()
+        next(it)
+        del it
+        gc.collect()
+        self.assertTrue(self.session.responses[0].closed)
+    def test_cursor(self):
+        cursor = self.api.getCallListCursor()
+        self.assertEqual([c.id for c in cursor.sync()],[3,2,1])
+        self.assertEqual((cursor.id,cursor.timestamp),(3,"1577836800"))
+        self.assertEqual(list(cursor.sync()),[])
+        self.assertIn("&id=3&timestamp=1577836800",self.session.urls[1])
+        self.assertTrue(all(r.closed for r in self.session.responses))
+    def test_cursor_aborted(self):
+        cursor = self.api.getCallListCursor()
+        sync = cursor.sync()
+        next(sync)
+        sync.close()
+        self.assertTrue(self.session.responses[0].closed)
+        self.assertIsNone(cursor.id)
+
+if __name__ == "__main__":
+    unittest.main()
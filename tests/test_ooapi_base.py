@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_ooapi_base.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import io
+import os
+import unittest
+
+from fritzctl.ooapi import base
+
+FIXTURES = os.path.join(os.path.dirname(__file__),"fixtures")
+
+class TestIterXMLItems(unittest.TestCase):
+    def getItems(self):
+        with open(os.path.join(FIXTURES,"calllist.xml"),"rb") as f:
+            it = base.iterXMLItems(f,"Call")
+            return it,[base.itemToDict(elem) for elem in it]
+    def test_items(self):
+        it,items = self.getItems()
+        self.assertEqual([item["Id"] for item in items],["3","2","1"])
+        self.assertEqual(items[0]["Name"],"Alice")
+        self.assertEqual(items[2]["Duration"],"1:23")
+    def test_empty_text(self):
+        it,items = self.getItems()
+        self.assertEqual(items[1]["Name"],"")
+    def test_header(self):
+        it,items = self.getItems()
+        self.assertEqual(it.header,{"timestamp":"1577836800"})
+    def test_elements_released(self):
+        f = io.BytesIO(b"<root><Call><Id>1</Id></Call><Call><Id>2</Id></Call></root>")
+        for elem in base.iterXMLItems(f,"Call"):
+            self.assertEqual(len(elem),1)
+            base.itemToDict(elem)
+        self.assertEqual(len(elem),0)
+    def test_nested(self):
+        f = io.BytesIO(b"<root><Item><Id>1</Id><Item><Id>2</Id></Item></Item></root>")
+        items = list(base.iterXMLItems(f,"Item"))
+        self.assertEqual(len(items),1)
+
+class FakeTable(object):
+    def __init__(self,entries):
+        self.entries = list(entries)
+        self.counter = 0
+        self.calls = []
+        self.fail = set()
+    def fetch(self,index):
+        self.calls.append(index)
+        if index in self.fail:
+            self.fail.discard(index)
+            raise IOError("connection reset")
+        if index>=len(self.entries):
+            raise ValueError("Invalid index")
+        return self.entries[index]
+    def length(self):
+        return len(self.entries)
+    def version(self):
+        return self.counter
+
+class TestEnumerationCursor(unittest.TestCase):
+    def test_run(self):
+        table = FakeTable("abcde")
+        cursor = base.EnumerationCursor(table.fetch,table.length)
+        self.assertEqual(cursor.run(),list("abcde"))
+        self.assertTrue(cursor.done)
+        self.assertEqual(table.calls,[0,1,2,3,4])
+    def test_without_length(self):
+        table = FakeTable("abc")
+        cursor = base.EnumerationCursor(table.fetch)
+        self.assertEqual(cursor.run(),list("abc"))
+        self.assertEqual(table.calls,[0,1,2,3])
+    def test_length_out_of_range(self):
+        table = FakeTable("abc")
+        cursor = base.EnumerationCursor(table.fetch,lambda:5)
+        self.assertRaises(ValueError,cursor.run)
+    def test_limit(self):
+        table = FakeTable("abcde")
+        cursor = base.EnumerationCursor(table.fetch,table.length,limit=2)
+        self.assertEqual(cursor.run(),list("ab"))
+        self.assertEqual(table.calls,[0,1])
+    def test_step(self):
+        table = FakeTable("abcde")
+        cursor = base.EnumerationCursor(table.fetch,table.length)
+        self.assertEqual(cursor.step(2),list("ab"))
+        self.assertEqual(cursor.index,2)
+        self.assertFalse(cursor.done)
+        self.assertEqual(cursor.step(3),list("cde"))
+        self.assertTrue(cursor.done)
+        self.assertEqual(cursor.step(),[])
+    def test_resume_after_error(self):
+        table = FakeTable("abcde")
+        table.fail.add(2)
+        cursor = base.EnumerationCursor(table.fetch,table.length)
+        self.assertRaises(IOError,cursor.step,5)
+        self.assertEqual(cursor.items,list("ab"))
+        self.assertEqual(cursor.index,2)
+        self.assertEqual(cursor.run(),list("abcde"))
+        self.assertEqual(table.calls,[0,1,2,2,3,4])
+    def test_restart_on_change(self):
+        table = FakeTable("abcde")
+        cursor = base.EnumerationCursor(table.fetch,table.length,table.version)
+        cursor.step(2)
+        table.entries[0] = "x"
+        table.counter+=1
+        self.assertEqual(cursor.run(),list("xbcde"))
+        self.assertEqual(cursor.restarts,1)
+    def test_reset(self):
+        table = FakeTable("abc")
+        cursor = base.EnumerationCursor(table.fetch,table.length)
+        cursor.run()
+        cursor.reset()
+        self.assertFalse(cursor.done)
+        self.assertEqual(cursor.items,[])
+        self.assertEqual(cursor.run(),list("abc"))
+
+if __name__ == "__main__":
+    unittest.main()
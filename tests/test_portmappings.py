@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_portmappings.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import threading
+import unittest
+
+from fritzctl.ooapi import net_wan_ipconnection
+
+URN = "urn:dslforum-org:service:WANIPConnection:1"
+
+class FakeDynAPI(object):
+    """
+    Port mapping table behaving like the server, adding over an existing port mapping of another client fails with error 718.
+    """
+    def __init__(self):
+        self.entries = []
+        self.calls = []
+        self.fail = set()
+        self._lock = threading.Lock()
+    def _find(self,host,port,proto):
+        for i,e in enumerate(self.entries):
+            if (e["NewRemoteHost"],int(e["NewExternalPort"]),e["NewProtocol"])==(host,int(port),proto):
+                return i
+        return None
+    def GetPortMappingNumberOfEntries(self):
+        return {"NewPortMappingNumberOfEntries":str(len(self.entries))}
+    def GetGenericPortMappingEntry(self,NewPortMappingIndex):
+        if NewPortMappingIndex>=len(self.entries):
+            raise ValueError("SpecifiedArrayIndexInvalid")
+        return dict(self.entries[NewPortMappingIndex])
+    def AddPortMapping(self,**kwargs):
+        with self._lock:
+            self.calls.append(("add",kwargs["NewExternalPort"],kwargs["NewInternalClient"]))
+            if kwargs["NewExternalPort"] in self.fail:
+                raise ValueError("Error 501: ActionFailed")
+            entry = {k:str(v) for k,v in kwargs.items()}
+            i = self._find(kwargs["NewRemoteHost"],kwargs["NewExternalPort"],kwargs["NewProtocol"])
+            if i is None:
+                self.entries.append(entry)
+            elif self.entries[i]["NewInternalClient"]!=entry["NewInternalClient"]:
+                raise ValueError("Error 718: ConflictInMappingEntry")
+            else:
+                self.entries[i] = entry
+    def DeletePortMapping(self,NewRemoteHost,NewExternalPort,NewProtocol):
+        with self._lock:
+            self.calls.append(("delete",NewExternalPort))
+            if NewExternalPort in self.fail:
+                raise ValueError("Error 501: ActionFailed")
+            i = self._find(NewRemoteHost,NewExternalPort,NewProtocol)
+            if i is None:
+                raise ValueError("Error 714: NoSuchEntryInArray")
+            del self.entries[i]
+
+class FakeSession(object):
+    def __init__(self):
+        self.dynapi = FakeDynAPI()
+    def getAPI(self,name):
+        return self.dynapi
+
+class TestPortMappingTable(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.api = net_wan_ipconnection.API_net_wan_ipconnection(self.session,URN)
+        for port,client in [(80,"192.168.178.10"),(443,"192.168.178.10"),(22,"192.168.178.20")]:
+            self.api.addPortMapping(self.api.newPortMapping(port,"TCP",port,client,"web"))
+        self.session.dynapi.calls = []
+        self.table = self.api.getPortMappingTable(maxworkers=2)
+    def getDesired(self):
+        return [self.api.newPortMapping(80,"TCP",80,"192.168.178.10","web"),
+                self.api.newPortMapping(443,"TCP",443,"192.168.178.10","web"),
+                self.api.newPortMapping(22,"TCP",22,"192.168.178.20","web")]
+    def test_snapshot(self):
+        self.assertEqual(len(self.table),3)
+        self.assertEqual(self.table.get(22,"TCP").client,"192.168.178.20")
+        self.assertEqual([m.extport for m in self.table.getByClient("192.168.178.10")],[80,443])
+    def test_unchanged(self):
+        self.assertEqual(self.table.diff(self.getDesired()),([],[]))
+        self.assertEqual(self.table.reconcile(self.getDesired()),[])
+        self.assertEqual(self.session.dynapi.calls,[])
+    def test_lease_ignored(self):
+        desired = self.getDesired()
+        desired[0].leaseduration = 3600
+        self.assertEqual(self.table.diff(desired),([],[]))
+    def test_added_removed(self):
+        desired = self.getDesired()[1:]+[self.api.newPortMapping(8080,"TCP",80,"192.168.178.30")]
+        add,remove = self.table.diff(desired)
+        self.assertEqual([m.extport for m in add],[8080])
+        self.assertEqual([m.extport for m in remove],[80])
+        self.assertEqual(self.table.diff(desired,delete=False),(add,[]))
+        self.assertEqual(self.table.apply(add,remove),[])
+        self.assertEqual(sorted(self.session.dynapi.calls),[("add",8080,"192.168.178.30"),("delete",80)])
+        self.assertEqual(sorted(m.extport for m in self.table),[22,443,8080])
+    def test_duplicate(self):
+        desired = self.getDesired()+[self.api.newPortMapping(22,"TCP",2222,"192.168.178.40")]
+        self.assertRaises(ValueError,self.table.diff,desired)
+    def test_changed_client(self):
+        desired = self.getDesired()
+        desired[2] = self.api.newPortMapping(22,"TCP",22,"192.168.178.40","ssh")
+        add,remove = self.table.diff(desired)
+        self.assertEqual(add,[desired[2]])
+        self.assertEqual([(m.extport,m.client) for m in remove],[(22,"192.168.178.20")])
+        self.assertEqual(self.table.apply(add,remove),[])
+        self.assertEqual(self.session.dynapi.calls,[("delete",22),("add",22,"192.168.178.40")])
+        self.assertEqual(self.table.get(22,"TCP").client,"192.168.178.40")
+        self.assertEqual(self.table.getByClient("192.168.178.20"),[])
+        self.assertEqual(self.api.getPortMappingTable().get(22,"TCP").client,"192.168.178.40")
+    def test_failures(self):
+        desired = self.getDesired()[1:]+[self.api.newPortMapping(8080,"TCP",80,"192.168.178.30"),
+                                         self.api.newPortMapping(8443,"TCP",443,"192.168.178.30")]
+        desired[1] = self.api.newPortMapping(22,"TCP",22,"192.168.178.40")
+        self.session.dynapi.fail.update([80,8443,22])
+        failed = self.table.reconcile(desired)
+        self.assertEqual(sorted((m.extport,type(e)) for m,e in failed),[(22,ValueError),(80,ValueError),(8443,ValueError)])
+        # The addition is skipped if the old port mapping could not be deleted
+        self.assertNotIn(("add",22,"192.168.178.40"),self.session.dynapi.calls)
+        self.assertEqual(sorted(m.extport for m in self.table),[22,80,443,8080])
+        self.assertEqual(self.table.get(22,"TCP").client,"192.168.178.20")
+
+if __name__ == "__main__":
+    unittest.main()
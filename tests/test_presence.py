@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_presence.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import unittest
+
+from fritzctl.ooapi import general_hosts
+
+URN = "urn:dslforum-org:service:Hosts:1"
+WLAN = "urn:dslforum-org:service:WLANConfiguration:1"
+
+class FakeHost(object):
+    def __init__(self,mac,ip,active=True):
+        self.mac = mac
+        self.ip = ip
+        self.active = active
+
+class FakeWLAN(object):
+    def __init__(self):
+        self.associations = 0
+    def GetTotalAssociations(self):
+        return {"NewTotalAssociations":str(self.associations)}
+
+class FakeSession(object):
+    def __init__(self,actions):
+        self.actions = actions
+        self.wlan = FakeWLAN()
+        self.urns = [URN,WLAN]
+    def hasAction(self,urn,action,strict=False):
+        return action in self.actions
+    def getAPI(self,urn):
+        return self.wlan
+
+class FakeHostsAPI(object):
+    urn = URN
+    def __init__(self,actions=("X_AVM-DE_GetChangeCounter","X_AVM-DE_GetHostListPath")):
+        self.session = FakeSession(actions)
+        self.hosts = []
+        self.counter = 1
+        self.calls = []
+    def getChangeCounter(self):
+        self.calls.append("counter")
+        return self.counter
+    def getHostTable(self):
+        self.calls.append("table")
+        table = general_hosts.HostTable.__new__(general_hosts.HostTable)
+        table.hosts = list(self.hosts)
+        return table
+    def getHostList(self,ext=True):
+        self.calls.append("walk")
+        return list(self.hosts)
+
+class TestPresenceWatcher(unittest.TestCase):
+    def getWatcher(self,api,**kwargs):
+        kwargs.setdefault("mininterval",0)
+        kwargs.setdefault("wlan",False)
+        return general_hosts.PresenceWatcher(api,**kwargs)
+    def test_first_poll(self):
+        api = FakeHostsAPI()
+        api.hosts = [FakeHost("aa:bb:cc:dd:ee:01","192.168.178.2"),FakeHost("aa:bb:cc:dd:ee:02","",False)]
+        w = self.getWatcher(api)
+        self.assertEqual(w.poll(),[])
+        self.assertEqual(w.hosts,{"AA:BB:CC:DD:EE:01":"192.168.178.2"})
+        self.assertEqual(w.snapshots,1)
+    def test_events(self):
+        api = FakeHostsAPI()
+        api.hosts = [FakeHost("AA:BB:CC:DD:EE:01","192.168.178.2"),FakeHost("AA:BB:CC:DD:EE:02","192.168.178.3")]
+        w = self.getWatcher(api)
+        received = []
+        def broken(event):
+            raise RuntimeError("ignored")
+        w.addCallback(broken)
+        w.addCallback(received.append)
+        w.poll()
+        api.hosts = [FakeHost("AA:BB:CC:DD:EE:01","192.168.178.9"),FakeHost("AA:BB:CC:DD:EE:02","192.168.178.3",False),
+                     FakeHost("AA:BB:CC:DD:EE:03","192.168.178.4")]
+        api.counter = 2
+        events = w.poll()
+        self.assertEqual(received,events)
+        byType = {e.type:e for e in events}
+        self.assertEqual(sorted(byType),["ipchange","join","leave"])
+        self.assertEqual((byType["ipchange"].ip,byType["ipchange"].oldip),("192.168.178.9","192.168.178.2"))
+        self.assertEqual(byType["join"].mac,"AA:BB:CC:DD:EE:03")
+        self.assertIs(byType["join"].host,api.hosts[2])
+        self.assertEqual((byType["leave"].mac,byType["leave"].ip),("AA:BB:CC:DD:EE:02","192.168.178.3"))
+        self.assertIs(byType["leave"].host,api.hosts[1])
+        # A host removed from the list entirely leaves without host information
+        api.hosts = api.hosts[:1]
+        api.counter = 3
+        events = w.poll()
+        self.assertEqual([(e.type,e.mac,e.host) for e in events],[("leave","AA:BB:CC:DD:EE:03",None)])
+    def test_unchanged_signature(self):
+        api = FakeHostsAPI()
+        w = self.getWatcher(api)
+        w.poll()
+        w.poll()
+        w.poll()
+        self.assertEqual(api.calls,["counter","table","counter","counter"])
+        self.assertEqual(w.snapshots,1)
+    def test_mininterval(self):
+        api = FakeHostsAPI()
+        w = self.getWatcher(api,mininterval=60)
+        w.poll()
+        api.hosts = [FakeHost("AA:BB:CC:DD:EE:01","192.168.178.2")]
+        api.counter = 2
+        self.assertEqual(w.poll(),[])
+        self.assertEqual(w.snapshots,1)
+        # The change stays pending until the interval has passed
+        w._lastsnapshot-=60
+        self.assertEqual([e.type for e in w.poll()],["join"])
+        self.assertEqual(w.snapshots,2)
+    def test_fullinterval(self):
+        api = FakeHostsAPI()
+        w = self.getWatcher(api,fullinterval=300)
+        w.poll()
+        w._lastsnapshot-=299
+        w.poll()
+        self.assertEqual(w.snapshots,1)
+        w._lastsnapshot-=1
+        w.poll()
+        self.assertEqual(w.snapshots,2)
+    def test_wlan(self):
+        api = FakeHostsAPI(("X_AVM-DE_GetChangeCounter","X_AVM-DE_GetHostListPath","GetTotalAssociations"))
+        w = self.getWatcher(api,wlan=True)
+        w.poll()
+        api.session.wlan.associations = 1
+        w.poll()
+        self.assertEqual(w.snapshots,2)
+    def test_walk(self):
+        api = FakeHostsAPI(("X_AVM-DE_GetChangeCounter",))
+        w = self.getWatcher(api,mininterval=5,walkinterval=60)
+        w.poll()
+        api.counter = 2
+        w._lastsnapshot-=30
+        w.poll()
+        self.assertEqual(api.calls.count("walk"),1)
+        w._lastsnapshot-=30
+        w.poll()
+        self.assertEqual(api.calls.count("walk"),2)
+        self.assertNotIn("table",api.calls)
+    def test_walk_without_counter(self):
+        api = FakeHostsAPI(())
+        w = self.getWatcher(api,mininterval=5,walkinterval=60)
+        for i in range(10):
+            w.poll()
+        self.assertEqual(api.calls,["walk"])
+        # Without the change counter, every change is only seen by the next walk
+        api.hosts = [FakeHost("AA:BB:CC:DD:EE:01","192.168.178.2")]
+        w._lastsnapshot-=60
+        self.assertEqual([e.type for e in w.poll()],["join"])
+        self.assertEqual(api.calls,["walk","walk"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_resilience.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import socket
+import threading
+import time
+import unittest
+
+import requests
+
+from fritzctl import resilience
+from fritzctl.session import Session
+
+def runThreads(func,n):
+    results = [None]*n
+    errors = [None]*n
+    def run(i):
+        try:
+            results[i] = func()
+        except BaseException as e:
+            errors[i] = e
+    threads = [threading.Thread(target=run,args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results,errors
+
+def getRefusedError():
+    s = socket.socket()
+    s.bind(("127.0.0.1",0))
+    port = s.getsockname()[1]
+    s.close()
+    try:
+        requests.get("http://127.0.0.1:%d/"%port,timeout=2)
+    except requests.exceptions.ConnectionError as e:
+        return e
+    raise AssertionError("Connection to closed port succeeded")
+
+class FailingCall(object):
+    def __init__(self,errors,result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+    def __call__(self):
+        self.calls+=1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+class TestClassifyAction(unittest.TestCase):
+    def test_classes(self):
+        self.assertEqual(resilience.classifyAction("GetInfo"),resilience.READ)
+        self.assertEqual(resilience.classifyAction("X_AVM-DE_GetHostListPath"),resilience.READ)
+        self.assertEqual(resilience.classifyAction("SetEnable"),resilience.WRITE)
+        self.assertEqual(resilience.classifyAction("X_AVM-DE_CreateUrlSID"),resilience.WRITE)
+        self.assertEqual(resilience.classifyAction("Reboot"),resilience.WRITE)
+    def test_override(self):
+        policy = resilience.RetryPolicy(classes={"X_AVM-DE_CreateUrlSID":resilience.READ})
+        self.assertEqual(policy.getClass("X_AVM-DE_CreateUrlSID"),resilience.READ)
+        self.assertEqual(policy.getClass("SetEnable"),resilience.WRITE)
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = resilience.RetryPolicy(retries=2,backoff=0)
+        self.events = []
+        self.policy.addHook(lambda event,info:self.events.append(event))
+    def test_read_retried(self):
+        call = FailingCall([requests.exceptions.ReadTimeout(),requests.exceptions.ConnectionError()])
+        self.assertEqual(self.policy.call("GetInfo",call),"ok")
+        self.assertEqual(call.calls,3)
+        self.assertEqual(self.events,["retry","retry","success"])
+    def test_retries_exhausted(self):
+        call = FailingCall([requests.exceptions.ReadTimeout()]*3)
+        self.assertRaises(requests.exceptions.ReadTimeout,self.policy.call,"GetInfo",call)
+        self.assertEqual(call.calls,3)
+        self.assertEqual(self.events,["retry","retry","failure"])
+    def test_write_not_retried(self):
+        call = FailingCall([requests.exceptions.ReadTimeout()])
+        self.assertRaises(requests.exceptions.ReadTimeout,self.policy.call,"SetEnable",call)
+        self.assertEqual(call.calls,1)
+        self.assertEqual(self.events,["failure"])
+    def test_write_not_sent(self):
+        self.assertTrue(self.policy.canRetry("SetEnable",requests.exceptions.ConnectTimeout()))
+        self.assertTrue(self.policy.canRetry("SetEnable",getRefusedError()))
+        self.assertFalse(self.policy.canRetry("SetEnable",requests.exceptions.ConnectionError("Connection reset")))
+        call = FailingCall([getRefusedError()])
+        self.assertEqual(self.policy.call("SetEnable",call),"ok")
+        self.assertEqual(call.calls,2)
+    def test_server_error(self):
+        call = FailingCall([ValueError("Error 714")])
+        self.assertRaises(ValueError,self.policy.call,"GetInfo",call)
+        self.assertEqual(call.calls,1)
+        self.assertEqual(self.events,["success"])
+    def test_backoff(self):
+        policy = resilience.RetryPolicy(backoff=0.1,maxbackoff=0.5)
+        for attempt,limit in [(0,0.1),(1,0.2),(2,0.4),(3,0.5),(10,0.5)]:
+            delays = [policy.getDelay(attempt) for _ in range(200)]
+            self.assertTrue(all(0<=d<=limit for d in delays))
+            self.assertGreater(max(delays),limit/2)
+    def test_hook_info(self):
+        infos = []
+        self.policy.addHook(lambda event,info:infos.append(info))
+        self.policy.addHook(lambda event,info:1/0)
+        self.policy.call("GetInfo",FailingCall([requests.exceptions.ReadTimeout()]))
+        self.assertEqual(infos[0]["action"],"GetInfo")
+        self.assertEqual(infos[0]["attempt"],0)
+        self.assertIsInstance(infos[0]["error"],requests.exceptions.ReadTimeout)
+        self.assertEqual(infos[1]["attempts"],2)
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.breaker = resilience.CircuitBreaker(threshold=2,resettimeout=0.1)
+        self.policy = resilience.RetryPolicy(retries=0)
+        self.events = []
+        self.breaker.addHook(lambda event,info:self.events.append((event,info["failures"])))
+    def fail(self):
+        self.assertRaises(requests.exceptions.ConnectionError,self.policy.call,"GetInfo",
+                          FailingCall([requests.exceptions.ConnectionError()]),self.breaker)
+    def test_cycle(self):
+        self.fail()
+        self.assertEqual(self.breaker.state,"closed")
+        self.fail()
+        self.assertEqual(self.breaker.state,"open")
+        call = FailingCall([])
+        self.assertRaises(resilience.CircuitOpenError,self.policy.call,"GetInfo",call,self.breaker)
+        self.assertEqual(call.calls,0)
+        time.sleep(0.15)
+        # Trial request fails, the breaker opens again
+        self.fail()
+        self.assertEqual(self.breaker.state,"open")
+        time.sleep(0.15)
+        self.assertEqual(self.policy.call("GetInfo",call,self.breaker),"ok")
+        self.assertEqual(self.breaker.state,"closed")
+        self.assertEqual(self.events,[("open",2),("open",3),("close",3)])
+    def test_single_trial(self):
+        self.fail()
+        self.fail()
+        time.sleep(0.15)
+        self.breaker.before()
+        self.assertEqual(self.breaker.state,"halfopen")
+        self.assertRaises(resilience.CircuitOpenError,self.breaker.before)
+    def test_interrupted_trial(self):
+        self.fail()
+        self.fail()
+        time.sleep(0.15)
+        self.assertRaises(KeyboardInterrupt,self.policy.call,"GetInfo",FailingCall([KeyboardInterrupt()]),self.breaker)
+        self.assertEqual(self.policy.call("GetInfo",FailingCall([]),self.breaker),"ok")
+        self.assertEqual(self.breaker.state,"closed")
+    def test_server_error_closes(self):
+        self.fail()
+        self.assertRaises(ValueError,self.policy.call,"GetInfo",FailingCall([ValueError()]),self.breaker)
+        self.assertEqual(self.breaker.failures,0)
+
+class SlowCall(object):
+    def __init__(self,result=None,error=None,delay=0.1):
+        self.result = result if result is not None else {"NewUpTime":"42"}
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+    def __call__(self):
+        self.calls+=1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class TestSingleFlight(unittest.TestCase):
+    def test_shared_read(self):
+        flight = resilience.SingleFlight()
+        events = []
+        flight.addHook(lambda event,info:events.append((event,info["action"])))
+        call = SlowCall()
+        results,errors = runThreads(lambda:flight.call("GetInfo","key",call),4)
+        self.assertEqual(call.calls,1)
+        self.assertEqual(errors,[None]*4)
+        self.assertEqual(results,[{"NewUpTime":"42"}]*4)
+        self.assertEqual(events,[("shared","GetInfo")]*3)
+    def test_copies(self):
+        flight = resilience.SingleFlight()
+        call = SlowCall()
+        results,errors = runThreads(lambda:flight.call("GetInfo","key",call),2)
+        self.assertIsNot(results[0],results[1])
+        self.assertIsNot(results[0],call.result)
+        results[0]["NewUpTime"] = "0"
+        self.assertEqual(results[1]["NewUpTime"],"42")
+    def test_write_not_shared(self):
+        flight = resilience.SingleFlight()
+        call = SlowCall()
+        runThreads(lambda:flight.call("SetEnable","key",call),3)
+        self.assertEqual(call.calls,3)
+    def test_override(self):
+        flight = resilience.SingleFlight({"SetEnable":True,"GetInfo":False})
+        self.assertTrue(flight.isShared("SetEnable"))
+        self.assertFalse(flight.isShared("GetInfo"))
+    def test_different_keys(self):
+        flight = resilience.SingleFlight()
+        call = SlowCall()
+        keys = iter(range(3))
+        lock = threading.Lock()
+        def run():
+            with lock:
+                key = next(keys)
+            return flight.call("GetInfo",key,call)
+        runThreads(run,3)
+        self.assertEqual(call.calls,3)
+    def test_error(self):
+        flight = resilience.SingleFlight()
+        call = SlowCall(error=ValueError("rejected"))
+        results,errors = runThreads(lambda:flight.call("GetInfo","key",call),3)
+        self.assertEqual(call.calls,1)
+        self.assertEqual([type(e) for e in errors],[ValueError]*3)
+    def test_interrupted_leader(self):
+        flight = resilience.SingleFlight()
+        call = SlowCall(error=KeyboardInterrupt())
+        results,errors = runThreads(lambda:flight.call("GetInfo","key",call),3)
+        self.assertEqual([type(e) for e in errors],[KeyboardInterrupt]*3)
+        self.assertEqual(flight._flights,{})
+
+def getSession(server,user,flight,send):
+    session = Session.__new__(Session)
+    session.baseurl = "http://%s:49000"%server
+    session.user = user
+    session.timeout = 2.0
+    session.policy = None
+    session.breaker = None
+    session.singleflight = flight
+    session._send = lambda uri,urn,action,body,timeout,kwargs:send(session)
+    return session
+
+class TestSessionSingleFlight(unittest.TestCase):
+    def run4(self,sessions):
+        calls = []
+        lock = threading.Lock()
+        def send(session):
+            with lock:
+                calls.append(session.baseurl)
+            time.sleep(0.1)
+            return {"NewSerialNumber":session.baseurl}
+        flight = resilience.SingleFlight()
+        sessions = [getSession(server,user,flight,send) for server,user in sessions]
+        it = iter(sessions)
+        def run():
+            with lock:
+                session = next(it)
+            return session,session.executePrepared("/upnp/control/deviceinfo","urn:dslforum-org:service:DeviceInfo:1","GetInfo","<body/>")
+        results,errors = runThreads(run,len(sessions))
+        for session,result in results:
+            self.assertEqual(result,{"NewSerialNumber":session.baseurl})
+        return calls
+    def test_same_server(self):
+        self.assertEqual(len(self.run4([("fritz.box","admin")]*4)),1)
+    def test_shared_between_servers(self):
+        self.assertEqual(len(self.run4([("192.168.178.1","admin"),("192.168.179.1","admin")]*2)),2)
+    def test_shared_between_users(self):
+        self.assertEqual(len(self.run4([("fritz.box","admin"),("fritz.box","guest")]*2)),2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_storage.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import unittest
+
+from fritzctl.ooapi import avm_storage
+
+class FakeDynAPI(object):
+    def __init__(self):
+        self.calls = []
+        self.info = {"NewFTPEnable":"1","NewFTPStatus":"ready","NewFTPWANEnable":"0","NewFTPWANSSLOnly":"1",
+                     "NewFTPWANPort":"","NewSMBEnable":"1"}
+        self.user = {"NewEnable":"1","NewStatus":"enabled"}
+    def GetInfo(self):
+        self.calls.append("GetInfo")
+        return dict(self.info)
+    def GetUserInfo(self):
+        self.calls.append("GetUserInfo")
+        return dict(self.user)
+
+class FakeSession(object):
+    def __init__(self):
+        self.dynapi = FakeDynAPI()
+    def getAPI(self,name):
+        return self.dynapi
+
+class TestStorageSampler(unittest.TestCase):
+    def setUp(self):
+        self.api = avm_storage.API_avm_storage(FakeSession(),"urn:dslforum-org:service:X_AVM-DE_Storage:1")
+        self.dynapi = self.api.dynapi
+    def test_first_sample(self):
+        changed = self.api.getSampler().sample()
+        self.assertEqual(changed,{"user_enable":True,"user_status":"enabled","ftp_enable":True,"ftp_status":"ready",
+                                  "ftp_wan_enable":False,"ftp_wan_sslonly":True,"ftp_wan_port":0,"smb_enable":True})
+        self.assertEqual(self.dynapi.calls,["GetUserInfo","GetInfo"])
+    def test_changes(self):
+        sampler = self.api.getSampler()
+        sampler.sample()
+        self.dynapi.calls = []
+        self.assertEqual(sampler.sample(),{})
+        self.dynapi.info["NewFTPStatus"] = "connected"
+        self.dynapi.info["NewSMBEnable"] = "0"
+        self.assertEqual(sampler.sample(),{"ftp_status":"connected","smb_enable":False})
+        self.assertEqual(self.dynapi.calls,["GetInfo"]*2)
+    def test_user_cached(self):
+        sampler = self.api.getSampler()
+        sampler.sample()
+        self.dynapi.user["NewStatus"] = "disabled"
+        self.assertEqual(sampler.sample(),{})
+        sampler.invalidate()
+        self.assertEqual(sampler.sample(),{"user_enable":True,"user_status":"disabled"})
+        self.assertEqual(self.dynapi.calls.count("GetUserInfo"),2)
+    def test_configmaxage(self):
+        sampler = self.api.getSampler(configmaxage=0)
+        sampler.sample()
+        sampler.sample()
+        self.assertEqual(self.dynapi.calls.count("GetUserInfo"),2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  test_tam.py
+#  
+#  Copyright 2016-2022 fritzctl Contributors
+#  
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#  
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+#  
+#  
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from fritzctl.ooapi import avm_tam
+
+LISTURL = "http://192.168.178.1:49000/tamcalls?sid=0123456789abcdef&tamindex=0"
+
+class Raw(io.BytesIO):
+    pass
+
+class FakeResponse(object):
+    def __init__(self,data):
+        self.raw = Raw(data)
+        self.closed = False
+    def iter_content(self,chunksize):
+        while True:
+            chunk = self.raw.read(chunksize)
+            if not chunk:
+                return
+            yield chunk
+    def close(self):
+        self.closed = True
+
+class FakeSession(object):
+    def __init__(self):
+        self.messages = {}
+        self.recordings = {}
+        self.marked = []
+        self.failmark = set()
+        self.failget = set()
+        self.responses = []
+        self._lock = threading.Lock()
+    def getAPI(self,name):
+        return self
+    def addMessage(self,index,date,new=True,path=True):
+        self.messages[index] = {"Index":str(index),"Tam":"0","Date":date,"New":"1" if new else "0",
+                                "Number":"0301234567","Duration":"0:01",
+                                "Path":"/download.lua?path=/data/tam/rec/rec.0.%03d"%index if path else ""}
+        if path:
+            self.recordings["/data/tam/rec/rec.0.%03d"%index] = ("recording %d %s"%(index,date)).encode("utf-8")
+    def GetList(self):
+        return {"NewTAMList":"<List><Item><Index>0</Index><Display>1</Display><Enable>1</Enable><Name>Anrufbeantworter</Name></Item>"
+                             "<Item><Index>1</Index><Display>0</Display><Enable>0</Enable><Name>Aus</Name></Item></List>"}
+    def GetMessageList(self,NewIndex):
+        return {"NewURL":LISTURL}
+    def MarkMessage(self,NewIndex,NewMessageIndex,NewMarkedAsRead):
+        with self._lock:
+            if NewMessageIndex in self.failmark:
+                raise ValueError("Error 713: SpecifiedArrayIndexInvalid")
+            self.marked.append(NewMessageIndex)
+            self.messages[NewMessageIndex]["New"] = "0"
+    def getURL(self,url,stream=False):
+        if url==LISTURL:
+            items = "".join(["<Message>%s</Message>"%"".join(["<%s>%s</%s>"%(k,v,k) for k,v in m.items()]) for _,m in sorted(self.messages.items())])
+            r = FakeResponse(("<Root>%s</Root>"%items).encode("utf-8"))
+        else:
+            path = url.split("path=",1)[1].split("&",1)[0]
+            if path in self.failget:
+                raise IOError("connection reset")
+            r = FakeResponse(self.recordings[path])
+        with self._lock:
+            self.responses.append(r)
+        return r
+
+class TestTAMSync(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.session = FakeSession()
+        self.api = avm_tam.API_avm_tam(self.session,"urn:dslforum-org:service:X_AVM-DE_TAM:1")
+        self.session.addMessage(0,"18.10.26 09:00")
+        self.session.addMessage(1,"19.10.26 10:30",new=False)
+        self.session.addMessage(2,"19.10.26 11:00",path=False)
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    def getSync(self,seen=None):
+        return self.api.getSync(os.path.join(self.tmpdir,"tam"),seen)
+    def test_messages(self):
+        messages = self.api.getMessages(0)
+        self.assertEqual([m.index for m in messages],[0,1,2])
+        self.assertEqual(messages[0].duration,60)
+        self.assertTrue(messages[0].new)
+        self.assertEqual(messages[0].getDownloadURL(),"http://192.168.178.1:49000/download.lua?path=/data/tam/rec/rec.0.000&sid=0123456789abcdef")
+        self.assertTrue(all(r.closed for r in self.session.responses))
+    def test_sync(self):
+        sync = self.getSync()
+        downloaded,failed = sync.sync()
+        self.assertEqual(failed,[])
+        self.assertEqual([m.index for m,f in downloaded],[0,1])
+        with open(downloaded[0][1],"rb") as f:
+            self.assertEqual(f.read(),b"recording 0 18.10.26 09:00")
+        self.assertEqual(os.path.basename(downloaded[0][1]),"tam0-0-202610180900.wav")
+        self.assertEqual(self.session.marked,[0])
+        self.assertEqual(sync.seen,{0:{0,1,2}})
+        self.assertEqual(sync.sync(),([],[]))
+        self.assertTrue(all(r.closed for r in self.session.responses))
+    def test_seen_resume(self):
+        downloaded,failed = self.getSync({"0":[0,2]}).sync(markread=False)
+        self.assertEqual([m.index for m,f in downloaded],[1])
+        self.assertEqual(self.session.marked,[])
+    def test_download_error(self):
+        self.session.failget.add("/data/tam/rec/rec.0.001")
+        sync = self.getSync()
+        downloaded,failed = sync.sync()
+        self.assertEqual([m.index for m,e in failed],[1])
+        self.assertEqual(sync.seen[0],{0,2})
+        self.session.failget.clear()
+        downloaded,failed = sync.sync()
+        self.assertEqual([m.index for m,f in downloaded],[1])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir,"tam","tam0-1-202610191030.wav.part")))
+    def test_mark_error(self):
+        self.session.failmark.add(0)
+        downloaded,failed = self.getSync().sync()
+        self.assertEqual([m.index for m,f in downloaded],[0,1])
+        self.assertEqual([(m.index,type(e)) for m,e in failed],[(0,ValueError)])
+        self.assertTrue(failed[0][0].new)
+    def test_index_reuse(self):
+        sync = self.getSync()
+        first,_ = sync.sync()
+        del self.session.messages[0]
+        self.assertEqual(sync.sync(),([],[]))
+        self.assertEqual(sync.seen[0],{1,2})
+        self.session.addMessage(0,"20.10.26 08:15")
+        downloaded,failed = sync.sync()
+        self.assertEqual([m.index for m,f in downloaded],[0])
+        self.assertNotEqual(downloaded[0][1],first[0][1])
+        self.assertTrue(os.path.exists(first[0][1]))
+
+if __name__ == "__main__":
+    unittest.main()